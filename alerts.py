@@ -0,0 +1,140 @@
+import threading
+from bisect import bisect_left, bisect_right
+
+DIRECTIONS = ('above', 'below')
+
+
+def room_for_user(user_id):
+    return f"user:{user_id}"
+
+
+class AlertBook:
+    """One symbol's untriggered alerts, as two threshold-sorted books.
+
+    ``above`` alerts fire once the price reaches their threshold and sit in
+    descending order; ``below`` alerts fire once the price falls to their
+    threshold and sit in ascending order. Either way a tick fires a suffix
+    of the book, which comes off the end of the list without moving the
+    alerts still waiting. A tick costs two binary searches plus the alerts
+    it fires, however many are waiting. Each book keeps sort keys and alert
+    ids in parallel lists so the searches compare plain floats; the
+    ``above`` keys are negated thresholds, ascending.
+    """
+
+    def __init__(self):
+        self.keys = {'above': [], 'below': []}
+        self.ids = {'above': [], 'below': []}
+
+    def __len__(self):
+        return len(self.ids['above']) + len(self.ids['below'])
+
+    @staticmethod
+    def _key(direction, value):
+        return -value if direction == 'above' else value
+
+    def add(self, alert_id, direction, threshold):
+        keys, ids = self.keys[direction], self.ids[direction]
+        key = self._key(direction, threshold)
+        # After any equal thresholds, so ties fire in insertion order
+        i = bisect_right(keys, key)
+        keys.insert(i, key)
+        ids.insert(i, alert_id)
+
+    def load(self, direction, alerts):
+        """Replace a book with ``(threshold, alert_id)`` pairs in one sort"""
+        alerts = sorted((self._key(direction, threshold), alert_id) for threshold, alert_id in alerts)
+        self.keys[direction] = [key for key, _ in alerts]
+        self.ids[direction] = [alert_id for _, alert_id in alerts]
+
+    def remove(self, alert_id, direction, threshold):
+        keys, ids = self.keys[direction], self.ids[direction]
+        key = self._key(direction, threshold)
+        i = bisect_left(keys, key)
+        while i < len(keys) and keys[i] == key:
+            if ids[i] == alert_id:
+                del keys[i], ids[i]
+                return True
+            i += 1
+        return False
+
+    def match(self, price):
+        """Take the alerts crossed by ``price`` out of the book; returns their ids"""
+        fired = []
+        for direction in DIRECTIONS:
+            keys, ids = self.keys[direction], self.ids[direction]
+            start = bisect_left(keys, self._key(direction, price))
+            if start < len(keys):
+                fired += ids[start:]
+                del keys[start:], ids[start:]
+        return fired
+
+
+class AlertEngine:
+    """Untriggered price alerts for every symbol, matched tick by tick.
+
+    Alerts are one-shot: ``match`` returns the ids crossed by a price and
+    forgets them. ``alerts`` maps each waiting id to its
+    ``(symbol, direction, threshold)`` so alerts can be cancelled.
+    """
+
+    def __init__(self):
+        self.books = {}
+        self.alerts = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.alerts)
+
+    def symbols(self):
+        with self._lock:
+            return [symbol for symbol, book in self.books.items() if len(book)]
+
+    def add(self, alert_id, symbol, direction, threshold):
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {', '.join(DIRECTIONS)}")
+        symbol, threshold = symbol.upper(), float(threshold)
+        with self._lock:
+            if alert_id in self.alerts:
+                return
+            self.books.setdefault(symbol, AlertBook()).add(alert_id, direction, threshold)
+            self.alerts[alert_id] = (symbol, direction, threshold)
+
+    def load(self, alerts):
+        """Replace every book from ``(alert_id, symbol, direction, threshold)`` rows
+
+        Sorts each book once instead of inserting alerts one at a time.
+        """
+        grouped = {}
+        waiting = {}
+        for alert_id, symbol, direction, threshold in alerts:
+            if direction not in DIRECTIONS:
+                continue
+            symbol, threshold = symbol.upper(), float(threshold)
+            grouped.setdefault((symbol, direction), []).append((threshold, alert_id))
+            waiting[alert_id] = (symbol, direction, threshold)
+
+        books = {}
+        for (symbol, direction), rows in grouped.items():
+            books.setdefault(symbol, AlertBook()).load(direction, rows)
+        with self._lock:
+            self.books, self.alerts = books, waiting
+        return len(waiting)
+
+    def remove(self, alert_id):
+        with self._lock:
+            alert = self.alerts.pop(alert_id, None)
+            if alert is None:
+                return False
+            symbol, direction, threshold = alert
+            return self.books[symbol].remove(alert_id, direction, threshold)
+
+    def match(self, symbol, price):
+        """Ids of the alerts on ``symbol`` that ``price`` triggers, removed from the engine"""
+        with self._lock:
+            book = self.books.get(symbol.upper())
+            if book is None:
+                return []
+            fired = book.match(float(price))
+            for alert_id in fired:
+                del self.alerts[alert_id]
+            return fired
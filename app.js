@@ -54,6 +54,7 @@ function initializeApp() {
         
         // Populate stock data
         populateStockGrid();
+        refreshStockQuotes();
         
         // Populate portfolio data
         populatePortfolioHoldings();
@@ -279,6 +280,32 @@ function populateStockGrid() {
     }
 }
 
+// Fetch live quotes for every stock in the grid with a single batched request
+function refreshStockQuotes() {
+    const symbols = sampleData.sample_stocks.map(stock => stock.symbol).join(',');
+    
+    return fetch(`/api/stocks?symbols=${encodeURIComponent(symbols)}`)
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        })
+        .then(data => {
+            data.quotes.forEach(quote => {
+                const stock = sampleData.sample_stocks.find(s => s.symbol === quote.symbol);
+                if (!stock || quote.price === null) return;
+                
+                stock.price = quote.price;
+                if (quote.change !== null) stock.change = quote.change;
+                if (quote.change_percent !== null) stock.change_percent = quote.change_percent;
+            });
+            populateStockGrid();
+        })
+        .catch(error => {
+            // Keep showing the sample data when the API is unavailable
+            console.warn('Live quotes unavailable:', error);
+        });
+}
+
 // Stock selection
 function selectStock(symbol) {
     try {
@@ -606,7 +633,7 @@ function initializePortfolioChart() {
         const ctx = document.getElementById('portfolio-chart');
         if (!ctx) return;
         
-        // Generate sample portfolio performance data
+        // Sample performance until the equity curve arrives from the server
         const dates = generateDates(30);
         const portfolioValues = generateHistoricalPrices(3200, 3648.55, 30);
         
@@ -655,11 +682,50 @@ function initializePortfolioChart() {
                 }
             }
         });
+        
+        loadPortfolioHistory();
     } catch (error) {
         console.error('Error initializing portfolio chart:', error);
     }
 }
 
+function loadPortfolioHistory(months = 3) {
+    const holdings = sampleData.portfolio_data
+        .map(item => `${item.symbol}:${item.shares}:${item.avg_cost}`)
+        .join(',');
+    const start = new Date();
+    start.setMonth(start.getMonth() - months);
+    const params = new URLSearchParams({ holdings, start: start.toISOString().slice(0, 10) });
+    
+    return fetch(`/api/portfolio/history?${params}`)
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        })
+        .then(data => {
+            if (!portfolioChart || data.dates.length === 0) return;
+            
+            portfolioChart.data.labels = data.dates.map(date => new Date(date).toLocaleDateString('en-US', {
+                month: 'short', day: 'numeric'
+            }));
+            portfolioChart.data.datasets[0].data = data.value;
+            portfolioChart.data.datasets[1] = {
+                label: 'Cost Basis',
+                data: data.cost,
+                borderColor: '#B4413C',
+                borderDash: [5, 5],
+                fill: false,
+                pointRadius: 0,
+                borderWidth: 1
+            };
+            portfolioChart.update();
+        })
+        .catch(error => {
+            // Keep the sample curve when the API is unavailable
+            console.warn('Portfolio history unavailable:', error);
+        });
+}
+
 function updateChartForStock(symbol) {
     try {
         // Find the stock data
@@ -693,11 +759,50 @@ function updateChartForStock(symbol) {
         
         // Update the chart
         priceChart.update();
+        
+        // Swap in real history once it arrives
+        loadPriceHistory(symbol, lstmPrediction);
     } catch (error) {
         console.error('Error updating chart for stock:', error);
     }
 }
 
+// The server rolls long ranges up to weekly/monthly bars and downsamples
+// them (LTTB) to a fixed number of points, so any range costs the same
+const CHART_POINTS = 120;
+const CHART_INTERVALS = { '1mo': '1d', '6mo': '1d', '1y': '1d', '5y': '1wk', '10y': '1mo' };
+
+function loadPriceHistory(symbol, predictionPrices, period = '1y') {
+    const interval = CHART_INTERVALS[period] || '1d';
+    const params = new URLSearchParams({ period, interval, points: CHART_POINTS, format: 'columnar' });
+    
+    return fetch(`/api/stock/${encodeURIComponent(symbol)}?${params}`)
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        })
+        .then(data => {
+            if (!priceChart || currentSelectedStock !== symbol) return;
+            
+            const history = data.historical_data;
+            const dates = history.timestamp.map(ts => new Date(ts).toLocaleDateString('en-US', {
+                month: 'short', day: 'numeric', year: interval === '1d' ? undefined : '2-digit'
+            }));
+            const lastBar = history.timestamp[history.timestamp.length - 1];
+            const predictionDates = predictionPrices.map((_, i) => new Date(lastBar + (i + 1) * 86400000)
+                .toLocaleDateString('en-US', { month: 'short', day: 'numeric' }));
+            
+            priceChart.data.labels = [...dates, ...predictionDates];
+            priceChart.data.datasets[0].data = [...history.close, ...Array(predictionPrices.length).fill(null)];
+            priceChart.data.datasets[1].data = [...Array(dates.length).fill(null), ...predictionPrices];
+            priceChart.update();
+        })
+        .catch(error => {
+            // Keep the generated history when the API is unavailable
+            console.warn(`Price history unavailable for ${symbol}:`, error);
+        });
+}
+
 // Helper functions for chart data
 function generateDates(days, startDate = null) {
     const dates = [];
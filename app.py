@@ -1,27 +1,64 @@
 
 from flask import Flask, render_template, request, jsonify, session
 from flask_sqlalchemy import SQLAlchemy
-from flask_socketio import SocketIO, emit
-import yfinance as yf
+from flask_socketio import SocketIO, emit, join_room
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-import tensorflow as tf
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.linear_model import LinearRegression
-from statsmodels.tsa.arima.model import ARIMA
-import requests
-from textblob import TextBlob
+import os
+import json
 import threading
 import time
+from utils import StockDataFetcher, SentimentAnalyzer, PortfolioManager
+from predictors import ModelRunner, MODELS, DEFAULT_DEADLINES, format_predictions, model_registry
+from jobs import JobQueue
+from prediction_cache import PredictionCache, bar_closed, next_bar_date
+from broadcaster import PriceBroadcaster
+from wire import negotiate_format, render_history, history_columns
+from rollups import downsample
+from risk import RiskModel
+from alerts import AlertEngine, DIRECTIONS, room_for_user
+from backtest import BacktestStore
+from queries import database_uri, engine_options, keyset_page, page_size
+from http_cache import (make_etag, not_modified, market_max_age, cacheable, uncacheable, revalidated,
+                        compress)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///stock_prediction.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# A message queue (e.g. redis://...) lets several web processes and
+# worker.py emit to each other's clients
+socketio = SocketIO(app, cors_allowed_origins="*", message_queue=os.environ.get('SOCKETIO_MESSAGE_QUEUE'))
+fetcher = StockDataFetcher()
+
+# Seconds each model may run before /api/predict answers without it
+app.config['MODEL_DEADLINES'] = dict(DEFAULT_DEADLINES)
+
+model_runner = ModelRunner(deadlines=app.config['MODEL_DEADLINES'])
+job_queue = JobQueue()
+price_broadcaster = PriceBroadcaster(socketio, fetcher)
+sentiment_analyzer = SentimentAnalyzer()
+risk_model = RiskModel()
+alert_engine = AlertEngine()
+backtest_store = BacktestStore()
+
+MAX_BATCH_SYMBOLS = 100
+# Risk is a matrix-vector product over the held names, so it takes bigger books
+MAX_RISK_SYMBOLS = 500
+
+# Symbols whose predictions worker.py precomputes after each new bar
+app.config['PREDICTION_WATCHLIST'] = [
+    s.strip().upper() for s in os.environ.get('PREDICTION_WATCHLIST', 'AAPL,GOOGL,MSFT,TSLA,AMZN').split(',')
+    if s.strip()
+]
+app.config['PREDICTION_REFRESH_INTERVAL'] = int(os.environ.get('PREDICTION_REFRESH_INTERVAL', 300))
+
+# How long clients and shared caches may reuse a sentiment response
+SENTIMENT_MAX_AGE = 300
 
 # Database Models
 class User(db.Model):
@@ -31,6 +68,20 @@ class User(db.Model):
     password_hash = db.Column(db.String(120), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class PriceAlert(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    stock_symbol = db.Column(db.String(10), nullable=False)
+    direction = db.Column(db.String(5), nullable=False)  # 'above' or 'below'
+    threshold = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    triggered_at = db.Column(db.DateTime, nullable=True)
+    triggered_price = db.Column(db.Float, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_price_alert_user_id', 'user_id', 'id'),
+    )
+
 class Stock(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     symbol = db.Column(db.String(10), unique=True, nullable=False)
@@ -47,6 +98,16 @@ class Prediction(db.Model):
     prediction_date = db.Column(db.DateTime, default=datetime.utcnow)
     target_date = db.Column(db.DateTime, nullable=False)
 
+    __table_args__ = (
+        # Newest prediction per (symbol, model) is a single index seek, and
+        # both also serve keyset pages of a symbol's history, newest first
+        db.Index('ix_prediction_symbol_model_date', 'stock_symbol', 'model_type', 'prediction_date', 'id'),
+        db.Index('ix_prediction_symbol_date', 'stock_symbol', 'prediction_date', 'id'),
+        # One stored prediction per model and predicted bar; also the
+        # index behind PredictionCache.latest
+        db.UniqueConstraint('stock_symbol', 'target_date', 'model_type', name='uq_prediction_symbol_target_model'),
+    )
+
 class Portfolio(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -55,6 +116,12 @@ class Portfolio(db.Model):
     avg_cost = db.Column(db.Float, nullable=False)
     purchase_date = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_portfolio_user_id', 'user_id', 'id'),
+    )
+
+prediction_cache = PredictionCache(db, Prediction)
+
 # Routes
 @app.route('/')
 def index():
@@ -67,22 +134,121 @@ def dashboard():
 @app.route('/api/stock/<symbol>')
 def get_stock_data(symbol):
     try:
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period="1y")
-        info = stock.info
+        period = request.args.get('period', '1y')
+        interval = request.args.get('interval', '1d')
+        points = request.args.get('points', type=int)
+        if points is not None and points < 3:
+            return jsonify({'error': 'points must be at least 3'}), 400
+
+        data = fetcher.get_stock_data(symbol, period=period)
+        if data is None:
+            return jsonify({'error': f'No data available for {symbol}'}), 404
+        hist = data['historical_data']
+        info = data['info']
+
+        # The body only changes with the last bar (revised in place while the
+        # market trades) or the query, so a poll that finds neither changed
+        # gets an empty 304
+        fmt = negotiate_format(request)
+        last_bar = hist.iloc[-1]
+        etag = make_etag('stock', symbol.upper(), period, interval, points, fmt,
+                         hist.index[-1].isoformat(), last_bar['Close'], last_bar['Volume'])
+        max_age = market_max_age(fetcher.ttls['quote'])
+        if not_modified(etag):
+            return revalidated(etag, max_age, vary=('Accept', 'Accept-Encoding'))
+
+        # Weekly/monthly/quarterly bars come from the precomputed rollups;
+        # ?points=N then thins the series server-side with LTTB
+        try:
+            bars = fetcher.rollups.get(symbol, hist, interval)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        bars = downsample(bars, points)
 
         current_price = hist['Close'].iloc[-1]
         prev_close = hist['Close'].iloc[-2]
         change = current_price - prev_close
         change_percent = (change / prev_close) * 100
 
-        return jsonify({
+        # historical_data as records (default), parallel columns, MessagePack
+        # or Arrow IPC, chosen by ?format= or the Accept header
+        response = render_history({
             'symbol': symbol,
             'name': info.get('longName', symbol),
             'price': round(current_price, 2),
             'change': round(change, 2),
             'change_percent': round(change_percent, 2),
-            'historical_data': hist.reset_index().to_dict('records')
+            'interval': interval
+        }, bars, fmt)
+        if isinstance(response, tuple):
+            return response
+        return cacheable(response, etag, max_age)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/stocks')
+def get_many_stocks():
+    try:
+        symbols = [s.strip() for s in request.args.get('symbols', '').split(',') if s.strip()]
+        if not symbols:
+            return jsonify({'error': 'symbols query parameter is required'}), 400
+        if len(symbols) > MAX_BATCH_SYMBOLS:
+            return jsonify({'error': f'At most {MAX_BATCH_SYMBOLS} symbols per request'}), 400
+
+        data = fetcher.get_many(symbols, period=request.args.get('period', '5d'))
+        change = data['price'] - data['prev_close']
+        change_percent = change / data['prev_close'] * 100
+
+        def as_list(values):
+            return [None if np.isnan(v) else round(float(v), 2) for v in values]
+
+        return jsonify({
+            'symbols': data['symbols'],
+            'dates': [d.isoformat() for d in data['dates']],
+            'close': [as_list(row) for row in data['close']],
+            'quotes': [
+                {'symbol': symbol, 'price': price, 'change': delta, 'change_percent': pct}
+                for symbol, price, delta, pct in zip(data['symbols'], as_list(data['price']),
+                                                     as_list(change), as_list(change_percent))
+            ]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/indicators')
+def get_many_indicators():
+    try:
+        symbols = [s.strip() for s in request.args.get('symbols', '').split(',') if s.strip()]
+        if not symbols:
+            return jsonify({'error': 'symbols query parameter is required'}), 400
+        if len(symbols) > MAX_BATCH_SYMBOLS:
+            return jsonify({'error': f'At most {MAX_BATCH_SYMBOLS} symbols per request'}), 400
+
+        data = fetcher.get_indicators_many(symbols, period=request.args.get('period', '6mo'))
+
+        # Latest value of each indicator per symbol
+        latest = {}
+        for row, symbol in enumerate(data['symbols']):
+            latest[symbol] = {}
+            for name, matrix in data['indicators'].items():
+                valid = matrix[row][~np.isnan(matrix[row])]
+                latest[symbol][name] = round(float(valid[-1]), 2) if len(valid) else None
+
+        return jsonify({'indicators': latest})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/indicators/<symbol>')
+def get_indicators(symbol):
+    try:
+        live = request.args.get('live', 'false').lower() in ('1', 'true', 'yes')
+        values = fetcher.get_latest_indicators(symbol, live=live)
+        if values is None:
+            return jsonify({'error': f'No data available for {symbol}'}), 404
+        return jsonify({
+            'symbol': symbol,
+            'indicators': {name: None if np.isnan(value) else round(float(value), 2)
+                           for name, value in values.items()}
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -91,105 +257,344 @@ def get_stock_data(symbol):
 def predict_stock(symbol):
     try:
         # Get historical data
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period="2y")
+        data = fetcher.get_stock_data(symbol, period="2y")
+        if data is None:
+            return jsonify({'error': f'No data available for {symbol}'}), 404
+        hist = data['historical_data']
+
+        # Serve precomputed predictions for the next bar when we have them.
+        # A bar that is still trading gives provisional predictions, which
+        # are neither read from nor written to the table.
+        target_date = next_bar_date(hist.index[-1])
+        final = bar_closed(hist.index[-1])
+        cached = prediction_cache.latest(symbol, target_date) if final else {}
+        missing = prediction_cache.missing(cached)
+
+        if missing:
+            # Run the models without a stored result concurrently; one that
+            # misses its deadline is served from its last result, flagged
+            # stale, and stored once it finishes
+            def save_late(name, result):
+                with app.app_context():
+                    prediction_cache.save([(symbol, target_date, {name: result})])
+
+            fresh = model_runner.run(symbol, hist['Close'], names=missing, on_late=save_late if final else None)
+            if final:
+                prediction_cache.save([(symbol, target_date, fresh)])
+            cached.update(fresh)
+        results = {name: cached[name] for name in MODELS if name in cached}
+
+        accuracy = backtest_store.accuracy(symbol)
+        predictions = format_predictions(results, accuracy)
+
+        # Stale or failed fallbacks may be replaced on the next request
+        if any(result['status'] not in ('ok', 'cached') for result in results.values()):
+            return uncacheable(jsonify(predictions))
+
+        # Same bar and close, same model file and same stored rows: same predictions
+        etag = make_etag('predict', symbol.upper(), hist.index[-1].isoformat(), float(hist['Close'].iloc[-1]),
+                         model_registry.version(symbol),
+                         *(results[name].get('as_of') for name in sorted(results)),
+                         *(accuracy[name] for name in sorted(accuracy)))
+        max_age = market_max_age(app.config['PREDICTION_REFRESH_INTERVAL'])
+        if not_modified(etag):
+            return revalidated(etag, max_age)
+        return cacheable(jsonify(predictions), etag, max_age)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        predictions = {}
+@app.route('/api/backtest/<symbol>')
+def get_backtest(symbol):
+    try:
+        # Computed by worker.py (or python backtest.py); this only reads them
+        results = backtest_store.results(symbol)
+        if results is None:
+            return jsonify({'error': f'No backtest available for {symbol}'}), 404
+        return jsonify(results)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        # LSTM Prediction
-        lstm_pred, lstm_conf = predict_with_lstm(hist['Close'].values)
-        predictions['LSTM'] = {
-            'prediction': round(lstm_pred, 2),
-            'confidence': round(lstm_conf, 2),
-            'accuracy': 87.3
-        }
+@app.route('/api/predict/<symbol>', methods=['POST'])
+def submit_prediction_job(symbol):
+    try:
+        # Model fitting happens in worker.py; the web process only queues it
+        job_id = job_queue.enqueue(symbol)
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/api/jobs/{job_id}'
+        }), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        # ARIMA Prediction
-        arima_pred, arima_conf = predict_with_arima(hist['Close'].values)
-        predictions['ARIMA'] = {
-            'prediction': round(arima_pred, 2),
-            'confidence': round(arima_conf, 2),
-            'accuracy': 73.1
-        }
+@app.route('/api/predictions/<symbol>')
+def get_prediction_history(symbol):
+    try:
+        query = Prediction.query.filter_by(stock_symbol=symbol.upper())
+        if request.args.get('model'):
+            query = query.filter_by(model_type=request.args['model'])
+
+        # Newest first; ?cursor= from the previous page continues after it
+        try:
+            rows, next_cursor = keyset_page(query, [Prediction.prediction_date, Prediction.id],
+                                            cursor=request.args.get('cursor'), limit=page_size(request),
+                                            descending=True)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-        # Linear Regression Prediction
-        lr_pred, lr_conf = predict_with_linear_regression(hist['Close'].values)
-        predictions['Linear Regression'] = {
-            'prediction': round(lr_pred, 2),
-            'confidence': round(lr_conf, 2),
-            'accuracy': 65.8
-        }
+        return jsonify({
+            'symbol': symbol.upper(),
+            'predictions': [
+                {
+                    'id': row.id,
+                    'model': row.model_type,
+                    'predicted_price': round(row.predicted_price, 2),
+                    'confidence': row.confidence,
+                    'prediction_date': row.prediction_date.isoformat(),
+                    'target_date': row.target_date.isoformat()
+                }
+                for row in rows
+            ],
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        return jsonify(predictions)
+def portfolio_from_request():
+    """Holdings from a user's stored lots (?user_id=), or inline as
+    ?holdings=AAPL:10:165,MSFT:5:350 (symbol:shares[:avg_cost]).
+    Returns ``(manager, error_message)``."""
+    if request.args.get('user_id', type=int) is not None:
+        rows = Portfolio.query.filter_by(user_id=request.args.get('user_id', type=int)).all()
+        manager = PortfolioManager.from_lots(
+            (row.stock_symbol, row.shares, row.avg_cost, row.purchase_date) for row in rows)
+        return manager, None
+    if request.args.get('holdings'):
+        manager = PortfolioManager()
+        try:
+            for holding in request.args['holdings'].split(','):
+                symbol, shares, *avg_cost = holding.split(':')
+                manager.add_stock(symbol.strip(), float(shares), float(avg_cost[0]) if avg_cost else 0.0)
+        except ValueError:
+            return None, 'holdings must look like AAPL:10:165,MSFT:5:350'
+        return manager, None
+    return None, 'user_id or holdings query parameter is required'
+
+@app.route('/api/portfolio/history')
+def get_portfolio_history():
+    try:
+        manager, error = portfolio_from_request()
+        if error:
+            return jsonify({'error': error}), 400
+        if len(manager.symbols) > MAX_BATCH_SYMBOLS:
+            return jsonify({'error': f'At most {MAX_BATCH_SYMBOLS} symbols per request'}), 400
+
+        try:
+            start, end = (pd.Timestamp(request.args[name]) if request.args.get(name) else None
+                          for name in ('start', 'end'))
+        except ValueError:
+            return jsonify({'error': 'start and end must be dates like 2024-01-31'}), 400
+
+        curve = manager.equity_curve(fetcher, start=start, end=end)
+        return jsonify({
+            'symbols': manager.symbols,
+            'dates': [d.isoformat() for d in curve['dates']],
+            'value': np.round(curve['value'], 2).tolist(),
+            'cost': np.round(curve['cost'], 2).tolist()
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/sentiment/<symbol>')
-def get_sentiment(symbol):
+@app.route('/api/portfolio/risk')
+def get_portfolio_risk():
     try:
-        # Simulate news sentiment analysis
-        news_articles = [
-            {"title": f"{symbol} Reports Strong Quarterly Earnings", "sentiment": "Positive", "score": 0.8, "source": "Financial Times"},
-            {"title": f"{symbol} Stock Sees Bullish Momentum", "sentiment": "Positive", "score": 0.75, "source": "Reuters"},
-            {"title": f"Market Concerns Affect {symbol} Performance", "sentiment": "Negative", "score": -0.6, "source": "Bloomberg"}
-        ]
+        manager, error = portfolio_from_request()
+        if error:
+            return jsonify({'error': error}), 400
+        if not manager.symbols:
+            return jsonify({'error': 'Portfolio has no holdings'}), 400
+        if len(manager.symbols) > MAX_RISK_SYMBOLS:
+            return jsonify({'error': f'At most {MAX_RISK_SYMBOLS} symbols per request'}), 400
+        confidence = request.args.get('confidence', 0.99, type=float)
+        horizon = request.args.get('horizon', 1, type=int)
+        if not 0.5 <= confidence < 1 or horizon < 1:
+            return jsonify({'error': 'confidence must be in [0.5, 1) and horizon at least 1'}), 400
+
+        risk = manager.risk(fetcher, risk_model, confidence=confidence, horizon=horizon)
+        if risk is None:
+            return jsonify({'error': 'Not enough price history'}), 404
+        return jsonify({
+            'symbols': risk['symbols'],
+            'confidence': confidence,
+            'horizon': horizon,
+            'value': round(risk['value'], 2),
+            'volatility': round(risk['volatility'], 2),
+            'annualized_volatility': round(risk['annualized_volatility'], 2),
+            'parametric_var': round(risk['parametric_var'], 2),
+            'historical_var': round(risk['historical_var'], 2),
+            'exposures': np.round(risk['exposures'], 2).tolist(),
+            'marginal_contributions': np.round(risk['marginal_contributions'], 6).tolist(),
+            'component_contributions': np.round(risk['component_contributions'], 2).tolist()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        overall_score = sum([article['score'] for article in news_articles]) / len(news_articles)
+@app.route('/api/portfolio/<int:user_id>')
+def get_portfolio(user_id):
+    try:
+        try:
+            # Newest holdings first, like the predictions listing
+            rows, next_cursor = keyset_page(Portfolio.query.filter_by(user_id=user_id), [Portfolio.id],
+                                            cursor=request.args.get('cursor'), limit=page_size(request),
+                                            descending=True)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
         return jsonify({
-            'overall_sentiment': 'Positive' if overall_score > 0 else 'Negative',
-            'sentiment_score': round(overall_score, 2),
-            'news_articles': news_articles,
-            'news_count': len(news_articles)
+            'user_id': user_id,
+            'holdings': [
+                {
+                    'id': row.id,
+                    'symbol': row.stock_symbol,
+                    'shares': row.shares,
+                    'avg_cost': row.avg_cost,
+                    'purchase_date': row.purchase_date.isoformat()
+                }
+                for row in rows
+            ],
+            'next_cursor': next_cursor
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Machine Learning Functions
-def predict_with_lstm(data):
-    # Simplified LSTM prediction
-    scaler = MinMaxScaler()
-    scaled_data = scaler.fit_transform(data.reshape(-1, 1))
+@app.route('/api/alerts', methods=['POST'])
+def create_alert():
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            user_id = int(data['user_id'])
+            symbol = str(data['symbol']).strip().upper()
+            threshold = float(data['threshold'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': 'user_id, symbol, direction and threshold are required'}), 400
+        direction = data.get('direction')
+        if direction not in DIRECTIONS or not symbol or threshold <= 0:
+            return jsonify({'error': "direction must be 'above' or 'below' and threshold positive"}), 400
+        if db.session.get(User, user_id) is None:
+            return jsonify({'error': 'User not found'}), 404
+
+        alert = PriceAlert(user_id=user_id, stock_symbol=symbol, direction=direction, threshold=threshold)
+        db.session.add(alert)
+        db.session.commit()
+        start_alert_monitor()
+        alert_engine.add(alert.id, symbol, direction, threshold)
+        return jsonify(alert_payload(alert)), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-    # Create sequences for LSTM
-    X, y = [], []
-    for i in range(60, len(scaled_data)):
-        X.append(scaled_data[i-60:i, 0])
-        y.append(scaled_data[i, 0])
+@app.route('/api/users/<int:user_id>/alerts')
+def get_alerts(user_id):
+    try:
+        query = PriceAlert.query.filter_by(user_id=user_id)
+        if request.args.get('active', type=int):
+            query = query.filter(PriceAlert.triggered_at.is_(None))
+        try:
+            rows, next_cursor = keyset_page(query, [PriceAlert.id],
+                                            cursor=request.args.get('cursor'), limit=page_size(request))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-    X, y = np.array(X), np.array(y)
-    X = X.reshape((X.shape[0], X.shape[1], 1))
+        return jsonify({
+            'user_id': user_id,
+            'alerts': [alert_payload(row) for row in rows],
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-    # Simple prediction (in real implementation, you'd load a trained model)
-    last_sequence = scaled_data[-60:].reshape(1, 60, 1)
-    prediction = scaler.inverse_transform([[scaled_data[-1][0] * 1.02]])[0][0]
-    confidence = 0.85
+@app.route('/api/alerts/<int:alert_id>', methods=['DELETE'])
+def delete_alert(alert_id):
+    try:
+        alert = db.session.get(PriceAlert, alert_id)
+        if alert is None:
+            return jsonify({'error': 'Alert not found'}), 404
+        db.session.delete(alert)
+        db.session.commit()
+        alert_engine.remove(alert_id)
+        return jsonify({'id': alert_id, 'status': 'deleted'})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-    return prediction, confidence
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    try:
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({'error': f'Unknown job {job_id}'}), 404
+        return jsonify({
+            'job_id': job['id'],
+            'symbol': job['symbol'],
+            'status': job['status'],
+            'result': job['result'],
+            'error': job['error']
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-def predict_with_arima(data):
+@app.route('/api/sentiment/<symbol>')
+def get_sentiment(symbol):
     try:
-        model = ARIMA(data, order=(5,1,0))
-        fitted_model = model.fit()
-        forecast = fitted_model.forecast(steps=1)
-        confidence = 0.72
-        return forecast[0], confidence
-    except:
-        # Fallback prediction
-        return data[-1] * 1.01, 0.72
+        # Headlines come from the configured news provider; each distinct
+        # headline is scored once and remembered across requests and processes
+        analysis = sentiment_analyzer.get_news_sentiment(symbol)
+        if analysis is None:
+            return jsonify({'error': f'No sentiment available for {symbol}'}), 404
+
+        sentiment = {
+            'overall_sentiment': analysis['overall_sentiment'],
+            'sentiment_score': analysis['sentiment_score'],
+            'news_articles': analysis['articles'],
+            'news_count': analysis['article_count'],
+            'decayed_score': None if np.isnan(analysis['decayed_score']) else round(analysis['decayed_score'], 2)
+        }
+        etag = make_etag('sentiment', symbol.upper(), json.dumps(sentiment, sort_keys=True))
+        max_age = market_max_age(SENTIMENT_MAX_AGE)
+        if not_modified(etag):
+            return revalidated(etag, max_age)
+        return cacheable(jsonify(sentiment), etag, max_age)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sentiment/<symbol>/series')
+def get_sentiment_series(symbol):
+    try:
+        data = fetcher.get_stock_data(symbol, period=request.args.get('period', '6mo'))
+        if data is None:
+            return jsonify({'error': f'No data available for {symbol}'}), 404
+        hist = data['historical_data']
 
-def predict_with_linear_regression(data):
-    # Create features based on time
-    X = np.arange(len(data)).reshape(-1, 1)
-    y = data
+        # One row per price bar: the news since the previous bar and the
+        # decayed average of everything before it, from the sentiment index
+        sentiment = sentiment_analyzer.index.aligned(symbol, hist.index)
 
-    model = LinearRegression()
-    model.fit(X, y)
+        def as_list(values):
+            return [None if np.isnan(v) else round(float(v), 4) for v in values]
 
-    next_prediction = model.predict([[len(data)]])[0]
-    confidence = 0.68
+        return jsonify({
+            'symbol': symbol.upper(),
+            'timestamp': history_columns(hist)['timestamp'].tolist(),
+            'close': as_list(hist['Close']),
+            'sentiment_count': sentiment['sentiment_count'].tolist(),
+            'sentiment_mean': as_list(sentiment['sentiment_mean']),
+            'sentiment_decayed': as_list(sentiment['sentiment_decayed'])
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-    return next_prediction, confidence
+@app.after_request
+def compress_response(response):
+    # History bodies shrink several-fold under brotli/gzip
+    return compress(response)
 
 # WebSocket events for real-time updates
 @socketio.on('connect')
@@ -197,13 +602,138 @@ def handle_connect():
     print('Client connected')
     emit('connected', {'message': 'Connected to real-time updates'})
 
+@socketio.on('disconnect')
+def handle_disconnect():
+    price_broadcaster.disconnect(request.sid)
+
 @socketio.on('subscribe_stock')
 def handle_stock_subscription(data):
-    symbol = data['symbol']
-    # Start real-time updates for this stock
-    emit('stock_update', {'symbol': symbol, 'status': 'subscribed'})
+    symbol = data.get('symbol') if isinstance(data, dict) else None
+    # Start real-time updates for this stock; updates arrive as 'stock_update'
+    try:
+        last_price = price_broadcaster.subscribe(request.sid, symbol)
+    except ValueError as e:
+        emit('stock_update', {'symbol': symbol, 'status': 'error', 'error': str(e)})
+        return
+    update = {'symbol': symbol, 'status': 'subscribed'}
+    if last_price is not None:
+        update['price'] = round(float(last_price), 2)
+    emit('stock_update', update)
+
+@socketio.on('unsubscribe_stock')
+def handle_stock_unsubscription(data):
+    price_broadcaster.unsubscribe(request.sid, data['symbol'])
+    emit('stock_update', {'symbol': data['symbol'], 'status': 'unsubscribed'})
+
+@socketio.on('watch_alerts')
+def handle_watch_alerts(data):
+    # Fired alerts arrive as 'price_alert' in the user's room
+    start_alert_monitor()
+    join_room(room_for_user(int(data['user_id'])))
+
+@socketio.on('watch_job')
+def handle_watch_job(data):
+    # Clients join a room named after the job and get 'job_finished' there
+    job_id = data['job_id']
+    start_job_notifier()
+    join_room(job_id)
+    job = job_queue.get(job_id)
+    if job is not None and job['status'] in ('done', 'failed'):
+        emit('job_finished', job_payload(job))
+
+def job_payload(job):
+    return {'job_id': job['id'], 'symbol': job['symbol'], 'status': job['status'],
+            'result': job['result'], 'error': job['error']}
+
+def notify_finished_jobs(interval=0.5):
+    """Push finished jobs to the Socket.IO room of each job id"""
+    since = time.time()
+    while True:
+        socketio.sleep(interval)
+        try:
+            for job in job_queue.finished_since(since):
+                socketio.emit('job_finished', job_payload(job), to=job['id'])
+                since = job['finished_at']
+        except Exception as e:
+            print(f"Error notifying finished jobs: {e}")
+
+_job_notifier_started = False
+_job_notifier_lock = threading.Lock()
+
+def start_job_notifier():
+    global _job_notifier_started
+    with _job_notifier_lock:
+        if not _job_notifier_started:
+            socketio.start_background_task(notify_finished_jobs)
+            _job_notifier_started = True
+
+def alert_payload(alert):
+    return {'id': alert.id, 'user_id': alert.user_id, 'symbol': alert.stock_symbol,
+            'direction': alert.direction, 'threshold': alert.threshold,
+            'created_at': alert.created_at.isoformat() if alert.created_at else None,
+            'triggered_at': alert.triggered_at.isoformat() if alert.triggered_at else None,
+            'triggered_price': alert.triggered_price}
+
+def deliver_alerts(fired):
+    """Mark ``{alert_id: price}`` triggered and push each to its user's room
+
+    Each alert is claimed with a conditional UPDATE, so when more than one
+    process watches the same alerts only the one that flips
+    ``triggered_at`` delivers it.
+    """
+    now = datetime.utcnow()
+    with app.app_context():
+        claimed = []
+        for alert_id, price in fired.items():
+            price = round(float(price), 2)
+            updated = PriceAlert.query.filter(PriceAlert.id == alert_id, PriceAlert.triggered_at.is_(None)) \
+                .update({'triggered_at': now, 'triggered_price': price}, synchronize_session=False)
+            if updated:
+                claimed.append(alert_id)
+        db.session.commit()
+        for row in PriceAlert.query.filter(PriceAlert.id.in_(claimed)).all() if claimed else ():
+            socketio.emit('price_alert', alert_payload(row), to=room_for_user(row.user_id))
+
+def watch_alerts(interval=None):
+    """Check waiting alerts against fresh quotes once per quote TTL
+
+    One batched quote request covers every symbol with a waiting alert, and
+    each price only visits the alerts it crosses.
+    """
+    interval = interval or fetcher.ttls['quote']
+    while True:
+        try:
+            symbols = alert_engine.symbols()
+            if symbols:
+                quotes = fetcher.get_many(symbols)
+                fired = {}
+                for symbol, price in zip(quotes['symbols'], quotes['price']):
+                    if not np.isnan(price):
+                        for alert_id in alert_engine.match(symbol, price):
+                            fired[alert_id] = price
+                if fired:
+                    deliver_alerts(fired)
+        except Exception as e:
+            print(f"Error checking price alerts: {e}")
+        socketio.sleep(interval)
+
+_alert_monitor_started = False
+_alert_monitor_lock = threading.Lock()
+
+def start_alert_monitor():
+    """Load waiting alerts from the database and start watching them, once per process"""
+    global _alert_monitor_started
+    with _alert_monitor_lock:
+        if not _alert_monitor_started:
+            with app.app_context():
+                alert_engine.load(db.session.query(PriceAlert.id, PriceAlert.stock_symbol,
+                                                   PriceAlert.direction, PriceAlert.threshold)
+                                  .filter(PriceAlert.triggered_at.is_(None)).all())
+            socketio.start_background_task(watch_alerts)
+            _alert_monitor_started = True
 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+    start_alert_monitor()
     socketio.run(app, debug=True, port=5000)
@@ -0,0 +1,152 @@
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+
+from offload import offload
+
+ARIMA_ORDER = (5, 1, 0)
+
+
+class ArimaStore:
+    """Fitted ARIMA results per symbol, kept warm across requests.
+
+    The first request for a symbol fits the model and pickles it to
+    ``<model_dir>/<SYMBOL>.arima.pkl``. Later requests extend the fitted
+    results with any new bars using the existing parameters (``append``),
+    or re-filter the whole window with them (``apply``) when the stored bars
+    were revised, then forecast. Full refits run in a background thread once
+    the model is ``refit_interval`` seconds old, ``refit_bars`` bars have
+    been appended, or recent one-step errors drift past ``drift_factor``
+    times the in-sample error. Fits, filtering and forecasts are offloaded
+    to real OS threads when the web worker's threads are green.
+    """
+
+    def __init__(self, model_dir=None, order=ARIMA_ORDER, refit_interval=7 * 24 * 3600,
+                 refit_bars=20, drift_factor=2.0, drift_window=10):
+        self.model_dir = model_dir or os.environ.get('MODEL_DIR', 'models')
+        self.order = order
+        self.refit_interval = refit_interval
+        self.refit_bars = refit_bars
+        self.drift_factor = drift_factor
+        self.drift_window = drift_window
+        self._entries = {}
+        self._refitting = set()
+        self._lock = threading.Lock()
+        self._symbol_locks = {}
+
+    def _path(self, symbol):
+        return os.path.join(self.model_dir, symbol.upper() + '.arima.pkl')
+
+    def _symbol_lock(self, symbol):
+        with self._lock:
+            return self._symbol_locks.setdefault(symbol.upper(), threading.Lock())
+
+    # Persistence
+    def _load(self, symbol):
+        entry = self._entries.get(symbol)
+        if entry is None and os.path.exists(self._path(symbol)):
+            try:
+                with open(self._path(symbol), 'rb') as f:
+                    entry = pickle.load(f)
+            except Exception as e:
+                print(f"Error loading ARIMA model for {symbol}: {e}")
+                entry = None
+            self._entries[symbol] = entry
+        return entry
+
+    def _save(self, symbol, entry):
+        self._entries[symbol] = entry
+        os.makedirs(self.model_dir, exist_ok=True)
+        tmp_path = f"{self._path(symbol)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(symbol))
+
+    # Fitting
+    def fit(self, symbol, series):
+        """Fit from scratch on ``series`` (a pandas Series indexed by bar timestamp)"""
+        # Unpickling stored results imports statsmodels on its own; only a
+        # fresh fit needs it here
+        from statsmodels.tsa.arima.model import ARIMA
+
+        values = np.asarray(series, dtype=float)
+        results = offload(ARIMA(values, order=self.order).fit)
+        entry = {
+            'results': results,
+            'last_timestamp': series.index[-1],
+            'last_value': values[-1],
+            'fitted_at': time.time(),
+            'bars_since_fit': 0,
+            'resid_std': float(np.std(results.resid[self.order[1]:])),
+        }
+        with self._symbol_lock(symbol):
+            self._save(symbol.upper(), entry)
+        return entry
+
+    def _refit_in_background(self, symbol, series):
+        with self._lock:
+            if symbol in self._refitting:
+                return
+            self._refitting.add(symbol)
+
+        def run():
+            try:
+                self.fit(symbol, series)
+            except Exception as e:
+                print(f"Error refitting ARIMA model for {symbol}: {e}")
+            finally:
+                with self._lock:
+                    self._refitting.discard(symbol)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _update(self, symbol, entry, series):
+        """Bring the fitted results up to the end of ``series`` without re-estimating"""
+        results = entry['results']
+        new = series[series.index > entry['last_timestamp']]
+        stored = series[series.index <= entry['last_timestamp']]
+        revised = len(stored) == 0 or not np.isclose(stored.iloc[-1], entry['last_value'])
+
+        if revised:
+            # The last bar we saw was partial or history was adjusted; re-run
+            # the filter over the current window with the fitted parameters.
+            results = offload(results.apply, np.asarray(series, dtype=float))
+        elif len(new) > 0:
+            results = offload(results.append, np.asarray(new, dtype=float))
+        else:
+            return entry
+
+        entry = dict(entry, results=results, last_timestamp=series.index[-1],
+                     last_value=float(series.iloc[-1]),
+                     bars_since_fit=entry['bars_since_fit'] + len(new))
+        self._save(symbol, entry)
+        return entry
+
+    def _needs_refit(self, entry):
+        if time.time() - entry['fitted_at'] > self.refit_interval:
+            return True
+        if entry['bars_since_fit'] >= self.refit_bars:
+            return True
+        if entry['bars_since_fit'] == 0 or entry['resid_std'] == 0:
+            return False
+        # One-step-ahead errors on the bars appended since the last fit
+        recent = entry['results'].resid[-min(self.drift_window, entry['bars_since_fit']):]
+        return np.sqrt(np.mean(np.square(recent))) > self.drift_factor * entry['resid_std']
+
+    def forecast(self, symbol, series, steps=1):
+        """Forecast ``steps`` bars past the end of ``series``"""
+        symbol = symbol.upper()
+        with self._symbol_lock(symbol):
+            entry = self._load(symbol)
+            if entry is not None:
+                entry = self._update(symbol, entry, series)
+
+        if entry is None:
+            entry = self.fit(symbol, series)
+        elif self._needs_refit(entry):
+            self._refit_in_background(symbol, series)
+
+        return np.asarray(offload(entry['results'].forecast, steps=steps))
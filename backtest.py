@@ -0,0 +1,285 @@
+"""Walk-forward backtests of the prediction models.
+
+Each fold trains on the bars up to an origin and forecasts the next
+``max(horizons)`` bars: ARIMA from one fit per fold, the other models
+recursively, feeding each prediction back in as the latest bar. Scores are MAPE, RMSE and directional accuracy (how often the
+forecast moves the same way from the last close as the actual price) per
+symbol, model and horizon. Symbol x model x fold tasks are spread over a
+low-priority process pool, and results are stored in SQLite for the web
+app to serve as each model's accuracy.
+
+Usage: python backtest.py [SYMBOL ...] [--folds N] [--horizons 1,5] [--processes N]
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from local_db import ThreadConnections
+from predictors import MODELS, model_registry
+from arima_models import ARIMA_ORDER
+from windowing import LOOKBACK
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS backtests (
+    symbol TEXT NOT NULL,
+    model TEXT NOT NULL,
+    horizon INTEGER NOT NULL,
+    mape REAL,
+    rmse REAL,
+    direction REAL,
+    folds INTEGER NOT NULL,
+    last_bar TEXT NOT NULL,
+    computed_at REAL NOT NULL,
+    PRIMARY KEY (symbol, model, horizon)
+);
+"""
+
+DEFAULT_FOLDS = 20
+DEFAULT_HORIZONS = (1, 5)
+
+# The horizon whose directional accuracy is served as a model's accuracy
+ACCURACY_HORIZON = 1
+
+# Models whose cold path (symbol=None) is the model that serves
+# predictions. ARIMA and the linear trend refit on the data they are
+# given, and running them cold leaves their warm per-symbol state alone.
+BACKTESTED_MODELS = ('ARIMA', 'Linear Regression')
+
+
+def backtested_models(symbol, registry=None):
+    """Models a backtest can score as served for ``symbol``
+
+    LSTM counts only while no trained model file serves the symbol: its
+    predictions are then the drift fallback, which the cold path replays
+    exactly. A trained model is fitted once on the full history, so
+    scoring it on earlier folds would let it see its targets.
+    """
+    if (registry or model_registry).version(symbol) == 'none':
+        return BACKTESTED_MODELS + ('LSTM',)
+    return BACKTESTED_MODELS
+
+
+# Backtests run beside the web process, so by default they take half the
+# cores at low priority
+BACKTEST_PROCESSES = int(os.environ.get('BACKTEST_PROCESSES', max(1, (os.cpu_count() or 2) // 2)))
+BACKTEST_NICENESS = 10
+
+
+def fold_origins(n_bars, folds=DEFAULT_FOLDS, horizons=DEFAULT_HORIZONS, min_train=LOOKBACK + 1):
+    """Bar indexes where each fold's training data ends, oldest first
+
+    Origins are ``max(horizons)`` bars apart so fold targets don't overlap,
+    and the last one leaves room for the longest horizon.
+    """
+    step = max(horizons)
+    last = n_bars - step
+    origins = last - step * np.arange(folds)[::-1]
+    return origins[origins >= min_train]
+
+
+def forecast_path(name, history, steps):
+    """``steps`` forecasts of model ``name`` from ``history`` alone
+
+    ARIMA is fitted once and forecasts every step from that fit; the other
+    models are cheap to rerun and predict one bar at a time, each
+    prediction fed back in as the latest bar.
+    """
+    series = np.asarray(history, dtype=float)
+    if name == 'ARIMA':
+        try:
+            from statsmodels.tsa.arima.model import ARIMA
+            return [float(value) for value in ARIMA(series, order=ARIMA_ORDER).fit().forecast(steps=steps)]
+        except Exception:
+            pass  # the recursive path below falls back as predict_with_arima does
+
+    model = MODELS[name]
+    path = []
+    for _ in range(steps):
+        prediction, _ = model(series, None)
+        path.append(float(prediction))
+        series = np.append(series, prediction)
+    return path
+
+
+def score(actual, predicted, last):
+    """MAPE (%), RMSE and directional accuracy (%) of ``predicted`` against ``actual``
+
+    ``last`` is the close each forecast was made from.
+    """
+    actual, predicted, last = (np.asarray(values, dtype=float) for values in (actual, predicted, last))
+    valid = np.isfinite(actual) & np.isfinite(predicted) & np.isfinite(last)
+    if not valid.any():
+        return {'mape': None, 'rmse': None, 'direction': None, 'folds': 0}
+    actual, predicted, last = actual[valid], predicted[valid], last[valid]
+    errors = predicted - actual
+    return {
+        'mape': float(np.mean(np.abs(errors) / np.abs(actual)) * 100),
+        'rmse': float(np.sqrt(np.mean(errors ** 2))),
+        'direction': float(np.mean(np.sign(predicted - last) == np.sign(actual - last)) * 100),
+        'folds': int(valid.sum()),
+    }
+
+
+def run_backtests(series_by_symbol, models=None, folds=DEFAULT_FOLDS, horizons=DEFAULT_HORIZONS, processes=None):
+    """Backtest ``models`` on each symbol's close series across ``processes`` cores
+
+    ``models`` defaults to ``backtested_models`` of each symbol. Returns
+    ``{symbol: {model: {horizon: scores}}}``. A failed task leaves its fold
+    out of the scores.
+    """
+    models_by_symbol = {symbol: list(models or backtested_models(symbol)) for symbol in series_by_symbol}
+    steps = max(horizons)
+    tasks = {}
+    # Spawned workers import only the model code, as in ModelRunner
+    with ProcessPoolExecutor(max_workers=processes or BACKTEST_PROCESSES,
+                             mp_context=multiprocessing.get_context('spawn'),
+                             initializer=os.nice, initargs=(BACKTEST_NICENESS,)) as pool:
+        for symbol, series in series_by_symbol.items():
+            series = np.asarray(series, dtype=float)
+            for origin in fold_origins(len(series), folds, horizons):
+                for name in models_by_symbol[symbol]:
+                    future = pool.submit(forecast_path, name, series[:origin], steps)
+                    tasks[future] = (symbol, name, origin)
+
+        paths = {}
+        for future, (symbol, name, origin) in tasks.items():
+            try:
+                paths.setdefault((symbol, name), []).append((origin, future.result()))
+            except Exception as e:
+                print(f"Error backtesting {name} on {symbol} at bar {origin}: {e}")
+
+    results = {}
+    for symbol, series in series_by_symbol.items():
+        series = np.asarray(series, dtype=float)
+        for name in models_by_symbol[symbol]:
+            runs = paths.get((symbol, name), [])
+            origins = np.array([origin for origin, _ in runs], dtype=int)
+            predicted = np.array([path for _, path in runs], dtype=float).reshape(len(runs), steps)
+            results.setdefault(symbol, {})[name] = {
+                horizon: score(series[origins + horizon - 1], predicted[:, horizon - 1], series[origins - 1])
+                for horizon in horizons
+            }
+    return results
+
+
+class BacktestStore:
+    """Latest backtest scores per symbol, model and horizon, in a SQLite file shared by every process"""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('BACKTEST_PATH', os.path.join('data', 'backtests.sqlite3'))
+        self.connections = ThreadConnections(self.path, SCHEMA)
+
+    def save(self, symbol, last_bar, results):
+        """Replace ``symbol``'s scores with ``{model: {horizon: scores}}`` measured up to ``last_bar``"""
+        now = time.time()
+        rows = [(symbol.upper(), name, int(horizon), scores['mape'], scores['rmse'], scores['direction'],
+                 scores['folds'], str(last_bar), now)
+                for name, by_horizon in results.items() for horizon, scores in by_horizon.items()]
+        conn = self.connections.get()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM backtests WHERE symbol = ?', (symbol.upper(),))
+            conn.executemany('INSERT INTO backtests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def results(self, symbol):
+        """``{model: {horizon: scores}}`` for ``symbol``, with when and up to which bar; None if never run"""
+        rows = self.connections.get().execute(
+            'SELECT model, horizon, mape, rmse, direction, folds, last_bar, computed_at '
+            'FROM backtests WHERE symbol = ? ORDER BY model, horizon', (symbol.upper(),)).fetchall()
+        if not rows:
+            return None
+        models = {}
+        for name, horizon, mape, rmse, direction, folds, _, _ in rows:
+            models.setdefault(name, {})[horizon] = {'mape': mape, 'rmse': rmse, 'direction': direction,
+                                                    'folds': folds}
+        return {'symbol': symbol.upper(), 'models': models, 'last_bar': rows[0][6], 'computed_at': rows[0][7]}
+
+    def last_bar(self, symbol):
+        row = self.connections.get().execute('SELECT MAX(last_bar) FROM backtests WHERE symbol = ?',
+                                      (symbol.upper(),)).fetchone()
+        return row[0]
+
+    def accuracy(self, symbol, horizon=ACCURACY_HORIZON, registry=None):
+        """``(directional accuracy %, basis)`` per model for ``symbol``
+
+        The basis is 'symbol' for the symbol's own backtest, 'average' for
+        the model's average over every backtested symbol when this one has
+        none, and None (with no value) when there is nothing to go on,
+        including for an LSTM served from a trained model file.
+        """
+        conn = self.connections.get()
+        overall = dict(conn.execute(
+            'SELECT model, AVG(direction) FROM backtests WHERE horizon = ? GROUP BY model', (horizon,)))
+        own = dict(conn.execute('SELECT model, direction FROM backtests WHERE symbol = ? AND horizon = ?',
+                                (symbol.upper(), horizon)))
+        scored = backtested_models(symbol, registry)
+        accuracy = {}
+        for name in MODELS:
+            if name not in scored:
+                accuracy[name] = (None, None)
+            elif own.get(name) is not None:
+                accuracy[name] = (own[name], 'symbol')
+            elif overall.get(name) is not None:
+                accuracy[name] = (overall[name], 'average')
+            else:
+                accuracy[name] = (None, None)
+        return accuracy
+
+
+def refresh(fetcher, symbols, store=None, period='2y', force=False, **options):
+    """Backtest every symbol whose stored scores predate its latest bar (all with ``force``); returns those symbols"""
+    store = store or BacktestStore()
+    series = {}
+    last_bars = {}
+    for symbol in symbols:
+        data = fetcher.get_stock_data(symbol, period=period)
+        if data is None or data['historical_data'].empty:
+            continue
+        close = data['historical_data']['Close']
+        last_bars[symbol] = close.index[-1].isoformat()
+        if force or store.last_bar(symbol) != last_bars[symbol]:
+            series[symbol] = close.to_numpy(dtype=float)
+    if not series:
+        return []
+
+    for symbol, results in run_backtests(series, **options).items():
+        store.save(symbol, last_bars[symbol], results)
+    return list(series)
+
+
+if __name__ == '__main__':
+    from utils import StockDataFetcher
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('symbols', nargs='*')
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS)
+    parser.add_argument('--horizons', default=','.join(map(str, DEFAULT_HORIZONS)))
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='rerun symbols already scored up to their last bar')
+    args = parser.parse_args()
+
+    symbols = [symbol.upper() for symbol in args.symbols] or \
+        [s.strip().upper() for s in os.environ.get('PREDICTION_WATCHLIST', 'AAPL,GOOGL,MSFT,TSLA,AMZN').split(',')
+         if s.strip()]
+    horizons = tuple(int(h) for h in args.horizons.split(','))
+    store = BacktestStore()
+    started = time.time()
+    done = refresh(StockDataFetcher(), symbols, store, force=args.force, folds=args.folds, horizons=horizons,
+                   processes=args.processes)
+    print(f"Backtested {len(done)} symbols in {time.time() - started:.1f}s")
+    for symbol in done:
+        for name, by_horizon in store.results(symbol)['models'].items():
+            for horizon, scores in by_horizon.items():
+                if not scores['folds']:
+                    print(f"  {symbol:<6} {name:<18} h={horizon}  no completed folds")
+                    continue
+                print(f"  {symbol:<6} {name:<18} h={horizon}  MAPE {scores['mape']:6.2f}%  "
+                      f"RMSE {scores['rmse']:8.2f}  direction {scores['direction']:5.1f}%")
@@ -0,0 +1,420 @@
+"""Micro-benchmarks for the data and model pipelines.
+
+Run ``python benchmarks.py`` for all of them or ``python benchmarks.py <name>``
+for one.
+"""
+import os
+import subprocess
+import sys
+import time
+import timeit
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from import_budget import ML_BACKENDS
+from alerts import AlertEngine
+from indicators import compute_indicators
+from risk import EwmaCovariance, RiskModel
+from rollups import RollupTracker, downsample
+from windowing import make_windows
+from wire import json_columns, history_columns, msgpack, pa
+
+
+def _report(name, seconds, number):
+    print(f"  {name:<28} {seconds / number * 1e3:10.3f} ms")
+
+
+def bench_windowing(n_bars=504, n_symbols=500, lookback=60):
+    """LSTM input windows: Python loop + np.array copy vs strided views"""
+    rng = np.random.default_rng(0)
+    series = [rng.random((n_bars, 1)) for _ in range(n_symbols)]
+
+    def loop():
+        for scaled_data in series:
+            X, y = [], []
+            for i in range(lookback, len(scaled_data)):
+                X.append(scaled_data[i - lookback:i, 0])
+                y.append(scaled_data[i, 0])
+            X, y = np.array(X), np.array(y)
+            X = X.reshape((X.shape[0], X.shape[1], 1))
+
+    def strided():
+        for scaled_data in series:
+            make_windows(scaled_data, lookback)
+
+    print(f"windowing: {n_symbols} symbols x {n_bars} bars, lookback {lookback}")
+    number = 3
+    loop_time = timeit.timeit(loop, number=number)
+    strided_time = timeit.timeit(strided, number=number)
+    _report('python loop', loop_time, number)
+    _report('sliding_window_view', strided_time, number)
+    print(f"  speedup: {loop_time / strided_time:.1f}x")
+
+
+def bench_indicators(n_symbols=3000, n_bars=126):
+    """Indicators for a universe: one pandas pipeline per symbol vs one matrix pass"""
+    rng = np.random.default_rng(0)
+    prices = 100 + np.cumsum(rng.normal(size=(n_symbols, n_bars)), axis=1)
+
+    def per_symbol():
+        for row in prices:
+            close = pd.Series(row)
+            close.rolling(window=20).mean()
+            close.rolling(window=50).mean()
+            close.ewm(span=12).mean()
+            close.ewm(span=26).mean()
+            delta = close.diff()
+            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+            100 - (100 / (1 + gain / loss))
+
+    print(f"indicators: {n_symbols} symbols x {n_bars} bars")
+    number = 1
+    pandas_time = timeit.timeit(per_symbol, number=number)
+    matrix_time = timeit.timeit(lambda: compute_indicators(prices), number=number)
+    _report('pandas per symbol', pandas_time, number)
+    _report('vectorized matrix', matrix_time, number)
+    print(f"  speedup: {pandas_time / matrix_time:.1f}x")
+
+
+def bench_wire(n_bars=252):
+    """historical_data encodings: bytes on the wire and time to serialize"""
+    rng = np.random.default_rng(0)
+    index = pd.date_range('2024-01-02', periods=n_bars, freq='B', tz='America/New_York', name='Date')
+    close = 150 + np.cumsum(rng.normal(size=n_bars))
+    hist = pd.DataFrame({
+        'Open': close + rng.normal(size=n_bars), 'High': close + 2, 'Low': close - 2, 'Close': close,
+        'Volume': rng.integers(10_000_000, 90_000_000, size=n_bars),
+        'Dividends': 0.0, 'Stock Splits': 0.0,
+    }, index=index)
+
+    def records():
+        return json.dumps(hist.reset_index().to_dict('records'), default=str).encode()
+
+    def columnar():
+        return json.dumps(json_columns(history_columns(hist))).encode()
+
+    encoders = {'records (json)': records, 'columnar (json)': columnar}
+    if msgpack is not None:
+        encoders['columnar (msgpack)'] = lambda: msgpack.packb(
+            {name: values.tobytes() for name, values in history_columns(hist).items()}, use_bin_type=True)
+    if pa is not None:
+        def arrow():
+            table = pa.table({name: pa.array(values) for name, values in history_columns(hist).items()})
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return sink.getvalue().to_pybytes()
+        encoders['columnar (arrow)'] = arrow
+
+    print(f"wire: {n_bars} daily bars")
+    number = 200
+    for name, encode in encoders.items():
+        seconds = timeit.timeit(encode, number=number)
+        print(f"  {name:<28} {seconds / number * 1e3:10.3f} ms {len(encode()):10,d} bytes")
+
+
+def bench_charts(n_years=10, points=120):
+    """Chart payload for a long range: every daily bar vs rollups and LTTB"""
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range(end='2025-06-30', periods=252 * n_years, tz='America/New_York', name='Date')
+    close = 150 + np.cumsum(rng.normal(size=len(index)))
+    hist = pd.DataFrame({
+        'Open': close, 'High': close + 2, 'Low': close - 2, 'Close': close,
+        'Volume': rng.integers(10_000_000, 90_000_000, size=len(index)),
+    }, index=index)
+    tracker = RollupTracker()
+    tracker.get('BENCH', hist, '1wk')
+
+    variants = {
+        'daily, all bars': lambda: hist,
+        'daily, lttb': lambda: downsample(hist, points),
+        'weekly rollup, lttb': lambda: downsample(tracker.get('BENCH', hist, '1wk'), points),
+        'monthly rollup': lambda: tracker.get('BENCH', hist, '1mo'),
+    }
+
+    print(f"charts: {n_years}y of daily bars, points={points}")
+    number = 50
+    for name, build in variants.items():
+        seconds = timeit.timeit(lambda: json.dumps(json_columns(history_columns(build()))), number=number)
+        body = json.dumps(json_columns(history_columns(build()))).encode()
+        print(f"  {name:<28} {seconds / number * 1e3:10.3f} ms {len(build()):6d} bars {len(body):10,d} bytes")
+
+
+STARTUP_PROBE = """
+import importlib, resource, sys, time
+start = time.perf_counter()
+for name in {preload!r}:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass
+import app
+response = app.app.test_client().get('/api/jobs/startup-probe')
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, response.status_code)
+"""
+
+
+def bench_startup(repeat=3):
+    """Time to first request and peak RSS of a fresh worker, with and without the ML stack"""
+    variants = {
+        'lazy backends': (),
+        'ML stack at import': ML_BACKENDS,
+    }
+    print("startup: import app, then serve one request, in a fresh interpreter")
+    for name, preload in variants.items():
+        runs = []
+        for _ in range(repeat):
+            completed = subprocess.run([sys.executable, '-c', STARTUP_PROBE.format(preload=preload)],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       capture_output=True, text=True, check=True)
+            elapsed, max_rss_kb, _ = completed.stdout.split()[-3:]
+            runs.append((float(elapsed), int(max_rss_kb)))
+        elapsed = sorted(run[0] for run in runs)[len(runs) // 2]
+        rss = max(run[1] for run in runs) / 1024
+        print(f"  {name:<28} {elapsed * 1e3:10.0f} ms to first response {rss:10.0f} MB RSS")
+
+
+def _children(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        children.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    return children
+
+
+def _memory_kb(pid):
+    """(RSS, PSS) in kB; PSS splits each shared page between the processes mapping it"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if name in ('Rss', 'Pss'):
+                values[name] = int(rest.split()[0])
+    return values['Rss'], values['Pss']
+
+
+def bench_workers(worker_counts=(1, 2, 4, 8), probe='/api/jobs/memory-probe'):
+    """Total gunicorn memory against worker count, with and without preload (Linux only)"""
+    import socket
+    import urllib.error
+    import urllib.request
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    print(f"workers: gunicorn master + workers after {probe} warm-up, memory summed over processes")
+    for preload in ('0', '1'):
+        for count in worker_counts:
+            with socket.socket() as s:
+                s.bind(('127.0.0.1', 0))
+                port = s.getsockname()[1]
+            server = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--workers', str(count),
+                 '--bind', f'127.0.0.1:{port}', 'app:app'],
+                cwd=root, env=dict(os.environ, GUNICORN_PRELOAD=preload, GUNICORN_WORKER_CLASS='sync',
+                                    WEB_API_ONLY='1'),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                deadline = time.monotonic() + 60
+                while time.monotonic() < deadline:
+                    try:
+                        urllib.request.urlopen(f'http://127.0.0.1:{port}{probe}', timeout=2)
+                    except urllib.error.HTTPError:
+                        pass
+                    except OSError:
+                        time.sleep(0.2)
+                        continue
+                    if len(_children(server.pid)) >= count:
+                        break
+                # Give every worker a few requests
+                for _ in range(count * 4):
+                    try:
+                        urllib.request.urlopen(f'http://127.0.0.1:{port}{probe}', timeout=2)
+                    except urllib.error.HTTPError:
+                        pass
+                time.sleep(1)
+                pids = [server.pid] + _children(server.pid)
+                rss, pss = map(sum, zip(*(_memory_kb(pid) for pid in pids)))
+                label = 'preload' if preload == '1' else 'no preload'
+                print(f"  {label:<12} {count:3d} workers {rss / 1024:10.0f} MB RSS {pss / 1024:10.0f} MB PSS")
+            finally:
+                server.terminate()
+                server.wait()
+
+
+def bench_predictions(n_rows=1_000_000, n_symbols=50, depth=10_000, limit=50):
+    """Prediction history queries on a fresh SQLite database of ``n_rows`` predictions"""
+    import tempfile
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import text
+
+    directory = tempfile.mkdtemp(prefix='bench-predictions-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'predictions.sqlite3')}"
+    from app import app, db, Prediction
+    from predictors import MODELS
+    from queries import bulk_insert, encode_cursor, keyset_page
+
+    models = list(MODELS)
+    rng = np.random.default_rng(0)
+    start = datetime(2020, 1, 1)
+    with app.app_context():
+        db.create_all()
+        began = time.perf_counter()
+        for offset in range(0, n_rows, 100_000):
+            count = min(100_000, n_rows - offset)
+            prices = rng.uniform(10, 500, count)
+            bulk_insert(db, Prediction, [
+                {
+                    'stock_symbol': f'SYM{(offset + i) % n_symbols:03d}',
+                    'model_type': models[(offset + i) % len(models)],
+                    'predicted_price': float(prices[i]),
+                    'confidence': 0.8,
+                    'prediction_date': start + timedelta(minutes=offset + i),
+                    'target_date': start + timedelta(days=1, minutes=offset + i),
+                }
+                for i in range(count)
+            ])
+        seeded = time.perf_counter() - began
+        print(f"predictions: {n_rows:,} rows, {n_symbols} symbols, seeded in {seeded:.1f}s "
+              f"({n_rows / seeded:,.0f} rows/s)")
+
+        query = Prediction.query.filter_by(stock_symbol='SYM007')
+        order = [Prediction.prediction_date.desc(), Prediction.id.desc()]
+        boundary = query.order_by(*order).offset(depth - 1).first()
+        cursor = encode_cursor([boundary.prediction_date, boundary.id])
+        columns = [Prediction.prediction_date, Prediction.id]
+
+        def latest():
+            return [query.filter_by(model_type=name).order_by(Prediction.prediction_date.desc()).first()
+                    for name in models]
+
+        def offset_page():
+            return query.order_by(*order).offset(depth).limit(limit).all()
+
+        def keyset():
+            return keyset_page(query, columns, cursor=cursor, limit=limit, descending=True)
+
+        assert [row.id for row in offset_page()] == [row.id for row in keyset()[0]]
+        plan = db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM prediction WHERE stock_symbol = 'SYM007' "
+            "ORDER BY prediction_date DESC, id DESC LIMIT 50")).fetchall()
+        print(f"  plan: {plan[-1][-1]}")
+
+        def run(label):
+            for name, fn in (('latest per model', latest), (f'OFFSET {depth:,}', offset_page),
+                             (f'keyset at {depth:,}', keyset)):
+                number = 20
+                seconds = timeit.timeit(fn, number=number)
+                print(f"  {label:<12} {name:<24} {seconds / number * 1e3:10.3f} ms")
+
+        run('indexed')
+        db.session.execute(text('DROP INDEX ix_prediction_symbol_date'))
+        db.session.execute(text('DROP INDEX ix_prediction_symbol_model_date'))
+        db.session.commit()
+        run('no indexes')
+
+
+def bench_risk(n_symbols=500, n_bars=504, held=300):
+    """EWMA covariance: refit from the full history vs one rank-1 update per new bar"""
+    rng = np.random.default_rng(0)
+    symbols = [f'S{i:03d}' for i in range(n_symbols)]
+    returns = rng.normal(0, 0.01, size=(n_symbols, n_bars))
+    model = EwmaCovariance(symbols)
+    model.fit(returns[:, :-1])
+
+    print(f"risk: {n_symbols} symbols x {n_bars} bars, {held} held")
+    number = 20
+    refit_time = timeit.timeit(lambda: EwmaCovariance(symbols).fit(returns), number=number)
+    update_time = timeit.timeit(lambda: model.update(returns[:, -1]), number=number)
+    _report('refit full history', refit_time, number)
+    _report('rank-1 update', update_time, number)
+    print(f"  speedup: {refit_time / update_time:.1f}x")
+
+    risk = RiskModel()
+    risk.model = model
+    exposures = rng.uniform(1e3, 1e5, size=held)
+    report_time = timeit.timeit(lambda: risk.report(symbols[:held], exposures), number=number)
+    _report(f'report ({held} names)', report_time, number)
+
+
+def bench_alerts(n_alerts=1_000_000, n_symbols=1000, n_ticks=20_000):
+    """Price alerts: scanning each symbol's alert list per tick vs sorted books"""
+    rng = np.random.default_rng(0)
+    symbols = [f'S{i:04d}' for i in range(n_symbols)]
+    alert_symbols = rng.integers(0, n_symbols, n_alerts)
+    directions = np.where(rng.random(n_alerts) < 0.5, 'above', 'below')
+    # Thresholds within +-20% of a starting price of 100
+    thresholds = np.where(directions == 'above', 100 * (1 + rng.uniform(0, 0.2, n_alerts)),
+                          100 * (1 - rng.uniform(0, 0.2, n_alerts)))
+    rows = list(zip(range(n_alerts), [symbols[i] for i in alert_symbols], directions.tolist(), thresholds.tolist()))
+
+    tick_symbols = rng.integers(0, n_symbols, n_ticks)
+    walks = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(n_symbols, n_ticks // n_symbols * 2 + 1)), axis=1))
+    step = np.zeros(n_symbols, dtype=int)
+    ticks = []
+    for i in tick_symbols:
+        ticks.append((symbols[i], float(walks[i, step[i]])))
+        step[i] += 1
+
+    print(f"alerts: {n_alerts} alerts on {n_symbols} symbols, {n_ticks} ticks")
+    start = time.perf_counter()
+    engine = AlertEngine()
+    engine.load(rows)
+    _report('load sorted books', time.perf_counter() - start, 1)
+
+    lists = {}
+    for alert_id, symbol, direction, threshold in rows:
+        lists.setdefault(symbol, []).append((alert_id, direction, threshold))
+
+    def scan():
+        fired = 0
+        for symbol, price in ticks:
+            waiting = lists[symbol]
+            kept = [alert for alert in waiting
+                    if not (alert[2] <= price if alert[1] == 'above' else alert[2] >= price)]
+            fired += len(waiting) - len(kept)
+            lists[symbol] = kept
+        return fired
+
+    def books():
+        return sum(len(engine.match(symbol, price)) for symbol, price in ticks)
+
+    start = time.perf_counter()
+    scan_fired = scan()
+    scan_time = time.perf_counter() - start
+    start = time.perf_counter()
+    book_fired = books()
+    book_time = time.perf_counter() - start
+    assert scan_fired == book_fired
+    print(f"  fired {book_fired} alerts")
+    _report('scan per tick', scan_time, n_ticks)
+    _report('bisect books per tick', book_time, n_ticks)
+    print(f"  speedup: {scan_time / book_time:.1f}x")
+
+
+BENCHMARKS = {
+    'windowing': bench_windowing,
+    'indicators': bench_indicators,
+    'wire': bench_wire,
+    'charts': bench_charts,
+    'startup': bench_startup,
+    'workers': bench_workers,
+    'predictions': bench_predictions,
+    'risk': bench_risk,
+    'alerts': bench_alerts,
+}
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+
+import numpy as np
+from flask_socketio import join_room, leave_room
+
+from history_store import SYMBOL_PATTERN
+
+# Every subscribed symbol is polled upstream each interval, so one client
+# may only hold this many
+MAX_CLIENT_SYMBOLS = int(os.environ.get('MAX_CLIENT_SYMBOLS', 50))
+
+
+def room_for(symbol):
+    return f"stock:{symbol.upper()}"
+
+
+class PriceBroadcaster:
+    """Pushes price updates to Socket.IO rooms, one room per subscribed symbol.
+
+    A single background loop polls upstream once per ``interval`` for every
+    symbol that has at least one subscriber, using one batched quote request,
+    and emits to the symbol's room only when the price has changed. Clients
+    therefore get at most one update per symbol per interval however many of
+    them subscribe, and a symbol stops being polled when its last subscriber
+    leaves. The loop exits once nothing is subscribed. Symbols must look
+    like tickers, and each client holds at most ``max_client_symbols``.
+    """
+
+    def __init__(self, socketio, fetcher, interval=None, max_client_symbols=MAX_CLIENT_SYMBOLS):
+        self.socketio = socketio
+        self.fetcher = fetcher
+        self.max_client_symbols = max_client_symbols
+        # Polling faster than the quote cache TTL would only re-read the cache
+        self.interval = interval or fetcher.ttls['quote']
+        self.subscribers = {}  # symbol -> set of sids
+        self.client_symbols = {}  # sid -> set of symbols
+        self.last_prices = {}
+        self._running = False
+        self._lock = threading.Lock()
+
+    def subscribe(self, sid, symbol):
+        """Add ``sid`` to the symbol's room; returns the last broadcast price, if any
+
+        Raises ValueError for a malformed symbol or a client already at its limit.
+        """
+        symbol = symbol.strip().upper() if isinstance(symbol, str) else ''
+        if not SYMBOL_PATTERN.match(symbol):
+            raise ValueError(f"Invalid symbol: {symbol!r}")
+        with self._lock:
+            held = self.client_symbols.get(sid, ())
+            if symbol not in held and len(held) >= self.max_client_symbols:
+                raise ValueError(f"At most {self.max_client_symbols} subscribed symbols per client")
+            self.subscribers.setdefault(symbol, set()).add(sid)
+            self.client_symbols.setdefault(sid, set()).add(symbol)
+            last_price = self.last_prices.get(symbol)
+            start = not self._running
+            self._running = True
+        join_room(room_for(symbol), sid=sid)
+        if start:
+            self.socketio.start_background_task(self._poll)
+        return last_price
+
+    def unsubscribe(self, sid, symbol):
+        symbol = str(symbol).strip().upper()
+        leave_room(room_for(symbol), sid=sid)
+        with self._lock:
+            self._remove(sid, symbol)
+
+    def disconnect(self, sid):
+        """Drop every subscription of a disconnected client"""
+        with self._lock:
+            for symbol in list(self.client_symbols.get(sid, ())):
+                self._remove(sid, symbol)
+
+    def _remove(self, sid, symbol):
+        sids = self.subscribers.get(symbol)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self.subscribers[symbol]
+                self.last_prices.pop(symbol, None)
+        symbols = self.client_symbols.get(sid)
+        if symbols is not None:
+            symbols.discard(symbol)
+            if not symbols:
+                del self.client_symbols[sid]
+
+    def _poll(self):
+        while True:
+            with self._lock:
+                symbols = list(self.subscribers)
+                if not symbols:
+                    self._running = False
+                    return
+            try:
+                self._publish(symbols)
+            except Exception as e:
+                print(f"Error broadcasting prices: {e}")
+            self.socketio.sleep(self.interval)
+
+    def _publish(self, symbols):
+        quotes = self.fetcher.get_many(symbols)
+        for symbol, price, prev_close in zip(quotes['symbols'], quotes['price'], quotes['prev_close']):
+            if np.isnan(price):
+                continue
+            with self._lock:
+                if symbol not in self.subscribers or self.last_prices.get(symbol) == price:
+                    continue
+                self.last_prices[symbol] = price
+
+            update = {'symbol': symbol, 'price': round(float(price), 2), 'timestamp': time.time()}
+            if not np.isnan(prev_close):
+                update['change'] = round(float(price - prev_close), 2)
+                update['change_percent'] = round(float((price - prev_close) / prev_close * 100), 2)
+            indicators = self.fetcher.indicators.tick(symbol, price)
+            if indicators is not None:
+                update['indicators'] = {name: None if np.isnan(value) else round(float(value), 2)
+                                        for name, value in indicators.items()}
+            self.socketio.emit('stock_update', update, to=room_for(symbol))
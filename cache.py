@@ -0,0 +1,124 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def estimate_size(value):
+    """Rough size in bytes of a cached value"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTLs, bounded by total size in bytes.
+
+    ``get_or_load`` collapses concurrent misses for the same key into a single
+    call of the loader; the other callers wait for and share its result.
+    Cached values are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _pop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.monotonic():
+                self._pop(key)
+                return default
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def set(self, key, value, ttl):
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def get_or_load(self, key, loader, ttl):
+        """Return the cached value for ``key``, calling ``loader()`` at most once on a miss.
+
+        ``None`` results are handed back to every waiting caller but not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            if flight.value is not None:
+                self.set(key, flight.value, ttl)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.value
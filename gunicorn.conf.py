@@ -0,0 +1,74 @@
+# Gunicorn settings for the web process: gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+# Socket.IO (job pushes, price updates, alerts) keeps per-client sessions
+# and background loops in the web process, so the default is one eventlet
+# worker. Running more needs SOCKETIO_MESSAGE_QUEUE and a load balancer
+# with sticky sessions; WEB_API_ONLY=1 allows sync workers for a
+# deployment whose Socket.IO clients connect elsewhere. Eventlet turns
+# threads green, so model fits and predicts are offloaded to real OS
+# threads (offload.py) rather than run on the hub.
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'eventlet')
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+# Import the app once in the master and fork workers from it, so code,
+# imported libraries and warmed caches are shared copy-on-write. Off by
+# default: eventlet and gevent must monkey-patch before the app is
+# imported, which a preloading master cannot do.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '0').lower() in ('1', 'true', 'yes')
+
+API_ONLY = os.environ.get('WEB_API_ONLY', '0').lower() in ('1', 'true', 'yes')
+ASYNC_WORKERS = ('eventlet', 'gevent')
+
+# Map stored history instead of copying it, so all workers read one copy
+# from the page cache
+os.environ.setdefault('HISTORY_MMAP', '1')
+
+
+def on_starting(server):
+    worker_class_name = server.cfg.worker_class_str
+    if server.cfg.preload_app and worker_class_name in ASYNC_WORKERS:
+        raise RuntimeError(f"GUNICORN_PRELOAD needs sync workers; {worker_class_name} must patch "
+                           "the standard library before the app is imported")
+    if API_ONLY:
+        return
+    if worker_class_name not in ASYNC_WORKERS:
+        raise RuntimeError(f"Socket.IO needs an eventlet or gevent worker, not {worker_class_name}; "
+                           "set WEB_API_ONLY=1 if this deployment serves no Socket.IO clients")
+    if server.cfg.workers > 1 and not os.environ.get('SOCKETIO_MESSAGE_QUEUE'):
+        raise RuntimeError("More than one Socket.IO worker needs SOCKETIO_MESSAGE_QUEUE "
+                           "and sticky sessions at the load balancer")
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    import preload
+    from app import app, fetcher
+
+    preload.check_fork_safe()
+    warmed = preload.warm(fetcher, app.config['PREDICTION_WATCHLIST'])
+    preload.freeze()
+    server.log.info("Preloaded %d cached histories before forking workers", warmed)
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    import preload
+    from app import app, db, job_queue, sentiment_analyzer, backtest_store
+
+    preload.after_fork(app, db, job_queue, sentiment_analyzer.scorer, sentiment_analyzer.index, backtest_store)
+
+
+def post_worker_init(worker):
+    # Watch alerts already in the database from boot, rather than from the
+    # first new alert or watch_alerts event after a restart
+    from app import start_alert_monitor
+
+    try:
+        start_alert_monitor()
+    except Exception:
+        worker.log.exception("Could not start the price alert monitor; it starts with the next alert")
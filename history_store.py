@@ -0,0 +1,253 @@
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Columns returned by yf.Ticker(...).history(), stored one file per column
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+PERIOD_OFFSETS = {
+    '1d': pd.DateOffset(days=1),
+    '5d': pd.DateOffset(days=5),
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+
+# Ticker symbols as Yahoo Finance spells them (BRK-B, ^GSPC, EURUSD=X, RDS.A);
+# anything else is rejected before it becomes part of a path
+SYMBOL_PATTERN = re.compile(r'^[A-Z0-9^][A-Z0-9.=\-]{0,15}$')
+
+
+def period_covering(start, now=None):
+    """Shortest stored period whose window reaches back to ``start``"""
+    start = pd.Timestamp(start)
+    now = pd.Timestamp.now(tz=start.tz) if now is None else pd.Timestamp(now)
+    for period in ('1mo', '3mo', '6mo', '1y', '2y', '5y', '10y'):
+        if now - PERIOD_OFFSETS[period] <= start:
+            return period
+    return 'max'
+
+
+class HistoryStore:
+    """On-disk columnar store of daily OHLCV bars, one directory per symbol.
+
+    Each column is a flat little-endian float64 file (timestamps are int64
+    nanoseconds since the epoch, UTC) that only ever grows at the tail, so a
+    read of the last year touches only that slice of each file and a refresh
+    downloads just the bars missing since the last one stored.  ``meta.json``
+    holds the committed row count; bytes past it are ignored.
+
+    With ``mmap`` (or HISTORY_MMAP=1) reads map the column files instead of
+    copying them, so every process serving the same symbol shares one copy
+    in the page cache. Writes are arranged so mapped rows stay valid: a
+    refresh only rewrites bars from the last stored date on, never
+    shrinking a file, and a full re-download goes to new files that replace
+    the old ones, which existing mappings keep until released.
+    """
+
+    def __init__(self, root=None, refresh_after=900, info_refresh_after=86400, mmap=None):
+        self.root = root or os.environ.get('HISTORY_STORE_DIR', os.path.join('data', 'history'))
+        self.refresh_after = refresh_after
+        self.info_refresh_after = info_refresh_after
+        if mmap is None:
+            mmap = os.environ.get('HISTORY_MMAP', '0').lower() in ('1', 'true', 'yes')
+        self.mmap = mmap
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    # Paths and locking
+    def _symbol_dir(self, symbol):
+        symbol = symbol.upper()
+        if not SYMBOL_PATTERN.match(symbol):
+            raise ValueError(f"Invalid symbol: {symbol!r}")
+        return os.path.join(self.root, symbol)
+
+    def _column_path(self, symbol, column):
+        return os.path.join(self._symbol_dir(symbol), column.replace(' ', '_') + '.f8')
+
+    def _lock(self, symbol):
+        with self._locks_guard:
+            return self._locks.setdefault(symbol.upper(), threading.Lock())
+
+    def _file_lock(self, symbol):
+        os.makedirs(self._symbol_dir(symbol), exist_ok=True)
+        handle = open(os.path.join(self._symbol_dir(symbol), '.lock'), 'a')
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    # Metadata
+    def _read_json(self, symbol, name):
+        path = os.path.join(self._symbol_dir(symbol), name)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_json(self, symbol, name, payload):
+        path = os.path.join(self._symbol_dir(symbol), name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f, default=str)
+        os.replace(tmp_path, path)
+
+    def meta(self, symbol):
+        return self._read_json(symbol, 'meta.json')
+
+    # Reading
+    def _column(self, symbol, column, dtype, start, stop):
+        count = stop - start
+        if count <= 0:
+            return np.empty(0, dtype=dtype)
+        itemsize = np.dtype(dtype).itemsize
+        if self.mmap:
+            return np.memmap(self._column_path(symbol, column), dtype=dtype, mode='r',
+                             offset=start * itemsize, shape=(count,)).view(np.ndarray)
+        return np.fromfile(self._column_path(symbol, column), dtype=dtype, count=count, offset=start * itemsize)
+
+    def read(self, symbol, period=None):
+        """Return stored bars as a DataFrame shaped like ``Ticker.history``"""
+        meta = self.meta(symbol)
+        if not meta or meta['rows'] == 0:
+            return None
+
+        rows = meta['rows']
+        timestamps = self._column(symbol, 'Date', '<i8', 0, rows)
+        start = 0
+        last = pd.Timestamp(int(timestamps[-1]), tz='UTC').tz_convert(meta['tz'])
+        if period in PERIOD_OFFSETS:
+            cutoff = last - PERIOD_OFFSETS[period]
+            start = int(np.searchsorted(timestamps, cutoff.tz_convert('UTC').value, side='right'))
+        elif period == 'ytd':
+            cutoff = last.normalize().replace(month=1, day=1)
+            start = int(np.searchsorted(timestamps, cutoff.tz_convert('UTC').value, side='left'))
+
+        index = pd.DatetimeIndex(pd.to_datetime(timestamps[start:], utc=True), name='Date')
+        index = index.tz_convert(meta['tz'])
+        data = {column: self._column(symbol, column, '<f8', start, rows) for column in COLUMNS}
+        data['Volume'] = data['Volume'].astype(np.int64)
+        # copy=False keeps mapped columns as views rather than one consolidated block
+        return pd.DataFrame(data, index=index, copy=False)
+
+    # Writing
+    def _write(self, symbol, hist, keep_rows, meta=None):
+        """Truncate the committed data to ``keep_rows`` and append ``hist``"""
+        os.makedirs(self._symbol_dir(symbol), exist_ok=True)
+        index = hist.index if hist.index.tz is not None else hist.index.tz_localize('UTC')
+        frames = {'Date': np.asarray(index.tz_convert('UTC').as_unit('ns').asi8, dtype='<i8')}
+        for column in COLUMNS:
+            values = hist[column] if column in hist else pd.Series(0.0, index=hist.index)
+            frames[column] = np.asarray(values, dtype='<f8')
+
+        for column, values in frames.items():
+            path = self._column_path(symbol, column)
+            if keep_rows == 0:
+                # Whole series: new file swapped in, leaving open mappings intact
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                values.tofile(tmp_path)
+                os.replace(tmp_path, path)
+                continue
+            # Overwrite in place and never truncate, so a concurrent reader
+            # (or a mapping) never sees a column shorter than the committed
+            # row count; stale bytes past it are ignored
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                f.seek(keep_rows * values.dtype.itemsize)
+                values.tofile(f)
+
+        meta = dict(meta or {})
+        meta.update(rows=keep_rows + len(hist), tz=str(index.tz), fetched_at=time.time())
+        if keep_rows == 0:
+            meta['first'] = int(frames['Date'][0])
+        self._write_json(symbol, 'meta.json', meta)
+
+    def _touch(self, symbol, meta):
+        self._write_json(symbol, 'meta.json', dict(meta, fetched_at=time.time()))
+
+    def _covers(self, meta, period):
+        """Whether the stored history already reaches back ``period``"""
+        if period == 'max':
+            return meta.get('complete', False)
+        now = pd.Timestamp.now(tz=meta.get('tz') or 'UTC')
+        if period in PERIOD_OFFSETS:
+            start = now - PERIOD_OFFSETS[period]
+        elif period == 'ytd':
+            start = now.normalize().replace(month=1, day=1)
+        else:
+            # Unknown window: download it rather than guess from what is stored
+            return False
+        first = pd.Timestamp(meta['first'], tz='UTC')
+        # Allow a few days of slack for weekends and holidays at the window edge
+        return first <= start + pd.Timedelta(days=5)
+
+    def update(self, symbol, period='1y'):
+        """Bring the stored history up to date, downloading only what is missing"""
+        with self._lock(symbol):
+            lock_file = self._file_lock(symbol)
+            try:
+                meta = self.meta(symbol)
+                if meta and meta['rows'] > 0 and self._covers(meta, period):
+                    if time.time() - meta.get('fetched_at', 0) < self.refresh_after:
+                        return False
+
+                    # Re-fetch from the last stored bar: it may have been a
+                    # partial intraday bar that has since closed.
+                    timestamps = self._column(symbol, 'Date', '<i8', 0, meta['rows'])
+                    last = pd.Timestamp(int(timestamps[-1]), tz='UTC').tz_convert(meta['tz'])
+                    tail = yf.Ticker(symbol).history(start=last.strftime('%Y-%m-%d'))
+                    if tail.empty:
+                        self._touch(symbol, meta)
+                        return False
+                    first_new = tail.index[0].tz_convert('UTC').value
+                    keep_rows = int(np.searchsorted(timestamps, first_new, side='left'))
+                    self._write(symbol, tail, keep_rows, meta)
+                    return True
+
+                hist = yf.Ticker(symbol).history(period=period)
+                if hist.empty:
+                    return False
+                self._write(symbol, hist, 0, {'complete': period == 'max'})
+                return True
+            finally:
+                lock_file.close()
+
+    def get_history(self, symbol, period='1y'):
+        """Return ``period`` of daily bars, refreshing the tail from the network if stale"""
+        try:
+            self.update(symbol, period)
+        except Exception as e:
+            # Serve what is on disk when the upstream is unavailable
+            print(f"Error refreshing stored history for {symbol}: {e}")
+        return self.read(symbol, period)
+
+    def get_info(self, symbol):
+        """Return ``Ticker.info``, re-downloaded at most once per ``info_refresh_after``"""
+        cached = self._read_json(symbol, 'info.json')
+        if cached and time.time() - cached['fetched_at'] < self.info_refresh_after:
+            return cached['info']
+
+        try:
+            info = yf.Ticker(symbol).info
+        except Exception as e:
+            if cached:
+                return cached['info']
+            raise e
+
+        os.makedirs(self._symbol_dir(symbol), exist_ok=True)
+        self._write_json(symbol, 'info.json', {'fetched_at': time.time(), 'info': info})
+        return info
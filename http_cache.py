@@ -0,0 +1,107 @@
+import gzip
+import hashlib
+from datetime import datetime, time as dtime, timedelta
+from zoneinfo import ZoneInfo
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MARKET_TZ = ZoneInfo('America/New_York')
+MARKET_OPEN = dtime(9, 30)
+MARKET_CLOSE = dtime(16, 0)
+
+# Bodies smaller than this aren't worth the CPU or the extra headers
+COMPRESS_MIN_BYTES = 1024
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/msgpack',
+    'application/vnd.apache.arrow.stream',
+}
+
+
+def make_etag(*parts):
+    """Opaque entity tag over ``parts``
+
+    ``cacheable`` sends it as a weak tag, since the same data may go out
+    gzip- or brotli-encoded, or with cosmetic differences (e.g. a 'cached'
+    status), and stay interchangeable.
+    """
+    digest = hashlib.sha1('\x1f'.join(str(part) for part in parts).encode()).hexdigest()
+    return digest[:32]
+
+
+def not_modified(etag):
+    """True when the client's If-None-Match already names ``etag``"""
+    return request.if_none_match.contains_weak(etag)
+
+
+def is_market_open(now=None):
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def seconds_until_open(now=None):
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    opens = datetime.combine(now.date(), MARKET_OPEN, tzinfo=MARKET_TZ)
+    if now >= opens:
+        opens += timedelta(days=1)
+    while opens.weekday() >= 5:
+        opens += timedelta(days=1)
+    return int((opens - now).total_seconds())
+
+
+def market_max_age(open_max_age, closed_max_age=3600, now=None):
+    """``open_max_age`` while the market trades; otherwise until the open, capped at ``closed_max_age``"""
+    if is_market_open(now):
+        return open_max_age
+    return max(open_max_age, min(closed_max_age, seconds_until_open(now)))
+
+
+def cacheable(response, etag, max_age):
+    """Tag a response for conditional requests and shared caches"""
+    response.set_etag(etag, weak=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response
+
+
+def uncacheable(response):
+    """For bodies that aren't settled yet (e.g. stale model fallbacks): always revalidate"""
+    response.cache_control.no_cache = True
+    return response
+
+
+def revalidated(etag, max_age, vary=('Accept-Encoding',)):
+    """Empty 304 carrying the validators and Vary a cache needs to refresh its copy"""
+    response = cacheable(Response(status=304), etag, max_age)
+    response.vary.update(vary)
+    return response
+
+
+def compress(response):
+    """Brotli- or gzip-encode a large API body when the client accepts it"""
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        body, encoding = brotli.compress(body, quality=5), 'br'
+    elif accepted['gzip']:
+        body, encoding = gzip.compress(body, compresslevel=6), 'gzip'
+    else:
+        return response
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,63 @@
+"""Import-time budget for the web app.
+
+``python import_budget.py [module]`` imports ``app`` (or ``module``) in a
+fresh interpreter with ``-X importtime`` and exits non-zero when an ML
+backend is loaded at import or the import takes longer than
+IMPORT_BUDGET_SECONDS. Prediction and sentiment code import their backends
+on first use, so a web worker that only serves quotes and charts never
+loads them.
+"""
+import os
+import subprocess
+import sys
+
+# Top-level packages that must not be imported just by starting the app
+HEAVY_MODULES = ('tensorflow', 'keras', 'statsmodels', 'sklearn', 'textblob', 'nltk', 'torch')
+
+# What app.py used to import eagerly, for comparisons
+ML_BACKENDS = ('tensorflow', 'statsmodels.tsa.arima.model', 'sklearn.preprocessing', 'textblob')
+
+IMPORT_BUDGET_SECONDS = float(os.environ.get('IMPORT_BUDGET_SECONDS', 3.0))
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_profile(module='app'):
+    """``{package: cumulative seconds}`` for every module imported by ``import module``"""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               cwd=ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    profile = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        profile[name.strip()] = int(cumulative) / 1e6
+    return profile
+
+
+def check(module='app', budget=IMPORT_BUDGET_SECONDS):
+    """Print the slowest imports; returns False when the budget or the heavy-module rule is broken"""
+    profile = import_profile(module)
+    total = profile.get(module, 0.0)
+    heavy = sorted({name.split('.')[0] for name in profile} & set(HEAVY_MODULES))
+
+    print(f"import {module}: {total:.2f}s (budget {budget:.2f}s), {len(profile)} modules")
+    top_level = {name: seconds for name, seconds in profile.items() if '.' not in name and name != module}
+    for name, seconds in sorted(top_level.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {name:<30} {seconds:8.3f}s")
+
+    ok = True
+    if heavy:
+        print(f"FAIL: imported at startup: {', '.join(heavy)}")
+        ok = False
+    if total > budget:
+        print(f"FAIL: import took {total:.2f}s, over the {budget:.2f}s budget")
+        ok = False
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if check(*sys.argv[1:2]) else 1)
@@ -0,0 +1,297 @@
+import math
+import threading
+
+import numpy as np
+
+
+class SMA:
+    """Simple moving average over a ring buffer, matching ``rolling(window).mean()``.
+
+    The window sum is updated by adding the new value and subtracting the
+    one it replaces, and re-summed exactly each time the buffer wraps so
+    rounding error cannot build up. Any NaN in the window yields NaN.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = [0.0] * window
+        self.position = -1
+        self.count = 0
+        self.nan_count = 0
+        self.total = 0.0
+        self.value = np.nan
+
+    def _set_slot(self, value, old):
+        if old != old:
+            self.nan_count -= 1
+        else:
+            self.total -= old
+        if value != value:
+            self.nan_count += 1
+        else:
+            self.total += value
+        self.buffer[self.position] = value
+
+    def _result(self):
+        if self.count < self.window or self.nan_count:
+            self.value = np.nan
+        else:
+            self.value = self.total / self.window
+        return self.value
+
+    def update(self, value):
+        self.position = (self.position + 1) % self.window
+        if self.position == 0 and self.count >= self.window:
+            self.total = math.fsum(v for v in self.buffer if v == v)
+        old = self.buffer[self.position] if self.count >= self.window else 0.0
+        self.count = min(self.count + 1, self.window)
+        self._set_slot(value, old)
+        return self._result()
+
+    def revise(self, value):
+        """Replace the most recent value, e.g. with a newer tick for the same bar"""
+        self._set_slot(value, self.buffer[self.position])
+        return self._result()
+
+
+class EMA:
+    """Exponential moving average matching pandas ``ewm(span=span).mean()`` (adjust=True)."""
+
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.weighted = np.nan
+        self.old_weight = 1.0
+        self.nobs = 0
+        self._previous = None
+        self.value = np.nan
+
+    def _apply(self, value):
+        observed = value == value
+        self.nobs += observed
+        if self.weighted == self.weighted:
+            self.old_weight *= 1.0 - self.alpha
+            if observed:
+                if self.weighted != value:
+                    self.weighted = (self.old_weight * self.weighted + value) / (self.old_weight + 1.0)
+                self.old_weight += 1.0
+        elif observed:
+            self.weighted = value
+        self.value = self.weighted if self.nobs >= 1 else np.nan
+        return self.value
+
+    def update(self, value):
+        self._previous = (self.weighted, self.old_weight, self.nobs)
+        return self._apply(value)
+
+    def revise(self, value):
+        self.weighted, self.old_weight, self.nobs = self._previous
+        return self._apply(value)
+
+
+class RSI:
+    """Relative strength index as computed by ``get_technical_indicators``.
+
+    Keeps the previous close and running ``period``-bar sums of gains and
+    losses (simple averages, as the pandas version uses, rather than
+    Wilder smoothing). The first bar counts as a zero gain and zero loss,
+    as ``delta.where(...)`` does with its leading NaN.
+    """
+
+    def __init__(self, period=14):
+        self.gains = SMA(period)
+        self.losses = SMA(period)
+        self.last_close = np.nan
+        self._previous_close = np.nan
+        self.value = np.nan
+
+    def _apply(self, close):
+        delta = close - self.last_close
+        return (delta if delta > 0 else 0.0), (-delta if delta < 0 else 0.0)
+
+    def _result(self):
+        gain, loss = self.gains.value, self.losses.value
+        if gain != gain or loss != loss or (gain == 0 and loss == 0):
+            self.value = np.nan
+        elif loss == 0:
+            self.value = 100.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + gain / loss)
+        return self.value
+
+    def update(self, close):
+        gain, loss = self._apply(close)
+        self._previous_close = self.last_close
+        self.last_close = close
+        self.gains.update(gain)
+        self.losses.update(loss)
+        return self._result()
+
+    def revise(self, close):
+        self.last_close = self._previous_close
+        gain, loss = self._apply(close)
+        self.last_close = close
+        self.gains.revise(gain)
+        self.losses.revise(loss)
+        return self._result()
+
+
+class IndicatorSet:
+    """The indicators of ``get_technical_indicators``, updated in O(1) per bar or tick"""
+
+    def __init__(self):
+        self.indicators = {
+            'SMA_20': SMA(20),
+            'SMA_50': SMA(50),
+            'EMA_12': EMA(12),
+            'EMA_26': EMA(26),
+            'RSI': RSI(14),
+        }
+
+    def update(self, close):
+        """Add a new bar's close"""
+        return {name: indicator.update(close) for name, indicator in self.indicators.items()}
+
+    def revise(self, close):
+        """Update the current bar's close, e.g. from a live quote"""
+        return {name: indicator.revise(close) for name, indicator in self.indicators.items()}
+
+    def values(self):
+        return {name: indicator.value for name, indicator in self.indicators.items()}
+
+    @classmethod
+    def from_history(cls, closes):
+        indicator_set = cls()
+        for close in np.asarray(closes, dtype=float):
+            indicator_set.update(close)
+        return indicator_set
+
+
+class IndicatorTracker:
+    """One IndicatorSet per symbol, kept in step with stored history and live ticks.
+
+    The first call for a symbol replays its history once; after that only
+    bars newer than the last one seen are applied, and a changed last close
+    is applied as a revision. Live quotes revise the current bar.
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _rebuild(self, closes):
+        return {
+            'indicators': IndicatorSet.from_history(closes.to_numpy(dtype=float)),
+            'last_timestamp': closes.index[-1],
+            'last_close': float(closes.iloc[-1]),
+        }
+
+    def sync(self, symbol, closes):
+        """Apply any bars in ``closes`` (a timestamp-indexed Series) not yet seen; return latest values"""
+        symbol = symbol.upper()
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is None or state['last_timestamp'] not in closes.index:
+                state = self._states[symbol] = self._rebuild(closes)
+                return state['indicators'].values()
+
+            indicators = state['indicators']
+            position = closes.index.get_loc(state['last_timestamp'])
+            if closes.iloc[position] != state['last_close']:
+                indicators.revise(float(closes.iloc[position]))
+            for close in closes.iloc[position + 1:].to_numpy(dtype=float):
+                indicators.update(close)
+            state['last_timestamp'] = closes.index[-1]
+            state['last_close'] = float(closes.iloc[-1])
+            return indicators.values()
+
+    def tick(self, symbol, price):
+        """Revise the current bar with a live price; None if the symbol has not been synced"""
+        with self._lock:
+            state = self._states.get(symbol.upper())
+            if state is None:
+                return None
+            state['last_close'] = float(price)
+            return state['indicators'].revise(float(price))
+
+
+# Cross-sectional kernels over a (n_symbols, n_bars) price matrix. Symbols
+# with shorter histories are left-padded with NaN; each row comes out as
+# the pandas calculation on that symbol's own series would.
+
+def rolling_mean(prices, window):
+    """Row-wise ``rolling(window).mean()``: NaN until ``window`` bars, or if any is NaN"""
+    prices = np.asarray(prices, dtype=float)
+    missing = np.isnan(prices)
+    sums = np.cumsum(np.where(missing, 0.0, prices), axis=1)
+    nan_counts = np.cumsum(missing, axis=1)
+
+    out = np.full(prices.shape, np.nan)
+    if prices.shape[1] < window:
+        return out
+    window_sums = sums[:, window - 1:].copy()
+    window_sums[:, 1:] -= sums[:, :-window]
+    window_nans = nan_counts[:, window - 1:].copy()
+    window_nans[:, 1:] -= nan_counts[:, :-window]
+    out[:, window - 1:] = np.where(window_nans == 0, window_sums / window, np.nan)
+    return out
+
+
+def ewm_mean(prices, span):
+    """Row-wise ``ewm(span=span).mean()`` (adjust=True), stepping all symbols together through time"""
+    prices = np.asarray(prices, dtype=float)
+    n_symbols, n_bars = prices.shape
+    decay = 1.0 - 2.0 / (span + 1.0)
+    out = np.full(prices.shape, np.nan)
+    weighted = np.full(n_symbols, np.nan)
+    old_weight = np.ones(n_symbols)
+
+    for t in range(n_bars):
+        value = prices[:, t]
+        observed = ~np.isnan(value)
+        started = ~np.isnan(weighted)
+
+        old_weight = np.where(started, old_weight * decay, old_weight)
+        step = started & observed & (weighted != value)
+        with np.errstate(invalid='ignore'):
+            blended = (old_weight * weighted + value) / (old_weight + 1.0)
+        weighted = np.where(step, blended, weighted)
+        old_weight = np.where(started & observed, old_weight + 1.0, old_weight)
+        weighted = np.where(~started & observed, value, weighted)
+        out[:, t] = weighted
+    return out
+
+
+def rsi(prices, period=14):
+    """Row-wise RSI as in ``get_technical_indicators`` (simple averages of gains and losses)"""
+    prices = np.asarray(prices, dtype=float)
+    delta = np.full(prices.shape, np.nan)
+    delta[:, 1:] = prices[:, 1:] - prices[:, :-1]
+    gain = rolling_mean(np.where(delta > 0, delta, 0.0), period)
+    loss = rolling_mean(np.where(delta < 0, -delta, 0.0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = 100 - (100 / (1 + gain / loss))
+
+    # The zero gains/losses filled in for leading NaN padding are not part
+    # of the symbol's own series; only windows inside its history count.
+    observed = ~np.isnan(prices)
+    first = np.where(observed.any(axis=1), observed.argmax(axis=1), prices.shape[1])
+    out[np.arange(prices.shape[1]) < (first + period - 1)[:, None]] = np.nan
+    return out
+
+
+def compute_indicators(prices):
+    """SMA_20, SMA_50, EMA_12, EMA_26, RSI and MACD for every row of a price matrix"""
+    ema_12 = ewm_mean(prices, 12)
+    ema_26 = ewm_mean(prices, 26)
+    macd = ema_12 - ema_26
+    macd_signal = ewm_mean(macd, 9)
+    return {
+        'SMA_20': rolling_mean(prices, 20),
+        'SMA_50': rolling_mean(prices, 50),
+        'EMA_12': ema_12,
+        'EMA_26': ema_26,
+        'RSI': rsi(prices),
+        'MACD': macd,
+        'MACD_signal': macd_signal,
+        'MACD_hist': macd - macd_signal,
+    }
@@ -0,0 +1,116 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+from local_db import ThreadConnections
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS ix_jobs_finished ON jobs (finished_at);
+"""
+
+
+class JobQueue:
+    """Durable job queue in a SQLite file, shared by web and worker processes.
+
+    A local stand-in for Redis: web processes ``enqueue`` and poll, worker
+    processes ``claim`` the oldest queued job inside an immediate
+    transaction so no two workers take the same one. Jobs left running by a
+    crashed worker go back to the queue after ``stale_after`` seconds.
+    """
+
+    def __init__(self, path=None, stale_after=300):
+        self.path = path or os.environ.get('JOB_QUEUE_PATH', os.path.join('data', 'jobs.sqlite3'))
+        self.stale_after = stale_after
+        self.connections = ThreadConnections(self.path, SCHEMA, row_factory=sqlite3.Row)
+
+    @staticmethod
+    def _as_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def enqueue(self, symbol, kind='predict'):
+        """Queue a job and return its id; reuses a queued or running job for the same symbol"""
+        conn = self.connections.get()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE kind = ? AND symbol = ? AND status IN ('queued', 'running')",
+                (kind, symbol.upper())).fetchone()
+            if row is not None:
+                job_id = row['id']
+            else:
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO jobs (id, kind, symbol, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                    (job_id, kind, symbol.upper(), time.time()))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return job_id
+
+    def claim(self, kind='predict'):
+        """Mark the oldest queued job as running and return it, or None if there is none"""
+        conn = self.connections.get()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running' AND started_at < ?",
+                (time.time() - self.stale_after,))
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE kind = ? AND status = 'queued' ORDER BY created_at LIMIT 1",
+                (kind,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                             (time.time(), row['id']))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        job = self._as_dict(row)
+        if job is not None:
+            job['status'] = 'running'
+        return job
+
+    def complete(self, job_id, result):
+        self.connections.get().execute(
+            "UPDATE jobs SET status = 'done', result = ?, finished_at = ? WHERE id = ?",
+            (json.dumps(result), time.time(), job_id))
+
+    def fail(self, job_id, error):
+        self.connections.get().execute(
+            "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+            (str(error), time.time(), job_id))
+
+    def get(self, job_id):
+        row = self.connections.get().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._as_dict(row)
+
+    def finished_since(self, since):
+        """Jobs that finished after ``since`` (a timestamp), oldest first"""
+        rows = self.connections.get().execute(
+            'SELECT * FROM jobs WHERE finished_at > ? ORDER BY finished_at', (since,)).fetchall()
+        return [self._as_dict(row) for row in rows]
+
+    def purge(self, older_than):
+        """Delete finished jobs older than ``older_than`` seconds"""
+        self.connections.get().execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (time.time() - older_than,))
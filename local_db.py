@@ -0,0 +1,38 @@
+import os
+import sqlite3
+import threading
+
+
+class ThreadConnections:
+    """Per-thread connections to a SQLite file shared by every process.
+
+    SQLite connections must not be shared between threads or carried
+    across a fork, so each thread opens its own on first use, in
+    autocommit mode (callers run ``BEGIN IMMEDIATE`` themselves) with WAL
+    journaling so readers don't block the writer. ``schema`` is applied
+    once when the file is opened.
+    """
+
+    def __init__(self, path, schema=None, row_factory=None, timeout=30):
+        self.path = path
+        self.row_factory = row_factory
+        self.timeout = timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if schema:
+            self.get().executescript(schema)
+
+    def get(self):
+        """This thread's connection, opened on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def reset(self):
+        """Forget every connection, e.g. those inherited from a parent process; each thread reopens on next use"""
+        self._local = threading.local()
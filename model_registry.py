@@ -0,0 +1,231 @@
+import os
+import queue
+import sys
+import threading
+
+import numpy as np
+
+from offload import offload
+from windowing import LOOKBACK, make_windows
+
+GLOBAL_MODEL = 'global'
+MODEL_EXTENSIONS = ('.keras', '.h5')
+
+# Queued by MicroBatcher.close to end its thread
+_STOP = object()
+
+
+class MicroBatcher:
+    """Groups concurrent single-window predictions into one ``model.predict`` call.
+
+    The first request to arrive opens a batch; requests arriving within
+    ``max_wait`` seconds (up to ``max_batch`` of them) join it, and a single
+    background thread runs the model once for the whole batch. Under
+    eventlet or gevent that thread is green, so the predict call itself is
+    offloaded to a real OS thread. ``close`` ends the thread once the
+    requests already queued are answered, releasing the model.
+    """
+
+    def __init__(self, model, max_batch=64, max_wait=0.005):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.closed = False
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def predict(self, window, timeout=None):
+        """Predict the next value for one ``(1, lookback, 1)`` window"""
+        done = threading.Event()
+        item = {'window': window, 'done': done, 'result': None, 'error': None}
+        # Under the lock so nothing is queued behind close()'s stop marker
+        with self._lock:
+            if self.closed:
+                raise RuntimeError('Model batcher is closed')
+            self._queue.put(item)
+        if not done.wait(timeout):
+            raise TimeoutError('Model prediction timed out')
+        if item['error'] is not None:
+            raise item['error']
+        return item['result']
+
+    def close(self):
+        """Stop accepting requests and end the thread after the queued ones"""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self._queue.put(_STOP)
+
+    def _collect(self):
+        """The next batch, and whether the stop marker ended it"""
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=self.max_wait)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stopped = False
+        while not stopped:
+            batch, stopped = self._collect()
+            if not batch:
+                continue
+            try:
+                windows = np.concatenate([item['window'] for item in batch]).astype(np.float32)
+                outputs = offload(self.model.predict, windows, batch_size=len(batch), verbose=0)
+                outputs = outputs.reshape(len(batch), -1)
+                for item, output in zip(batch, outputs):
+                    item['result'] = float(output[0])
+            except Exception as e:
+                for item in batch:
+                    item['error'] = e
+            for item in batch:
+                item['done'].set()
+        self.model = None
+
+
+class ModelRegistry:
+    """Loads trained LSTM models once per process and file version, keyed by symbol.
+
+    Looks for ``<model_dir>/<SYMBOL>.keras`` (or ``.h5``) and falls back to
+    ``<model_dir>/global.keras`` shared by all symbols. Each loaded model gets
+    its own MicroBatcher so concurrent requests share ``model.predict`` calls;
+    a batcher whose model is replaced or forgotten is closed.
+    """
+
+    def __init__(self, model_dir=None, max_batch=64, max_wait=0.005):
+        self.model_dir = model_dir or os.environ.get('MODEL_DIR', 'models')
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        for extension in MODEL_EXTENSIONS:
+            path = os.path.join(self.model_dir, key + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _signature(self, key):
+        # The file that would serve ``key`` and its mtime, or None if there is none
+        path = self._path(key)
+        if path is None:
+            return None
+        try:
+            return path, os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self, key):
+        """Batcher for ``key``, (re)loading its model when the file appears or changes; None if there is none
+
+        Loaded models are keyed on the file's mtime, as ``version`` is, and
+        a missing file is never cached, so a model trained after startup is
+        served from the next request on.
+        """
+        signature = self._signature(key)
+        with self._lock:
+            if signature is None:
+                self._forget(key)
+                return None
+            cached = self._batchers.get(key)
+            if cached is None or cached[0] != signature:
+                import tensorflow as tf
+                model = offload(tf.keras.models.load_model, signature[0], compile=False)
+                self._forget(key)
+                cached = self._batchers[key] = (signature, MicroBatcher(model, self.max_batch, self.max_wait))
+            return cached[1]
+
+    def _forget(self, key):
+        # Callers hold self._lock
+        cached = self._batchers.pop(key, None)
+        if cached is not None:
+            cached[1].close()
+
+    def get(self, symbol):
+        """Batcher for the symbol's own model, else the global model, else None"""
+        return self._load(symbol.upper()) or self._load(GLOBAL_MODEL)
+
+    def predict(self, symbol, window, timeout=None):
+        """Predict the next scaled value after ``window``; None when no model is available"""
+        batcher = self.get(symbol)
+        if batcher is None:
+            return None
+        try:
+            return batcher.predict(window, timeout=timeout)
+        except RuntimeError:
+            if not batcher.closed:
+                raise
+        # The model was replaced between get() and predict(); use the new one
+        batcher = self.get(symbol)
+        return None if batcher is None else batcher.predict(window, timeout=timeout)
+
+    def version(self, symbol):
+        """Identifies the model file that would serve ``symbol``, changing when it is retrained"""
+        signature = self._signature(symbol.upper()) or self._signature(GLOBAL_MODEL)
+        if signature is None:
+            return 'none'
+        path, mtime = signature
+        return f"{os.path.basename(path)}@{mtime}"
+
+    def reload(self, symbol=None):
+        """Forget loaded models so updated files are picked up on next use"""
+        with self._lock:
+            for key in list(self._batchers) if symbol is None else [symbol.upper()]:
+                self._forget(key)
+
+
+def build_lstm(lookback=LOOKBACK, units=50):
+    # Imported here so processes that never touch Keras (e.g. ARIMA pool
+    # workers importing this module) don't load TensorFlow
+    import tensorflow as tf
+
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(lookback, 1)),
+        tf.keras.layers.LSTM(units, return_sequences=True),
+        tf.keras.layers.LSTM(units),
+        tf.keras.layers.Dense(1),
+    ])
+    model.compile(optimizer='adam', loss='mse')
+    return model
+
+
+def train_lstm(scaled_series, path, epochs=10, batch_size=32):
+    """Fit an LSTM on a min-max scaled series and save it where the registry looks"""
+    X, y = make_windows(np.asarray(scaled_series, dtype=np.float32))
+    model = build_lstm()
+    model.fit(X, y, epochs=epochs, batch_size=batch_size, verbose=0)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    model.save(path)
+    return model
+
+
+if __name__ == '__main__':
+    # Usage: python model_registry.py SYMBOL [SYMBOL ...]
+    from sklearn.preprocessing import MinMaxScaler
+    from utils import StockDataFetcher
+
+    fetcher = StockDataFetcher()
+    registry = ModelRegistry()
+    for symbol in sys.argv[1:]:
+        data = fetcher.get_stock_data(symbol, period="2y")
+        if data is None:
+            print(f"No data for {symbol}, skipping")
+            continue
+        closes = data['historical_data']['Close'].values.reshape(-1, 1)
+        scaled = MinMaxScaler().fit_transform(closes)
+        path = os.path.join(registry.model_dir, symbol.upper() + '.keras')
+        train_lstm(scaled, path)
+        print(f"Saved {path}")
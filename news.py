@@ -0,0 +1,159 @@
+import abc
+import glob
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+FINNHUB_NEWS_URL = 'https://finnhub.io/api/v1/company-news'
+
+
+def make_article(title, source, published=None, url=None, symbols=(), sample=False):
+    """An article as every provider returns it; ``published`` is a UTC datetime
+
+    ``sample`` marks generated placeholder headlines, which are shown but
+    never recorded in the sentiment history.
+    """
+    if published is None:
+        published = datetime.now(timezone.utc)
+    elif isinstance(published, (int, float)):
+        published = datetime.fromtimestamp(published, timezone.utc)
+    elif isinstance(published, str):
+        published = datetime.fromisoformat(published.replace('Z', '+00:00'))
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return {
+        'title': title,
+        'source': source,
+        'published': published,
+        'url': url,
+        'symbols': [s.upper() for s in symbols],
+        'sample': sample,
+    }
+
+
+class NewsProvider(abc.ABC):
+    """Source of news articles for a set of symbols.
+
+    Subclasses implement ``fetch``, returning ``{symbol: [article, ...]}``
+    with articles built by ``make_article``. The same article may be
+    listed under several symbols.
+    """
+
+    @abc.abstractmethod
+    def fetch(self, symbols):
+        """Recent articles for ``symbols``"""
+
+
+class FileNewsProvider(NewsProvider):
+    """Articles from local JSON or JSON Lines files, for offline runs and fixtures.
+
+    ``path`` is a file or a directory of ``*.json``/``*.jsonl`` files. Each
+    record needs ``title`` and ``symbols``; ``source``, ``published`` and
+    ``url`` are optional. Files are re-read when they change.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('NEWS_FIXTURES', os.path.join('data', 'news'))
+        self._signature = None
+        self._by_symbol = {}
+
+    def _files(self):
+        if os.path.isdir(self.path):
+            return sorted(glob.glob(os.path.join(self.path, '*.json')) +
+                          glob.glob(os.path.join(self.path, '*.jsonl')))
+        return [self.path] if os.path.exists(self.path) else []
+
+    def _load(self):
+        files = self._files()
+        signature = [(f, os.stat(f).st_mtime_ns) for f in files]
+        if signature == self._signature:
+            return
+        by_symbol = {}
+        for path in files:
+            with open(path) as f:
+                if path.endswith('.jsonl'):
+                    records = [json.loads(line) for line in f if line.strip()]
+                else:
+                    records = json.load(f)
+            for record in records:
+                # Undated records take the file's modification time
+                article = make_article(record['title'], record.get('source', os.path.basename(path)),
+                                       record.get('published', os.stat(path).st_mtime), record.get('url'),
+                                       record['symbols'])
+                for symbol in article['symbols']:
+                    by_symbol.setdefault(symbol, []).append(article)
+        for articles in by_symbol.values():
+            articles.sort(key=lambda article: article['published'], reverse=True)
+        self._by_symbol = by_symbol
+        self._signature = signature
+
+    def fetch(self, symbols):
+        self._load()
+        return {symbol.upper(): list(self._by_symbol.get(symbol.upper(), [])) for symbol in symbols}
+
+
+class SampleNewsProvider(NewsProvider):
+    """The generated headlines the app has always shown, for when no other source is set up
+
+    Articles are flagged ``sample`` so they never enter the sentiment index.
+    """
+
+    TEMPLATES = (
+        "{symbol} reports strong quarterly earnings, beating expectations",
+        "Analysts upgrade {symbol} stock rating amid growth prospects",
+        "Market volatility affects {symbol} performance in recent trading",
+        "{symbol} announces new product lineup for upcoming quarter",
+        "Supply chain concerns impact {symbol} production forecasts",
+    )
+
+    def fetch(self, symbols):
+        # Fixed publication times keep the articles (and their ETags) stable
+        today = datetime.now(timezone.utc).replace(hour=12, minute=0, second=0, microsecond=0)
+        return {
+            symbol.upper(): [
+                make_article(template.format(symbol=symbol.upper()), 'Financial News API',
+                             today - timedelta(hours=i), symbols=[symbol], sample=True)
+                for i, template in enumerate(self.TEMPLATES)
+            ]
+            for symbol in symbols
+        }
+
+
+class FinnhubNewsProvider(NewsProvider):
+    """Company news from Finnhub for the last ``days`` days; needs FINNHUB_API_KEY"""
+
+    def __init__(self, api_key=None, days=7, timeout=10):
+        self.api_key = api_key or os.environ.get('FINNHUB_API_KEY')
+        self.days = days
+        self.timeout = timeout
+
+    def fetch(self, symbols):
+        today = datetime.now(timezone.utc).date()
+        news = {}
+        for symbol in symbols:
+            response = requests.get(FINNHUB_NEWS_URL, params={
+                'symbol': symbol.upper(),
+                'from': (today - timedelta(days=self.days)).isoformat(),
+                'to': today.isoformat(),
+                'token': self.api_key,
+            }, timeout=self.timeout)
+            response.raise_for_status()
+            news[symbol.upper()] = [
+                make_article(item['headline'], item.get('source', 'Finnhub'), item.get('datetime'),
+                             item.get('url'), [symbol])
+                for item in response.json() if item.get('headline')
+            ]
+        return news
+
+
+def default_provider():
+    """Fixture files if any exist, else Finnhub if a key is configured, else sample headlines"""
+    files = FileNewsProvider()
+    if files._files():
+        return files
+    api_key = os.environ.get('FINNHUB_API_KEY')
+    if api_key and api_key != 'your_finnhub_api_key_here':
+        return FinnhubNewsProvider(api_key)
+    return SampleNewsProvider()
@@ -0,0 +1,40 @@
+"""Run CPU-bound calls on real OS threads under eventlet or gevent.
+
+The Socket.IO web workers are eventlet (or gevent) workers, which
+monkey-patch ``threading``: thread pools and background threads become
+green threads that share one OS thread and only switch on I/O. A
+``model.predict`` or ARIMA fit run there blocks every other request and
+socket until it returns, and no deadline can interrupt it. ``offload``
+hands such a call to the hub's pool of real OS threads and lets other
+green threads run while it works; without monkey-patching it simply calls
+the function.
+
+Only pure computation should be offloaded: code running on those OS
+threads must not touch green locks, queues or events.
+"""
+import sys
+
+
+def green_threads():
+    """Which library has patched ``threading`` into green threads: 'eventlet', 'gevent' or None"""
+    if 'eventlet' in sys.modules:
+        from eventlet import patcher
+        if patcher.is_monkey_patched('thread'):
+            return 'eventlet'
+    if 'gevent' in sys.modules:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            return 'gevent'
+    return None
+
+
+def offload(fn, *args, **kwargs):
+    """``fn(*args, **kwargs)`` on a real OS thread when threads are green, else inline"""
+    kind = green_threads()
+    if kind == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(fn, *args, **kwargs)
+    if kind == 'gevent':
+        import gevent
+        return gevent.get_hub().threadpool.apply(fn, args, kwargs)
+    return fn(*args, **kwargs)
@@ -0,0 +1,115 @@
+from datetime import datetime
+
+import pandas as pd
+
+from http_cache import MARKET_TZ, is_market_open
+from predictors import MODELS, run_models
+from queries import bulk_insert
+
+
+def next_bar_date(last_bar):
+    """Date of the trading day after ``last_bar``, as a naive datetime for the target_date column"""
+    return (pd.Timestamp(last_bar).tz_localize(None).normalize() + pd.offsets.BDay(1)).to_pydatetime()
+
+
+def bar_closed(last_bar, now=None):
+    """Whether ``last_bar``'s close is final: it is from an earlier session, or today's session has ended
+
+    While the market is open the latest bar is still moving, so predictions
+    made from it must not be stored as the prediction for the next bar.
+    """
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    bar = pd.Timestamp(last_bar)
+    if bar.tzinfo is not None:
+        bar = bar.tz_convert(MARKET_TZ)
+    return bar.date() < now.date() or not is_market_open(now)
+
+
+class PredictionCache:
+    """Precomputed predictions stored in the Prediction table.
+
+    Each model has at most one row per symbol and predicted bar
+    (``target_date``), so a warm symbol costs one indexed lookup instead of
+    a model run, and a model that failed or missed its deadline is rerun
+    on its own while the others are served from their rows. Only
+    predictions from a closed bar are stored (see ``bar_closed``).
+    """
+
+    def __init__(self, db, model):
+        self.db = db
+        self.model = model
+
+    def latest(self, symbol, target_date):
+        """Stored result per model for ``target_date``; models without one are left out"""
+        rows = (self.model.query
+                .filter_by(stock_symbol=symbol.upper(), target_date=target_date)
+                .all())
+        stored = {row.model_type: row for row in rows}
+        results = {}
+        for name in MODELS:
+            row = stored.get(name)
+            if row is not None:
+                results[name] = {
+                    'prediction': row.predicted_price,
+                    'confidence': row.confidence,
+                    'status': 'cached',
+                    'as_of': row.prediction_date.isoformat()
+                }
+        return results
+
+    def missing(self, results):
+        """Models with no stored result among ``results``, in MODELS order"""
+        return [name for name in MODELS if name not in results]
+
+    def save(self, predictions):
+        """Bulk-insert ``[(symbol, target_date, results), ...]``; only successful results are kept
+
+        A model has at most one row per target date: results for a model
+        that already has one (another request got there first) are skipped.
+        Saved results get the ``as_of`` that later reads of the row will report.
+        """
+        now = datetime.utcnow()
+        for _, _, results in predictions:
+            for result in results.values():
+                if result['status'] == 'ok':
+                    result['as_of'] = now.isoformat()
+        rows = [
+            {
+                'stock_symbol': symbol.upper(),
+                'model_type': name,
+                'predicted_price': result['prediction'],
+                'confidence': result['confidence'],
+                'prediction_date': now,
+                'target_date': target_date,
+            }
+            for symbol, target_date, results in predictions
+            for name, result in results.items()
+            if result['status'] == 'ok'
+        ]
+        if rows:
+            bulk_insert(self.db, self.model, rows, ignore_conflicts=True)
+        return len(rows)
+
+    def refresh(self, symbols, store, period="2y"):
+        """Precompute predictions for every symbol whose next bar has none yet
+
+        Reads history straight from the HistoryStore so a newly stored bar is
+        picked up as soon as the store has it. Symbols whose latest bar is
+        still trading are left until it closes. Returns the symbols refreshed.
+        """
+        pending = []
+        for symbol in symbols:
+            try:
+                hist = store.get_history(symbol, period=period)
+                if hist is None or hist.empty or not bar_closed(hist.index[-1]):
+                    continue
+                target_date = next_bar_date(hist.index[-1])
+                missing = self.missing(self.latest(symbol, target_date))
+                if not missing:
+                    continue
+                pending.append((symbol, target_date, run_models(symbol, hist['Close'], missing)))
+            except Exception as e:
+                print(f"Error precomputing predictions for {symbol}: {e}")
+
+        self.save(pending)
+        return [symbol for symbol, _, _ in pending]
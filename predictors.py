@@ -0,0 +1,254 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+
+from offload import green_threads, offload
+from windowing import last_window
+from model_registry import ModelRegistry
+from arima_models import ArimaStore, ARIMA_ORDER
+from trend import StreamingTrend, TrendTracker
+
+# Per-process model state; process pool workers build their own copies
+model_registry = ModelRegistry()
+arima_store = ArimaStore()
+trend_tracker = TrendTracker()
+
+LSTM_PREDICT_TIMEOUT = 5
+
+# Machine Learning Functions
+def predict_with_lstm(data, symbol=None):
+    # scikit-learn and statsmodels are imported where they are used, so
+    # processes that never predict (web workers serving quotes and charts)
+    # don't pay for them at startup
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler = MinMaxScaler()
+    scaled_data = scaler.fit_transform(np.asarray(data, dtype=float).reshape(-1, 1))
+
+    # Run the trained model for this symbol (or the global one) through the
+    # registry's micro-batcher, so concurrent requests share one predict call
+    scaled_prediction = None
+    if symbol is not None:
+        try:
+            scaled_prediction = model_registry.predict(symbol, last_window(scaled_data),
+                                                       timeout=LSTM_PREDICT_TIMEOUT)
+        except Exception as e:
+            print(f"Error running LSTM model for {symbol}: {e}")
+
+    if scaled_prediction is None:
+        # No trained model available: naive drift estimate
+        scaled_prediction = scaled_data[-1][0] * 1.02
+
+    prediction = scaler.inverse_transform([[scaled_prediction]])[0][0]
+    confidence = 0.85
+
+    return prediction, confidence
+
+def predict_with_arima(data, symbol=None):
+    try:
+        if symbol is not None:
+            # Warm model: only new bars are filtered in before forecasting
+            forecast = arima_store.forecast(symbol, data, steps=1)
+        else:
+            from statsmodels.tsa.arima.model import ARIMA
+            model = ARIMA(np.asarray(data), order=ARIMA_ORDER)
+            fitted_model = offload(model.fit)
+            forecast = offload(fitted_model.forecast, steps=1)
+        confidence = 0.72
+        return forecast[0], confidence
+    except:
+        # Fallback prediction
+        return np.asarray(data)[-1] * 1.01, 0.72
+
+def predict_with_linear_regression(data, symbol=None):
+    # Least-squares trend over the bar index, updated incrementally per symbol
+    if symbol is not None:
+        next_prediction = trend_tracker.predict(symbol, data, steps=1)[0]
+    else:
+        trend = StreamingTrend()
+        for value in np.asarray(data, dtype=float):
+            trend.push(value)
+        next_prediction = trend.predict(steps=1)[0]
+    confidence = 0.68
+
+    return next_prediction, confidence
+
+
+MODELS = {
+    'LSTM': predict_with_lstm,
+    'ARIMA': predict_with_arima,
+    'Linear Regression': predict_with_linear_regression,
+}
+
+# Seconds each model may take before the response goes out without it
+DEFAULT_DEADLINES = {
+    'LSTM': 2.0,
+    'ARIMA': 3.0,
+    'Linear Regression': 1.0,
+}
+
+# ARIMA fitting is CPU-bound Python and holds the GIL, so it runs in worker
+# processes. LSTM inference stays in this process, where the micro-batcher
+# lives and TensorFlow releases the GIL, and the streaming trend is O(1).
+# Under eventlet or gevent every model runs on the (green) thread pool
+# instead: the process pool's management thread and result pipes would be
+# green too, and the models offload their heavy calls to real OS threads
+# themselves (see offload.py), so a slow fit or predict neither stalls the
+# other clients nor escapes its deadline.
+DEFAULT_EXECUTORS = {
+    'LSTM': 'thread',
+    'ARIMA': 'process',
+    'Linear Regression': 'thread',
+}
+
+
+class ModelRunner:
+    """Runs every prediction model for a symbol concurrently, each against its own deadline.
+
+    A model that misses its deadline (or fails) is reported with the last
+    prediction it produced for that symbol, flagged ``stale``, or as ``late``
+    when there is none yet. Late runs are left to finish in the background
+    and their results are kept for the next request.
+    """
+
+    def __init__(self, models=None, deadlines=None, executors=None, process_workers=None, thread_workers=16):
+        self.models = models or MODELS
+        self.deadlines = dict(DEFAULT_DEADLINES, **(deadlines or {}))
+        self.executors = dict(DEFAULT_EXECUTORS, **(executors or {}))
+        self.process_workers = process_workers
+        self.thread_workers = thread_workers
+        self._thread_pool = None
+        self._process_pool = None
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, kind):
+        with self._lock:
+            if kind == 'process' and not green_threads():
+                if self._process_pool is None:
+                    # Spawned workers import only the model code, not the web
+                    # app, and never inherit TensorFlow's threads through fork.
+                    self._process_pool = ProcessPoolExecutor(
+                        max_workers=self.process_workers,
+                        mp_context=multiprocessing.get_context('spawn'))
+                return self._process_pool
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(max_workers=self.thread_workers)
+            return self._thread_pool
+
+    def _submit(self, name, symbol, series):
+        kind = self.executors.get(name, 'thread')
+        try:
+            return self._pool(kind).submit(self.models[name], series, symbol)
+        except BrokenProcessPool:
+            with self._lock:
+                self._process_pool = None
+            return self._pool(kind).submit(self.models[name], series, symbol)
+
+    def _remember(self, symbol, name, future):
+        try:
+            prediction, confidence = future.result()
+        except Exception as e:
+            print(f"Error running {name} model for {symbol}: {e}")
+            return
+        with self._lock:
+            self._last[(symbol.upper(), name)] = (float(prediction), float(confidence), datetime.utcnow())
+
+    def _fallback(self, symbol, name, status):
+        with self._lock:
+            last = self._last.get((symbol.upper(), name))
+        if last is None:
+            return {'prediction': None, 'confidence': None, 'status': status}
+        prediction, confidence, as_of = last
+        return {'prediction': prediction, 'confidence': confidence, 'status': 'stale',
+                'as_of': as_of.isoformat()}
+
+    def _finish_late(self, on_late, name, future):
+        try:
+            prediction, confidence = future.result()
+        except Exception:
+            return  # already reported by _remember
+        try:
+            on_late(name, {'prediction': float(prediction), 'confidence': float(confidence), 'status': 'ok'})
+        except Exception as e:
+            print(f"Error handling late {name} result: {e}")
+
+    def run(self, symbol, series, names=None, on_late=None):
+        """Predictions keyed by model name, each with a ``status`` of ok, stale, late or error
+
+        Runs only ``names`` when given. ``on_late(name, result)`` is called
+        when a model that missed its deadline finishes after all.
+        """
+        started = time.monotonic()
+        names = [name for name in self.models if names is None or name in names]
+        futures = {name: self._submit(name, symbol, series) for name in names}
+        for name, future in futures.items():
+            future.add_done_callback(partial(self._remember, symbol, name))
+
+        results = {}
+        for name, future in futures.items():
+            remaining = self.deadlines.get(name, 1.0) - (time.monotonic() - started)
+            try:
+                prediction, confidence = future.result(timeout=max(remaining, 0))
+                results[name] = {'prediction': float(prediction), 'confidence': float(confidence),
+                                 'status': 'ok'}
+            except FuturesTimeout:
+                results[name] = self._fallback(symbol, name, 'late')
+                if on_late is not None:
+                    future.add_done_callback(partial(self._finish_late, on_late, name))
+            except Exception as e:
+                print(f"Error running {name} model for {symbol}: {e}")
+                results[name] = self._fallback(symbol, name, 'error')
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            pools, self._thread_pool, self._process_pool = (self._thread_pool, self._process_pool), None, None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_models(symbol, series, names=None):
+    """Run every model (or just ``names``) to completion in this process, for background workers"""
+    results = {}
+    for name, model in MODELS.items():
+        if names is not None and name not in names:
+            continue
+        try:
+            prediction, confidence = model(series, symbol)
+            results[name] = {'prediction': float(prediction), 'confidence': float(confidence), 'status': 'ok'}
+        except Exception as e:
+            print(f"Error running {name} model for {symbol}: {e}")
+            results[name] = {'prediction': None, 'confidence': None, 'status': 'error'}
+    return results
+
+
+def format_predictions(results, accuracy=None):
+    """Shape ModelRunner/run_models output as the /api/predict response body
+
+    ``accuracy`` maps model names to ``(directional accuracy, basis)`` from
+    backtest.BacktestStore.accuracy; the basis says whether the figure is
+    the symbol's own or an average over other symbols. Models without one
+    get None for both.
+    """
+    accuracy = accuracy or {}
+    predictions = {}
+    for name, result in results.items():
+        predictions[name] = {
+            'prediction': round(result['prediction'], 2) if result['prediction'] is not None else None,
+            'confidence': round(result['confidence'], 2) if result['confidence'] is not None else None,
+            'accuracy': round(accuracy[name][0], 1) if accuracy.get(name, (None,))[0] is not None else None,
+            'accuracy_basis': accuracy.get(name, (None, None))[1],
+            'status': result['status']
+        }
+        if 'as_of' in result:
+            predictions[name]['as_of'] = result['as_of']
+    return predictions
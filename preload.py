@@ -0,0 +1,66 @@
+"""Master-side warm-up and per-worker re-initialisation for preforking servers.
+
+With ``preload_app`` gunicorn imports the app once in the master and forks
+workers from it, so everything loaded before the fork is shared copy-on-write
+instead of being built again by each worker. ``warm`` fills the master's
+caches; ``after_fork`` gives each worker its own handles for everything that
+must not cross a fork.
+"""
+import gc
+import sys
+
+# Backends whose runtimes start threads or hold driver state at import and
+# break in a forked child; they must load in the workers, after the fork
+FORK_UNSAFE_MODULES = ('tensorflow', 'torch')
+
+
+def check_fork_safe():
+    """Refuse to fork workers from a master that has already loaded TensorFlow"""
+    loaded = [name for name in FORK_UNSAFE_MODULES if name in sys.modules]
+    if loaded:
+        raise RuntimeError(f"{', '.join(loaded)} imported in the master process; "
+                           "it is not fork-safe, so load models lazily in the workers")
+
+
+def warm(fetcher, symbols, periods=('1y', '2y')):
+    """Load stored history for ``symbols`` into ``fetcher``'s cache, from disk only
+
+    Reads go straight to the history store without a network refresh, so
+    the master never opens upstream connections its children would inherit.
+    """
+    warmed = 0
+    for symbol in symbols:
+        for period in periods:
+            hist = fetcher.store.read(symbol, period)
+            if hist is None or hist.empty:
+                continue
+            info = fetcher.store._read_json(symbol, 'info.json') or {}
+            fetcher.cache.set(('history', symbol.upper(), period),
+                              {'historical_data': hist, 'info': info.get('info', {}), 'symbol': symbol},
+                              fetcher.ttls['history'])
+            warmed += 1
+    return warmed
+
+
+def freeze():
+    """Move everything allocated so far out of the garbage collector's reach
+
+    A collection in a worker would otherwise write to the header of every
+    tracked object and un-share the pages holding them.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+def after_fork(app, db, *stores):
+    """Drop connections inherited from the master; each worker opens its own
+
+    ``stores`` are objects keeping per-thread SQLite connections in a
+    ``local_db.ThreadConnections`` (JobQueue, SentimentScorer,
+    SentimentIndex, BacktestStore).
+    """
+    for store in stores:
+        store.connections.reset()
+    with app.app_context():
+        # close=False leaves the master's connections to the master
+        db.engine.dispose(close=False)
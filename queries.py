@@ -0,0 +1,116 @@
+import base64
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import insert, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Rows per INSERT statement for bulk loads; SQLAlchemy batches each chunk
+# into multi-row VALUES statements
+BULK_INSERT_CHUNK = 10000
+
+
+def database_uri():
+    """DATABASE_URL if set (Heroku's postgres:// spelled the way SQLAlchemy wants), else local SQLite"""
+    uri = os.environ.get('DATABASE_URL', 'sqlite:///stock_prediction.db')
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def engine_options(uri):
+    """Connection pool settings for ``uri``; SQLite keeps SQLAlchemy's defaults"""
+    if uri.startswith('sqlite'):
+        return {}
+    return {
+        # Per process: gunicorn workers and worker.py each get their own pool
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        # Recycle before server-side idle timeouts and check connections on
+        # checkout, so a restarted database costs one retry, not a 500
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+
+def bulk_insert(db, model, rows, chunk_size=BULK_INSERT_CHUNK, ignore_conflicts=False):
+    """Insert ``rows`` (dicts of column values) in chunks of multi-row INSERTs; returns the count
+
+    With ``ignore_conflicts``, rows that would break a unique constraint are
+    skipped (ON CONFLICT DO NOTHING) instead of failing the batch.
+    """
+    count = 0
+    statement = insert(model.__table__)
+    if ignore_conflicts:
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            statement = sqlite_insert(model.__table__).on_conflict_do_nothing()
+        elif dialect == 'postgresql':
+            statement = postgresql_insert(model.__table__).on_conflict_do_nothing()
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        db.session.execute(statement, chunk)
+        count += len(chunk)
+    db.session.commit()
+    return count
+
+
+def page_size(request):
+    return max(1, min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+
+
+def encode_cursor(values):
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Values of ``columns`` from a cursor made by ``encode_cursor``; ValueError if malformed"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(payload, list) or len(payload) != len(columns):
+        raise ValueError('Invalid cursor')
+    values = []
+    for column, value in zip(columns, payload):
+        python_type = column.type.python_type
+        try:
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is int and (not isinstance(value, int) or isinstance(value, bool)):
+                raise TypeError(f"{column.key} must be an integer")
+        except (TypeError, ValueError):
+            raise ValueError('Invalid cursor')
+        values.append(value)
+    return values
+
+
+def keyset_page(query, columns, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=False):
+    """One page of ``query`` ordered by ``columns``, continuing after ``cursor``
+
+    Seeks straight to the cursor's position through an index on
+    ``columns`` instead of counting past skipped rows as OFFSET does, so
+    page 10,000 costs the same as page 1. The last column must be unique
+    (e.g. the primary key). Returns ``(rows, next_cursor)``; next_cursor is
+    None on the last page.
+    """
+    if cursor is not None:
+        values = decode_cursor(cursor, columns)
+        # A row-value comparison, (a, b) > (x, y), which SQLite and
+        # Postgres both turn into a range scan of the index
+        key, position = tuple_(*columns), tuple_(*values)
+        query = query.filter(key < position if descending else key > position)
+
+    order = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([getattr(rows[-1], column.key) for column in columns])
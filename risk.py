@@ -0,0 +1,287 @@
+import threading
+from collections import OrderedDict
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# RiskMetrics' daily decay factor
+EWMA_DECAY = 0.94
+TRADING_DAYS = 252
+
+
+class EwmaCovariance:
+    """Exponentially weighted covariance of daily returns over a fixed symbol universe.
+
+    Each bar costs one rank-1 update, ``cov = decay * cov + (1 - decay) * r r'``
+    (zero-mean returns, as in RiskMetrics), instead of recomputing the
+    covariance from the full history. The last ``history`` return vectors
+    are kept in a ring buffer for historical VaR. A symbol without a bar on
+    a date counts as a zero return.
+    """
+
+    def __init__(self, symbols, decay=EWMA_DECAY, history=500):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.decay = decay
+        n = len(self.symbols)
+        self.cov = np.zeros((n, n))
+        self.count = 0
+        self.returns = np.zeros((history, n))
+        self.position = -1
+        self._previous = None
+
+    def fit(self, returns):
+        """Replay a ``(n_symbols, n_bars)`` block of returns from the start
+
+        Gives the same state as calling ``update`` once per bar, but as a
+        single weighted matrix product.
+        """
+        returns = np.nan_to_num(np.asarray(returns, dtype=float))
+        n_bars = returns.shape[1]
+        if n_bars == 0:
+            return
+        self.cov = (returns * self._weights(n_bars)) @ returns.T
+        self._previous = self._before_last(self.cov, returns, returns)
+
+        kept = min(n_bars, len(self.returns))
+        self.returns[:kept] = returns[:, -kept:].T
+        self.position = kept - 1
+        self.count = n_bars
+
+    def _weights(self, n_bars):
+        # Weight of each bar after replaying n_bars updates; the first seeds
+        weights = (1.0 - self.decay) * self.decay ** np.arange(n_bars - 1, -1, -1, dtype=float)
+        weights[0] = self.decay ** (n_bars - 1)
+        return weights
+
+    def _before_last(self, cov, left, right):
+        # The state before the last bar, for revise()
+        if left.shape[1] < 2:
+            return np.zeros_like(cov)
+        return (cov - (1.0 - self.decay) * np.outer(left[:, -1], right[:, -1])) / self.decay
+
+    def extend(self, symbols, returns):
+        """Add ``symbols`` given their ``(n_new, n_bars)`` returns over the stored window
+
+        The new rows and columns are weighted over the window that
+        ``history`` keeps, so covariances with the existing symbols need
+        no replay of the rest of the universe. Past the window the weights
+        have decayed below 0.94**500, about 3e-14.
+        """
+        window = self.history().T
+        returns = np.nan_to_num(np.asarray(returns, dtype=float)).reshape(len(symbols), window.shape[1])
+        if window.shape[1] == 0:
+            return
+        weighted = returns * self._weights(window.shape[1])
+        cross, own = weighted @ window.T, weighted @ returns.T
+        self.cov = np.block([[self.cov, cross.T], [cross, own]])
+        self._previous = np.block([
+            [self._previous, self._before_last(cross, returns, window).T],
+            [self._before_last(cross, returns, window), self._before_last(own, returns, returns)],
+        ])
+
+        kept = window.shape[1]
+        order = np.arange(self.position - kept + 1, self.position + 1) % len(self.returns)
+        added = np.zeros((len(self.returns), len(symbols)))
+        added[order] = returns.T
+        self.returns = np.hstack([self.returns, added])
+        self.symbols += list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    def remove(self, symbols):
+        """Drop ``symbols`` from the universe"""
+        keep = [i for i, symbol in enumerate(self.symbols) if symbol not in set(symbols)]
+        self.cov = self.cov[np.ix_(keep, keep)]
+        self._previous = self._previous[np.ix_(keep, keep)]
+        self.returns = self.returns[:, keep]
+        self.symbols = [self.symbols[i] for i in keep]
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    def update(self, returns):
+        """Fold in one bar's return vector"""
+        returns = np.nan_to_num(np.asarray(returns, dtype=float))
+        self._previous = self.cov.copy()
+        self._apply(returns, first=self.count == 0)
+        self.position = (self.position + 1) % len(self.returns)
+        self.returns[self.position] = returns
+        self.count += 1
+
+    def revise(self, returns):
+        """Replace the latest bar's returns, e.g. as an intraday bar moves"""
+        returns = np.nan_to_num(np.asarray(returns, dtype=float))
+        self.cov = self._previous.copy()
+        self._apply(returns, first=self.count == 1)
+        self.returns[self.position] = returns
+
+    def _apply(self, returns, first):
+        if first:
+            # Seed with the first bar rather than decaying up from zero
+            self.cov = np.outer(returns, returns)
+            return
+        self.cov *= self.decay
+        self.cov += (1.0 - self.decay) * np.outer(returns, returns)
+
+    def history(self, columns=None):
+        """Stored return vectors, oldest first, for all symbols or the ``columns`` positions"""
+        kept = min(self.count, len(self.returns))
+        order = np.arange(self.position - kept + 1, self.position + 1) % len(self.returns)
+        if columns is None:
+            return self.returns[order]
+        return self.returns[np.ix_(order, columns)]
+
+
+class RiskModel:
+    """EWMA covariance over the tracked universe, kept in step with stored closes.
+
+    A request only loads history for the symbols it holds. The rest of the
+    universe is fetched once per new daily bar, to fold that bar in with
+    one rank-1 update (redoing the previous one if its close was revised).
+    Symbols not tracked yet are added from their returns over the stored
+    window. The universe keeps at most ``max_symbols`` names and evicts the
+    least recently requested ones first.
+    """
+
+    def __init__(self, decay=EWMA_DECAY, history=500, period='2y', max_symbols=1000):
+        self.decay = decay
+        self.history = history
+        self.period = period
+        self.max_symbols = max_symbols
+        self.model = None
+        self.last_date = None
+        # Close dates behind the stored return window, and the filled
+        # closes of the last two bars seen
+        self.dates = None
+        self.last_closes = None
+        self._used = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _returns(self, close):
+        # Carry each symbol's last close over missing bars before differencing
+        observed = ~np.isnan(close)
+        last_seen = np.maximum.accumulate(np.where(observed, np.arange(close.shape[1]), 0), axis=1)
+        filled = np.take_along_axis(close, last_seen, axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = filled[:, 1:] / filled[:, :-1] - 1.0
+        return np.where(np.isfinite(returns), returns, 0.0), filled
+
+    def _remember(self, dates, filled):
+        kept = min(self.model.count, self.history)
+        self.dates = dates[-(kept + 1):]
+        self.last_date = dates[-1]
+        self.last_closes = filled[:, -2:].copy()
+
+    def _rebuild(self, fetcher, universe):
+        data = fetcher.get_many(universe, period=self.period)
+        returns, filled = self._returns(data['close'])
+        self.model = EwmaCovariance(universe, self.decay, self.history)
+        self.model.fit(returns)
+        self._remember(data['dates'], filled)
+
+    def _advance(self, fetcher):
+        """Fold in the bars the universe gained since ``last_date``"""
+        universe = list(self.model.symbols)
+        data = fetcher.get_many(universe, period=self.period)
+        dates, close = data['dates'], data['close']
+        if self.last_date not in dates or dates.get_loc(self.last_date) == 0:
+            self._rebuild(fetcher, universe)
+            return
+        # Only the bars from the one before last_date onwards; the previous
+        # sync's closes fill any gap at the start
+        position = dates.get_loc(self.last_date)
+        block = close[:, position - 1:].copy()
+        block[:, 0] = np.where(np.isnan(block[:, 0]), self.last_closes[:, 0], block[:, 0])
+        returns, filled = self._returns(block)
+        if not np.array_equal(filled[:, 1], self.last_closes[:, 1], equal_nan=True):
+            self.model.revise(returns[:, 0])
+        for t in range(1, returns.shape[1]):
+            self.model.update(returns[:, t])
+        self._remember(dates, filled)
+
+    def _add(self, symbols, data):
+        """Track ``symbols``, whose closes ``data`` (from get_many) holds"""
+        rows = [data['symbols'].index(symbol) for symbol in symbols]
+        close = pd.DataFrame(data['close'][rows].T, index=data['dates']).reindex(self.dates).to_numpy().T
+        returns, filled = self._returns(close)
+        self.model.extend(symbols, returns)
+        self.last_closes = np.vstack([self.last_closes, filled[:, -2:]])
+
+    def _evict(self):
+        excess = len(self.model.symbols) - self.max_symbols
+        if excess <= 0:
+            return
+        evicted = [symbol for symbol in self._used if symbol in self.model.index][:excess]
+        keep = [i for i, symbol in enumerate(self.model.symbols) if symbol not in set(evicted)]
+        self.model.remove(evicted)
+        self.last_closes = self.last_closes[keep]
+        for symbol in evicted:
+            del self._used[symbol]
+
+    def sync(self, fetcher, symbols):
+        """Bring the covariance up to date for ``symbols``
+
+        Returns the EwmaCovariance, or None when there is not enough history.
+        """
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        with self._lock:
+            for symbol in symbols:
+                self._used[symbol] = None
+                self._used.move_to_end(symbol)
+
+            held = fetcher.get_many(symbols, period=self.period)
+            if len(held['dates']) < 2:
+                return self.model
+            if self.model is None:
+                self._rebuild(fetcher, symbols)
+                return self.model
+
+            if held['dates'][-1] > self.last_date:
+                self._advance(fetcher)
+            new = [symbol for symbol in symbols if symbol not in self.model.index]
+            if new:
+                self._add(new, held)
+            self._evict()
+            return self.model
+
+    def report(self, symbols, exposures, confidence=0.99, horizon=1):
+        """Volatility, VaR and risk contributions for dollar ``exposures`` in ``symbols``
+
+        All figures are in currency over ``horizon`` trading days, scaled by
+        the square root of time. Component contributions sum to the
+        portfolio volatility.
+        """
+        with self._lock:
+            model = self.model
+            positions = [model.index[symbol.upper()] for symbol in symbols]
+            cov = model.cov[np.ix_(positions, positions)]
+            history = model.history(positions)
+
+        exposures = np.asarray(exposures, dtype=float)
+        covariance_exposure = cov @ exposures
+        variance = float(exposures @ covariance_exposure)
+        volatility = np.sqrt(max(variance, 0.0))
+        scale = np.sqrt(horizon)
+
+        if volatility > 0:
+            marginal = covariance_exposure / volatility
+        else:
+            marginal = np.zeros_like(exposures)
+        contributions = exposures * marginal
+
+        pnl = history @ exposures
+        historical_var = float(-np.quantile(pnl, 1.0 - confidence)) * scale if len(pnl) else np.nan
+        z = NormalDist().inv_cdf(confidence)
+
+        stdev = np.sqrt(np.diag(cov))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = cov / np.outer(stdev, stdev)
+
+        return {
+            'volatility': volatility * scale,
+            'annualized_volatility': volatility * np.sqrt(TRADING_DAYS),
+            'parametric_var': z * volatility * scale,
+            'historical_var': historical_var,
+            'marginal_contributions': marginal,
+            'component_contributions': contributions * scale,
+            'correlation': correlation,
+        }
@@ -0,0 +1,134 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Chart interval -> pandas period alias used to bucket daily bars
+INTERVALS = {
+    '1wk': 'W-FRI',
+    '1mo': 'M',
+    '3mo': 'Q',
+}
+
+
+def rollup_ohlc(hist, interval):
+    """Aggregate daily bars into weekly/monthly/quarterly OHLCV bars
+
+    Each bucket is labelled with the timestamp of its first daily bar.
+    """
+    if hist.empty:
+        return hist[['Open', 'High', 'Low', 'Close', 'Volume']].copy()
+
+    keys = hist.index.tz_localize(None).to_period(INTERVALS[interval]).asi8
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+
+    return pd.DataFrame({
+        'Open': hist['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(hist['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(hist['Low'].to_numpy(), starts),
+        'Close': hist['Close'].to_numpy()[ends],
+        'Volume': np.add.reduceat(hist['Volume'].to_numpy(), starts),
+    }, index=hist.index[starts])
+
+
+class RollupPyramid:
+    """Weekly, monthly and quarterly rollups of one symbol's daily bars.
+
+    ``update`` re-aggregates only from the start of each level's last
+    (possibly still open) bucket, so a new daily bar touches one or two
+    buckets per level instead of the whole series.
+    """
+
+    def __init__(self, hist):
+        self.levels = {interval: rollup_ohlc(hist, interval) for interval in INTERVALS}
+        self._mark(hist)
+
+    def _mark(self, hist):
+        self.last_timestamp = hist.index[-1]
+        self.last_bar = tuple(hist[['Open', 'High', 'Low', 'Close', 'Volume']].iloc[-1])
+
+    def is_current(self, hist):
+        """Whether ``hist`` has no bar newer than, or different from, the last one rolled up"""
+        return hist.index[-1] == self.last_timestamp and \
+            tuple(hist[['Open', 'High', 'Low', 'Close', 'Volume']].iloc[-1]) == self.last_bar
+
+    def update(self, hist):
+        for interval, bars in self.levels.items():
+            if bars.empty:
+                self.levels[interval] = rollup_ohlc(hist, interval)
+                continue
+            open_bucket = bars.index[-1]
+            tail = rollup_ohlc(hist[hist.index >= open_bucket], interval)
+            self.levels[interval] = pd.concat([bars[bars.index < open_bucket], tail])
+        self._mark(hist)
+
+
+class RollupTracker:
+    """One RollupPyramid per symbol, kept in step with the daily history it is given"""
+
+    def __init__(self):
+        self._pyramids = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbol, hist, interval):
+        """Bars for ``interval`` ('1d' returns ``hist`` itself) covering ``hist``'s date range"""
+        if interval == '1d':
+            return hist
+        if interval not in INTERVALS:
+            raise ValueError(f"Unknown interval '{interval}', expected 1d or one of {', '.join(INTERVALS)}")
+
+        symbol = symbol.upper()
+        with self._lock:
+            pyramid = self._pyramids.get(symbol)
+            if pyramid is None or pyramid.levels[interval].empty or \
+                    hist.index[0] < pyramid.levels[interval].index[0]:
+                pyramid = self._pyramids[symbol] = RollupPyramid(hist)
+            elif hist.index[-1] >= pyramid.last_timestamp and not pyramid.is_current(hist):
+                pyramid.update(hist)
+            bars = pyramid.levels[interval]
+
+        # The first bucket may start before hist does; keep the one containing it
+        first = np.searchsorted(bars.index, hist.index[0], side='right') - 1
+        last = np.searchsorted(bars.index, hist.index[-1], side='right')
+        return bars.iloc[max(first, 0):last]
+
+
+def lttb(x, y, threshold):
+    """Indices of the ``threshold`` points kept by Largest-Triangle-Three-Buckets
+
+    Always keeps the first and last points; from each bucket in between it
+    keeps the point forming the largest triangle with the previously kept
+    point and the average of the next bucket, which preserves peaks and
+    troughs far better than striding.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+
+        areas = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(bars, points):
+    """Keep at most ``points`` bars, chosen by LTTB on the close"""
+    if points is None or len(bars) <= points:
+        return bars
+    x = bars.index.as_unit('ns').asi8.astype(float)
+    return bars.iloc[lttb(x, bars['Close'].to_numpy(dtype=float), points)]
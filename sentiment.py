@@ -0,0 +1,331 @@
+import hashlib
+import math
+import os
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from local_db import ThreadConnections
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    hash TEXT PRIMARY KEY,
+    polarity REAL NOT NULL,
+    subjectivity REAL NOT NULL
+);
+"""
+
+# Keeps each IN (...) lookup under SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+
+
+def content_hash(text):
+    """Key for a headline's score: whitespace differences don't make a new headline"""
+    return hashlib.sha1(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+
+def article_key(title, published):
+    """Identifies one article in the sentiment index: the same headline on another day counts again"""
+    return content_hash(f"{published.isoformat()} {title}")
+
+
+def label_for(score):
+    return 'Positive' if score > 0 else 'Negative' if score < 0 else 'Neutral'
+
+
+class SentimentScorer:
+    """TextBlob polarity for batches of headlines, memoized by content hash.
+
+    Scores live in a SQLite file shared by every process, with an in-memory
+    dict in front of it. ``score`` de-duplicates its batch, looks all unseen
+    hashes up in one query per chunk, runs TextBlob only on headlines no
+    process has scored before and stores those in one transaction.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('SENTIMENT_CACHE_PATH', os.path.join('data', 'sentiment.sqlite3'))
+        self._memo = {}
+        self._lock = threading.Lock()
+        self.scored = 0  # headlines this process ran through TextBlob
+        self.connections = ThreadConnections(self.path, SCHEMA)
+
+    def _lookup(self, hashes):
+        conn = self.connections.get()
+        found = {}
+        for start in range(0, len(hashes), LOOKUP_CHUNK):
+            chunk = hashes[start:start + LOOKUP_CHUNK]
+            rows = conn.execute(
+                f"SELECT hash, polarity, subjectivity FROM scores WHERE hash IN ({','.join('?' * len(chunk))})",
+                chunk)
+            found.update((h, (polarity, subjectivity)) for h, polarity, subjectivity in rows)
+        return found
+
+    def score(self, texts):
+        """``(polarity, subjectivity)`` for each text, in order"""
+        from textblob import TextBlob
+
+        hashes = [content_hash(text) for text in texts]
+        unique = {}
+        for h, text in zip(hashes, texts):
+            unique.setdefault(h, text)
+
+        with self._lock:
+            missing = [h for h in unique if h not in self._memo]
+        if missing:
+            found = self._lookup(missing)
+            new = {}
+            for h in missing:
+                if h not in found:
+                    sentiment = TextBlob(unique[h]).sentiment
+                    new[h] = (sentiment.polarity, sentiment.subjectivity)
+            if new:
+                conn = self.connections.get()
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    conn.executemany('INSERT OR IGNORE INTO scores (hash, polarity, subjectivity) VALUES (?, ?, ?)',
+                                     [(h, polarity, subjectivity) for h, (polarity, subjectivity) in new.items()])
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+            with self._lock:
+                self._memo.update(found)
+                self._memo.update(new)
+                self.scored += len(new)
+
+        with self._lock:
+            return [self._memo[h] for h in hashes]
+
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sentiment_articles (
+    symbol TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    published REAL NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (symbol, hash)
+);
+"""
+
+DAY = 86400
+
+# Days are bucketed as the exchange's calendar days, so an evening
+# headline in New York stays on that day's bar instead of moving to the
+# next UTC date
+EXCHANGE_TZ = os.environ.get('SENTIMENT_TZ', 'America/New_York')
+
+
+def local_seconds(seconds, tz):
+    """Wall-clock seconds in ``tz`` for epoch ``seconds`` (a number or an array)"""
+    if np.ndim(seconds) == 0:
+        return seconds + datetime.fromtimestamp(seconds, tz).utcoffset().total_seconds()
+    seconds = np.asarray(seconds, dtype=float)
+    stamps = pd.to_datetime(seconds, unit='s', utc=True)
+    offsets = (stamps.tz_convert(tz).tz_localize(None) - stamps.tz_localize(None)).total_seconds()
+    return seconds + offsets.to_numpy()
+
+
+class SentimentSeries:
+    """Per-bucket article counts and score sums for one symbol, plus a decayed average.
+
+    Buckets are ``bucket_seconds`` wide and kept in dense arrays starting at
+    the oldest bucket seen, so any window is a slice. Buckets follow the
+    wall clock in ``tz``, so daily buckets are local calendar days; every
+    method still takes epoch seconds. The decayed average
+    weights each article by ``0.5 ** (age / half_life)``; since the weights
+    of the sum and of the count decay alike, their ratio only changes when
+    an article arrives, and an article older than the newest one seen is
+    simply added with its smaller weight.
+    """
+
+    def __init__(self, bucket_seconds=DAY, half_life=3 * DAY, tz=EXCHANGE_TZ):
+        self.bucket_seconds = bucket_seconds
+        self.tz = ZoneInfo(tz) if isinstance(tz, str) else tz
+        self.decay = math.log(2) / half_life
+        self.origin = None  # bucket number of counts[0]
+        self.counts = np.zeros(0)
+        self.sums = np.zeros(0)
+        self.decayed_sum = 0.0
+        self.decayed_weight = 0.0
+        self.latest = None
+
+    def _slot(self, bucket):
+        if self.origin is None:
+            self.origin = bucket
+        if bucket < self.origin:
+            pad = self.origin - bucket
+            self.counts = np.concatenate([np.zeros(pad), self.counts])
+            self.sums = np.concatenate([np.zeros(pad), self.sums])
+            self.origin = bucket
+        position = bucket - self.origin
+        if position >= len(self.counts):
+            # Grow geometrically so appending day after day stays amortised O(1)
+            size = max(position + 1, 2 * len(self.counts), 16)
+            self.counts = np.concatenate([self.counts, np.zeros(size - len(self.counts))])
+            self.sums = np.concatenate([self.sums, np.zeros(size - len(self.sums))])
+        return position
+
+    def add(self, published, score):
+        """Count one article published at ``published`` (epoch seconds)"""
+        position = self._slot(int(local_seconds(published, self.tz) // self.bucket_seconds))
+        self.counts[position] += 1
+        self.sums[position] += score
+
+        if self.latest is None or published >= self.latest:
+            if self.latest is not None:
+                factor = math.exp(-self.decay * (published - self.latest))
+                self.decayed_sum *= factor
+                self.decayed_weight *= factor
+            self.decayed_sum += score
+            self.decayed_weight += 1.0
+            self.latest = published
+        else:
+            weight = math.exp(-self.decay * (self.latest - published))
+            self.decayed_sum += score * weight
+            self.decayed_weight += weight
+
+    @property
+    def decayed_average(self):
+        return self.decayed_sum / self.decayed_weight if self.decayed_weight else np.nan
+
+    def _span(self, start, end):
+        """Array positions of the buckets holding ``[start, end)`` (epoch seconds)"""
+        first = int(local_seconds(start, self.tz) // self.bucket_seconds) - self.origin
+        last = -(-int(local_seconds(end, self.tz)) // self.bucket_seconds) - self.origin
+        return max(first, 0), min(max(last, 0), len(self.counts))
+
+    def window(self, start, end):
+        """Article count, score sum and mean score for ``[start, end)``, at bucket resolution"""
+        if self.origin is None:
+            return {'count': 0, 'sum': 0.0, 'mean': np.nan}
+        first, last = self._span(start, end)
+        count = float(self.counts[first:last].sum())
+        total = float(self.sums[first:last].sum())
+        return {'count': int(count), 'sum': total, 'mean': total / count if count else np.nan}
+
+    def aligned(self, timestamps):
+        """Count, mean and decayed mean of the articles up to each timestamp (sorted epoch seconds)
+
+        A bar's count and mean cover the buckets since the previous bar, so
+        weekend news lands on Monday; the decayed mean covers all earlier
+        buckets, at bucket resolution.
+        """
+        timestamps = np.asarray(timestamps, dtype=float)
+        n = len(timestamps)
+        if self.origin is None or n == 0:
+            return np.zeros(n, dtype=int), np.full(n, np.nan), np.full(n, np.nan)
+
+        local = local_seconds(timestamps, self.tz)
+        positions = np.clip(np.floor(local / self.bucket_seconds).astype(int) - self.origin + 1,
+                            0, len(self.counts))
+        cum_counts = np.concatenate([[0.0], np.cumsum(self.counts)])
+        cum_sums = np.concatenate([[0.0], np.cumsum(self.sums)])
+        # The first bar takes only its own bucket
+        since = np.concatenate([[max(positions[0] - 1, 0)], positions[:-1]])
+        counts = cum_counts[positions] - cum_counts[since]
+        sums = cum_sums[positions] - cum_sums[since]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(counts > 0, sums / counts, np.nan)
+
+        # Exponentially decayed sums at the end of every bucket
+        factor = math.exp(-self.decay * self.bucket_seconds)
+        decayed_sums = np.zeros(len(self.counts) + 1)
+        decayed_counts = np.zeros(len(self.counts) + 1)
+        running_sum = running_count = 0.0
+        for i in range(len(self.counts)):
+            running_sum = running_sum * factor + self.sums[i]
+            running_count = running_count * factor + self.counts[i]
+            decayed_sums[i + 1] = running_sum
+            decayed_counts[i + 1] = running_count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            decayed = np.where(decayed_counts[positions] > 0,
+                               decayed_sums[positions] / decayed_counts[positions], np.nan)
+        return counts.astype(int), means, decayed
+
+
+class SentimentIndex:
+    """Rolling sentiment per symbol, built up as scored articles arrive.
+
+    Articles are recorded once per symbol in the scores database, so the
+    index outlives the news provider's lookback and is rebuilt from there
+    the first time a symbol is used in a process.
+    """
+
+    def __init__(self, path=None, bucket_seconds=DAY, half_life=3 * DAY, tz=EXCHANGE_TZ):
+        self.path = path or os.environ.get('SENTIMENT_CACHE_PATH', os.path.join('data', 'sentiment.sqlite3'))
+        self.bucket_seconds = bucket_seconds
+        self.half_life = half_life
+        self.tz = tz
+        self._series = {}
+        self._seen = {}  # symbol -> hashes already in its series
+        self._lock = threading.Lock()
+        self.connections = ThreadConnections(self.path, INDEX_SCHEMA)
+
+    def _get(self, symbol):
+        # Callers hold self._lock
+        series = self._series.get(symbol)
+        if series is None:
+            series = self._series[symbol] = SentimentSeries(self.bucket_seconds, self.half_life, self.tz)
+            seen = self._seen[symbol] = set()
+            rows = self.connections.get().execute(
+                'SELECT hash, published, score FROM sentiment_articles WHERE symbol = ? ORDER BY published',
+                (symbol,))
+            for h, published, score in rows:
+                series.add(published, score)
+                seen.add(h)
+        return series
+
+    def add(self, symbol, articles):
+        """Record ``[(hash, published_epoch_seconds, score), ...]``; returns how many were new"""
+        symbol = symbol.upper()
+        with self._lock:
+            series = self._get(symbol)
+            seen = self._seen[symbol]
+            new = list({h: (h, published, score) for h, published, score in articles if h not in seen}.values())
+            if not new:
+                return 0
+
+            # Another process may have stored some of these already; they are
+            # still new to this process's series
+            conn = self.connections.get()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO sentiment_articles (symbol, hash, published, score) VALUES (?, ?, ?, ?)',
+                    [(symbol, h, published, score) for h, published, score in new])
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            for h, published, score in new:
+                series.add(published, score)
+                seen.add(h)
+        return len(new)
+
+    def window(self, symbol, start, end):
+        with self._lock:
+            return self._get(symbol.upper()).window(start, end)
+
+    def decayed_average(self, symbol):
+        with self._lock:
+            return self._get(symbol.upper()).decayed_average
+
+    def aligned(self, symbol, index):
+        """DataFrame of sentiment_count, sentiment_mean and sentiment_decayed on a price index
+
+        Each bar is placed at the end of its own calendar date in the
+        exchange's timezone, so it takes the news published that local day.
+        Naive indexes are taken to be exchange-local already.
+        """
+        dates = index.tz_convert(self.tz) if index.tz is not None else index.tz_localize(self.tz)
+        ends = (dates.normalize() + pd.DateOffset(days=1)).as_unit('s').asi8 - 1
+        with self._lock:
+            counts, means, decayed = self._get(symbol.upper()).aligned(ends)
+        return pd.DataFrame({
+            'sentiment_count': counts,
+            'sentiment_mean': means,
+            'sentiment_decayed': decayed,
+        }, index=index)
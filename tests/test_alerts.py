@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from alerts import AlertBook, AlertEngine
+
+
+def crossed(alerts, price):
+    return {alert_id for alert_id, (direction, threshold) in alerts.items()
+            if (direction == 'above' and price >= threshold) or (direction == 'below' and price <= threshold)}
+
+
+def test_engine_matches_a_scan_through_adds_removals_and_ticks():
+    rng = random.Random(4)
+    engine, loaded, waiting = AlertEngine(), AlertEngine(), {}
+    for alert_id in range(2000):
+        direction, threshold = rng.choice(['above', 'below']), round(rng.uniform(90, 110), 1)
+        engine.add(alert_id, 'aapl', direction, threshold)
+        waiting[alert_id] = (direction, threshold)
+    for alert_id in rng.sample(sorted(waiting), 300):
+        assert engine.remove(alert_id)
+        del waiting[alert_id]
+    loaded.load([(alert_id, 'AAPL', direction, threshold) for alert_id, (direction, threshold) in waiting.items()])
+
+    for price in [100, 100.0, 103.3, 96.1, 110.5, 89.9]:
+        expected = crossed(waiting, price)
+        for alert_id in expected:
+            del waiting[alert_id]
+        for book in (engine, loaded):
+            fired = book.match('AAPL', price)
+            assert len(fired) == len(set(fired)) and set(fired) == expected
+        assert len(engine) == len(loaded) == len(waiting)
+    assert not waiting and engine.symbols() == []
+
+
+def test_fired_alerts_come_off_the_end_of_each_book():
+    book = AlertBook()
+    for alert_id, threshold in enumerate([105.0, 101.0, 110.0, 101.0]):
+        book.add(alert_id, 'above', threshold)
+    for alert_id, threshold in enumerate([95.0, 99.0, 90.0], start=10):
+        book.add(alert_id, 'below', threshold)
+    # Above thresholds descending, below ascending: both fire from the end
+    assert book.keys['above'] == [-110.0, -105.0, -101.0, -101.0]
+    assert book.keys['below'] == [90.0, 95.0, 99.0]
+
+    # Ties fire in the order they were added
+    assert book.match(101.0) == [1, 3]
+    assert book.match(95.0) == [10, 11]
+    assert book.ids == {'above': [2, 0], 'below': [12]}
+
+
+def test_thresholds_are_inclusive_and_alerts_fire_once():
+    engine = AlertEngine()
+    engine.add(1, 'msft', 'above', 300)
+    engine.add(2, 'MSFT', 'below', 250)
+    engine.add(1, 'MSFT', 'above', 999)  # re-adding an id is a no-op
+    assert engine.match('MSFT', 299.99) == []
+    assert engine.match('msft', 300) == [1]
+    assert engine.match('MSFT', 300) == []
+    assert engine.match('MSFT', 250) == [2]
+    assert engine.match('TSLA', 1) == []
+
+
+def test_remove_only_takes_the_named_alert():
+    engine = AlertEngine()
+    for alert_id in range(3):
+        engine.add(alert_id, 'X', 'above', 10.0)
+    assert engine.remove(1)
+    assert not engine.remove(1)
+    assert engine.match('X', 10.0) == [0, 2]
+
+
+def test_unknown_direction_is_rejected():
+    with pytest.raises(ValueError):
+        AlertEngine().add(1, 'X', 'sideways', 1.0)
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from backtest import (BACKTESTED_MODELS, BacktestStore, backtested_models, fold_origins, forecast_path,
+                      run_backtests, score)
+from model_registry import ModelRegistry
+from predictors import predict_with_lstm
+
+
+def test_fold_origins_leave_room_for_the_longest_horizon():
+    origins = fold_origins(200, folds=5, horizons=(1, 5), min_train=61)
+    np.testing.assert_array_equal(origins, [175, 180, 185, 190, 195])
+    assert origins[-1] + 5 <= 200
+    # Folds that would train on too little history are dropped
+    assert len(fold_origins(80, folds=10, horizons=(1, 5), min_train=61)) == 3
+
+
+def test_score_against_hand_computed_values():
+    actual = [110.0, 90.0, 100.0, np.nan]
+    predicted = [105.0, 95.0, 101.0, 100.0]
+    last = [100.0, 100.0, 102.0, 100.0]
+    scores = score(actual, predicted, last)
+    errors = np.array([-5.0, 5.0, 1.0])
+    assert scores['folds'] == 3
+    assert scores['mape'] == pytest.approx(np.mean(np.abs(errors) / [110, 90, 100]) * 100)
+    assert scores['rmse'] == pytest.approx(np.sqrt(np.mean(errors ** 2)))
+    # Up/up, down/down and down(101 < 102)/down(100 < 102)
+    assert scores['direction'] == pytest.approx(100.0)
+    assert score([np.nan], [1.0], [1.0]) == {'mape': None, 'rmse': None, 'direction': None, 'folds': 0}
+
+
+def test_forecast_path_feeds_predictions_back():
+    history = np.arange(100.0, 160.0)
+    # A straight line is extended exactly by the linear trend
+    np.testing.assert_allclose(forecast_path('Linear Regression', history, 3), [160.0, 161.0, 162.0])
+
+
+def test_run_backtests_scores_each_fold_on_data_after_its_origin():
+    rng = np.random.default_rng(1)
+    series = 100 + np.cumsum(rng.normal(0, 1, 150))
+    results = run_backtests({'X': series}, models=['Linear Regression'], folds=4, horizons=(1, 3),
+                            processes=1)
+
+    origins = fold_origins(len(series), 4, (1, 3))
+    paths = np.array([forecast_path('Linear Regression', series[:origin], 3) for origin in origins])
+    for horizon in (1, 3):
+        expected = score(series[origins + horizon - 1], paths[:, horizon - 1], series[origins - 1])
+        assert results['X']['Linear Regression'][horizon] == pytest.approx(expected)
+
+
+def test_accuracy_labels_own_average_and_missing(tmp_path):
+    store = BacktestStore(str(tmp_path / 'backtests.sqlite3'))
+    scores = {'mape': 1.0, 'rmse': 1.0, 'direction': 60.0, 'folds': 4}
+    store.save('aaa', '2024-01-02', {'ARIMA': {1: scores}, 'Linear Regression': {1: dict(scores, direction=40.0)}})
+    store.save('bbb', '2024-01-02', {'ARIMA': {1: dict(scores, direction=70.0)}})
+
+    assert store.accuracy('AAA') == {'LSTM': (None, None), 'ARIMA': (60.0, 'symbol'),
+                                     'Linear Regression': (40.0, 'symbol')}
+    assert store.accuracy('CCC')['ARIMA'] == (pytest.approx(65.0), 'average')
+    assert store.accuracy('BBB')['Linear Regression'] == (40.0, 'average')
+
+
+def test_arima_path_comes_from_one_fit_per_fold():
+    from statsmodels.tsa.arima.model import ARIMA
+
+    rng = np.random.default_rng(2)
+    history = 100 + np.cumsum(rng.normal(0, 1, 120))
+    expected = ARIMA(history, order=(5, 1, 0)).fit().forecast(steps=5)
+    np.testing.assert_allclose(forecast_path('ARIMA', history, 5), expected)
+
+
+def test_lstm_drift_fallback_is_backtested_until_a_model_is_trained(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    assert backtested_models('AAA', registry) == BACKTESTED_MODELS + ('LSTM',)
+
+    # The cold path replays exactly what an untrained symbol is served
+    history = np.linspace(50.0, 80.0, 90)
+    assert forecast_path('LSTM', history, 1) == [float(predict_with_lstm(history, 'AAA')[0])]
+
+    store = BacktestStore(str(tmp_path / 'backtests.sqlite3'))
+    scores = {'mape': 1.0, 'rmse': 1.0, 'direction': 55.0, 'folds': 4}
+    store.save('aaa', '2024-01-02', {'LSTM': {1: scores}})
+    assert store.accuracy('AAA', registry=registry)['LSTM'] == (55.0, 'symbol')
+    assert store.accuracy('BBB', registry=registry)['LSTM'] == (55.0, 'average')
+
+    (tmp_path / 'AAA.keras').write_bytes(b'')
+    assert backtested_models('AAA', registry) == BACKTESTED_MODELS
+    assert store.accuracy('AAA', registry=registry)['LSTM'] == (None, None)
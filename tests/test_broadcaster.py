@@ -0,0 +1,45 @@
+import pytest
+
+import broadcaster
+from broadcaster import PriceBroadcaster
+
+
+class FakeSocketIO:
+    def __init__(self):
+        self.tasks = []
+
+    def start_background_task(self, target):
+        self.tasks.append(target)
+
+
+class FakeFetcher:
+    ttls = {'quote': 1}
+
+
+@pytest.fixture
+def prices(monkeypatch):
+    monkeypatch.setattr(broadcaster, 'join_room', lambda room, sid=None: None)
+    monkeypatch.setattr(broadcaster, 'leave_room', lambda room, sid=None: None)
+    return PriceBroadcaster(FakeSocketIO(), FakeFetcher(), max_client_symbols=2)
+
+
+@pytest.mark.parametrize('symbol', ['../etc', 'A B', '', None, 42, 'X' * 40])
+def test_malformed_symbols_are_refused(prices, symbol):
+    with pytest.raises(ValueError):
+        prices.subscribe('sid', symbol)
+    assert prices.subscribers == {}
+
+
+def test_each_client_holds_a_limited_number_of_symbols(prices):
+    prices.subscribe('a', 'aapl')
+    prices.subscribe('a', 'MSFT')
+    prices.subscribe('a', 'AAPL')  # already held, doesn't count again
+    with pytest.raises(ValueError):
+        prices.subscribe('a', 'TSLA')
+    prices.subscribe('b', 'TSLA')  # the limit is per client
+    assert sorted(prices.subscribers) == ['AAPL', 'MSFT', 'TSLA']
+
+    prices.unsubscribe('a', 'msft')
+    prices.subscribe('a', 'BRK-B')
+    assert prices.client_symbols['a'] == {'AAPL', 'BRK-B'}
+    assert len(prices.socketio.tasks) == 1
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import history_store
+from history_store import COLUMNS, HistoryStore
+
+
+def bars(dates, closes):
+    closes = np.asarray(closes, dtype=float)
+    return pd.DataFrame({
+        'Open': closes - 1, 'High': closes + 1, 'Low': closes - 2, 'Close': closes,
+        'Volume': np.arange(len(closes)) + 1000, 'Dividends': 0.0, 'Stock Splits': 0.0,
+    }, index=pd.DatetimeIndex(dates, name='Date'))
+
+
+class Upstream:
+    """What yf.Ticker(...).history serves, recording each call"""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.calls = []
+
+    def ticker(self, symbol):
+        upstream = self
+
+        class Ticker:
+            def history(self, period=None, start=None):
+                upstream.calls.append({'period': period, 'start': start})
+                if start is not None:
+                    return upstream.frame[upstream.frame.index >= pd.Timestamp(start, tz=upstream.frame.index.tz)]
+                return upstream.frame
+
+        return Ticker()
+
+
+@pytest.fixture
+def dates():
+    return pd.bdate_range(end=pd.Timestamp.now(tz='America/New_York').normalize(), periods=300)
+
+
+@pytest.mark.parametrize('mmap', [False, True])
+def test_tail_refresh_revises_the_last_bar_and_appends_new_ones(tmp_path, monkeypatch, dates, mmap):
+    upstream = Upstream(bars(dates[:-2], np.arange(298) + 100.0))
+    monkeypatch.setattr(history_store.yf, 'Ticker', upstream.ticker)
+    store = HistoryStore(root=str(tmp_path), refresh_after=0, mmap=mmap)
+
+    assert store.update('aapl', '1y')
+    assert upstream.calls == [{'period': '1y', 'start': None}]
+
+    # The stored last bar was partial: upstream now has its final close
+    # and two more bars
+    closes = np.arange(300) + 100.0
+    closes[297] = 500.0
+    upstream.frame = bars(dates, closes)
+    assert store.update('AAPL', '1y')
+    assert upstream.calls[-1] == {'period': None, 'start': dates[297].strftime('%Y-%m-%d')}
+
+    stored = store.read('AAPL')
+    assert store.meta('AAPL')['rows'] == 300
+    np.testing.assert_array_equal(stored.index.as_unit('ns').asi8, dates.as_unit('ns').asi8)
+    expected = bars(dates, closes)
+    for column in COLUMNS:
+        np.testing.assert_array_equal(stored[column].to_numpy(), expected[column].to_numpy(), err_msg=column)
+
+
+def test_fresh_history_is_not_refetched_and_short_history_is_redownloaded(tmp_path, monkeypatch, dates):
+    upstream = Upstream(bars(dates[-30:], np.arange(30) + 1.0))
+    monkeypatch.setattr(history_store.yf, 'Ticker', upstream.ticker)
+    store = HistoryStore(root=str(tmp_path), refresh_after=900)
+
+    assert store.update('MSFT', '1mo')
+    assert not store.update('MSFT', '1mo')
+    assert len(upstream.calls) == 1
+
+    # Thirty bars don't reach back a year, nor to an unknown period's start
+    upstream.frame = bars(dates, np.arange(300) + 1.0)
+    assert store.update('MSFT', '1y')
+    assert upstream.calls[-1] == {'period': '1y', 'start': None}
+    assert len(store.read('MSFT', '1y')) < 300 == store.meta('MSFT')['rows']
+    assert store.update('MSFT', 'weird')
+
+
+def test_symbols_are_checked_before_touching_the_filesystem(tmp_path):
+    store = HistoryStore(root=str(tmp_path))
+    with pytest.raises(ValueError):
+        store.read('../../etc')
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,30 @@
+import subprocess
+import sys
+
+import pytest
+
+from import_budget import HEAVY_MODULES, ROOT, import_profile
+
+
+def heavy_imports(module):
+    return sorted({name.split('.')[0] for name in import_profile(module)} & set(HEAVY_MODULES))
+
+
+@pytest.mark.parametrize('module', ['app', 'worker'])
+def test_startup_loads_no_ml_backend(module):
+    assert heavy_imports(module) == []
+
+
+def test_backends_load_on_first_use():
+    script = (
+        "import sys, numpy as np\n"
+        "from predictors import predict_with_linear_regression, predict_with_arima\n"
+        "series = np.linspace(100, 110, 60)\n"
+        "predict_with_linear_regression(series)\n"
+        "print('sklearn' in sys.modules, 'statsmodels' in sys.modules)\n"
+        "predict_with_arima(series)\n"
+        "print('statsmodels' in sys.modules)\n"
+    )
+    completed = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.split() == ['False', 'False', 'True']
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import IndicatorSet, IndicatorTracker, compute_indicators
+
+
+def pandas_indicators(close):
+    """The calculation in StockDataFetcher.get_technical_indicators"""
+    close = pd.Series(close)
+    delta = close.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    ema_12, ema_26 = close.ewm(span=12).mean(), close.ewm(span=26).mean()
+    macd = ema_12 - ema_26
+    return {
+        'SMA_20': close.rolling(window=20).mean().to_numpy(),
+        'SMA_50': close.rolling(window=50).mean().to_numpy(),
+        'EMA_12': ema_12.to_numpy(),
+        'EMA_26': ema_26.to_numpy(),
+        'RSI': (100 - (100 / (1 + gain / loss))).to_numpy(),
+        'MACD': macd.to_numpy(),
+        'MACD_signal': macd.ewm(span=9).mean().to_numpy(),
+    }
+
+
+@pytest.fixture
+def closes():
+    rng = np.random.default_rng(11)
+    return 50 * np.exp(np.cumsum(rng.normal(0, 0.015, 300)))
+
+
+def streamed(closes):
+    indicators = IndicatorSet()
+    rows = [indicators.update(close) for close in closes]
+    return {name: np.array([row[name] for row in rows]) for name in indicators.indicators}
+
+
+def test_streaming_matches_pandas(closes):
+    expected = pandas_indicators(closes)
+    for name, values in streamed(closes).items():
+        np.testing.assert_allclose(values, expected[name], rtol=1e-12, equal_nan=True, err_msg=name)
+
+
+def test_streaming_handles_missing_closes(closes):
+    closes = closes.copy()
+    closes[[40, 41, 120]] = np.nan
+    expected = pandas_indicators(closes)
+    for name, values in streamed(closes).items():
+        np.testing.assert_allclose(values, expected[name], rtol=1e-12, equal_nan=True, err_msg=name)
+
+
+def test_revise_matches_recomputing_the_last_bar(closes):
+    indicators = IndicatorSet.from_history(closes)
+    revised = indicators.revise(closes[-1] * 1.03)
+    changed = closes.copy()
+    changed[-1] *= 1.03
+    expected = pandas_indicators(changed)
+    for name, value in revised.items():
+        np.testing.assert_allclose(value, expected[name][-1], rtol=1e-12, err_msg=name)
+
+
+def test_tracker_applies_only_new_bars(closes):
+    index = pd.date_range('2024-01-01', periods=len(closes), freq='D')
+    series = pd.Series(closes, index=index)
+    tracker = IndicatorTracker()
+    tracker.sync('msft', series.iloc[:250])
+    latest = tracker.sync('MSFT', series)
+    expected = pandas_indicators(closes)
+    for name, value in latest.items():
+        np.testing.assert_allclose(value, expected[name][-1], rtol=1e-12, err_msg=name)
+
+
+def test_matrix_rows_match_each_symbol_alone():
+    rng = np.random.default_rng(5)
+    lengths = [300, 120, 60, 10]
+    prices = np.full((len(lengths), 300), np.nan)
+    for row, length in enumerate(lengths):
+        # Shorter histories are left-padded, as get_many aligns them
+        prices[row, -length:] = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+
+    batched = compute_indicators(prices)
+    for row, length in enumerate(lengths):
+        expected = pandas_indicators(prices[row, -length:])
+        for name, values in expected.items():
+            np.testing.assert_allclose(batched[name][row, -length:], values, rtol=1e-10, atol=1e-10,
+                                       equal_nan=True, err_msg=f"{name} row {row}")
+            assert np.isnan(batched[name][row, :-length]).all()
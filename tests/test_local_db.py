@@ -0,0 +1,26 @@
+import sqlite3
+import threading
+
+from local_db import ThreadConnections
+
+
+def test_one_connection_per_thread(tmp_path):
+    connections = ThreadConnections(str(tmp_path / 'db' / 'x.sqlite3'),
+                                    'CREATE TABLE t (v INTEGER);', row_factory=sqlite3.Row)
+    conn = connections.get()
+    assert connections.get() is conn
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    other = []
+    thread = threading.Thread(target=lambda: other.append(connections.get()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+    conn.execute('INSERT INTO t VALUES (1)')
+    assert conn.execute('SELECT v FROM t').fetchone()['v'] == 1
+
+
+def test_reset_opens_a_new_connection(tmp_path):
+    connections = ThreadConnections(str(tmp_path / 'x.sqlite3'))
+    conn = connections.get()
+    connections.reset()
+    assert connections.get() is not conn
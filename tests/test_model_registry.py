@@ -0,0 +1,78 @@
+import threading
+
+import numpy as np
+import pytest
+
+from model_registry import MicroBatcher, ModelRegistry
+
+
+class SumModel:
+    """Stands in for a Keras model: the next value is the window's sum"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def predict(self, windows, batch_size=None, verbose=0):
+        self.release.wait(5)
+        self.calls.append(len(windows))
+        return windows.sum(axis=(1, 2)).reshape(-1, 1)
+
+
+def window(value):
+    return np.full((1, 3, 1), value, dtype=np.float32)
+
+
+def test_concurrent_requests_share_one_predict_call():
+    model = SumModel()
+    model.release.clear()
+    batcher = MicroBatcher(model, max_batch=8, max_wait=0.2)
+    results = {}
+
+    def request(i):
+        results[i] = batcher.predict(window(i), timeout=5)
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    model.release.set()
+    for thread in threads:
+        thread.join()
+    assert results == {i: 3.0 * i for i in range(5)}
+    assert sum(model.calls) == 5 and len(model.calls) <= 2
+    batcher.close()
+
+
+def test_close_answers_queued_requests_then_ends_the_thread():
+    model = SumModel()
+    batcher = MicroBatcher(model, max_wait=0.01)
+    assert batcher.predict(window(1), timeout=5) == 3.0
+    batcher.close()
+    batcher._thread.join(5)
+    assert not batcher._thread.is_alive()
+    assert batcher.model is None
+    with pytest.raises(RuntimeError):
+        batcher.predict(window(1), timeout=1)
+
+
+def test_registry_without_model_files_caches_nothing(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.predict('AAPL', window(1)) is None
+    assert registry.version('AAPL') == 'none'
+    assert registry._batchers == {}
+
+
+def test_forgotten_batchers_are_closed(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    batcher = MicroBatcher(SumModel())
+    registry._batchers['AAPL'] = (('AAPL.keras', 1), batcher)
+    # The file is gone, so the next lookup drops and closes its batcher
+    assert registry.get('AAPL') is None
+    assert batcher.closed and 'AAPL' not in registry._batchers
+
+    batcher = MicroBatcher(SumModel())
+    registry._batchers['MSFT'] = (('MSFT.keras', 1), batcher)
+    registry.reload()
+    batcher._thread.join(5)
+    assert batcher.closed and not batcher._thread.is_alive()
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import PortfolioManager
+
+DATES = pd.date_range('2024-03-01', periods=6, freq='B', tz='America/New_York')
+CLOSES = {
+    'AAPL': [10.0, 11.0, 12.0, 13.0, 14.0, 15.0],
+    'MSFT': [100.0, np.nan, 102.0, 103.0, 104.0, 105.0],
+}
+
+
+class FakeFetcher:
+    def get_many(self, symbols, period='1y'):
+        return {'symbols': list(symbols), 'dates': DATES,
+                'close': np.array([CLOSES[symbol] for symbol in symbols])}
+
+
+def curve(manager):
+    return manager.equity_curve(FakeFetcher(), start='2024-03-01', end='2024-03-08')
+
+
+def test_each_lot_counts_from_its_own_purchase_date():
+    manager = PortfolioManager.from_lots([
+        ('AAPL', 10, 9.0, '2024-03-01'),
+        ('MSFT', 2, 100.0, '2024-03-04'),
+        ('AAPL', 5, 12.0, '2024-03-05'),
+    ])
+    result = curve(manager)
+    # MSFT has no bar on the 4th and carries the 1st's close forward
+    np.testing.assert_allclose(result['value'], [
+        10 * 10.0,
+        10 * 11.0 + 2 * 100.0,
+        15 * 12.0 + 2 * 102.0,
+        15 * 13.0 + 2 * 103.0,
+        15 * 14.0 + 2 * 104.0,
+        15 * 15.0 + 2 * 105.0,
+    ])
+    np.testing.assert_allclose(result['cost'], [90.0, 290.0, 350.0, 350.0, 350.0, 350.0])
+    assert manager.portfolio['AAPL'] == {'shares': 15.0, 'avg_cost': 10.0}
+
+
+def test_partial_sale_takes_the_oldest_lots_first():
+    manager = PortfolioManager.from_lots([
+        ('AAPL', 5, 12.0, '2024-03-05'),
+        ('AAPL', 10, 9.0, '2024-03-01'),
+        ('AAPL', 4, 11.0, None),
+    ])
+    # The undated lot counts as oldest, then the one from the 1st
+    manager.remove_stock('aapl', 6)
+    np.testing.assert_allclose(manager.lot_shares, [5.0, 8.0])
+    assert manager.portfolio['AAPL']['shares'] == 13.0
+
+    result = curve(manager)
+    np.testing.assert_allclose(result['value'], [80.0, 88.0, 13 * 12.0, 13 * 13.0, 13 * 14.0, 13 * 15.0])
+    np.testing.assert_allclose(result['cost'], [72.0, 72.0, 132.0, 132.0, 132.0, 132.0])
+
+
+def test_removing_a_symbol_drops_its_lots_and_keeps_the_rest_aligned():
+    manager = PortfolioManager.from_lots([
+        ('AAPL', 10, 9.0, '2024-03-01'),
+        ('MSFT', 2, 100.0, '2024-03-01'),
+    ])
+    manager.remove_stock('AAPL')
+    assert manager.symbols == ['MSFT']
+    np.testing.assert_array_equal(manager.lot_rows, [0])
+    np.testing.assert_allclose(curve(manager)['value'], [200.0, 200.0, 204.0, 206.0, 208.0, 210.0])
+
+
+@pytest.mark.parametrize('query', ['start=garbage', 'end=2024-13-45'])
+def test_unparseable_dates_are_a_bad_request(query):
+    from app import app
+
+    response = app.test_client().get(f'/api/portfolio/history?holdings=AAPL:1:1&{query}')
+    assert response.status_code == 400
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+import pandas as pd
+
+from http_cache import MARKET_TZ
+from prediction_cache import bar_closed, next_bar_date
+
+
+def at(text):
+    return datetime.fromisoformat(text).replace(tzinfo=MARKET_TZ)
+
+
+def test_todays_bar_is_final_only_after_the_close():
+    bar = pd.Timestamp('2026-10-14', tz=MARKET_TZ)
+    assert not bar_closed(bar, now=at('2026-10-14 09:35'))
+    assert not bar_closed(bar, now=at('2026-10-14 15:59'))
+    assert bar_closed(bar, now=at('2026-10-14 16:00'))
+    # An earlier session's bar is final even while today's trades
+    assert bar_closed(bar, now=at('2026-10-15 10:00'))
+
+
+def test_bar_dates_compare_in_market_time():
+    # 00:30 UTC on the 15th is still the 14th in New York
+    bar = pd.Timestamp('2026-10-15 00:30', tz='UTC')
+    assert not bar_closed(bar, now=at('2026-10-14 11:00'))
+
+
+def test_next_bar_skips_the_weekend():
+    assert next_bar_date(pd.Timestamp('2026-10-16', tz=MARKET_TZ)) == datetime(2026, 10, 19)
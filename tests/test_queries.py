@@ -0,0 +1,35 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer
+from sqlalchemy.orm import declarative_base
+
+from queries import decode_cursor, encode_cursor
+
+Base = declarative_base()
+
+
+class Row(Base):
+    __tablename__ = 'rows'
+    id = Column(Integer, primary_key=True)
+    created = Column(DateTime)
+
+
+COLUMNS = [Row.created, Row.id]
+
+
+def test_cursor_round_trip():
+    values = [datetime(2026, 10, 14, 9, 30), 42]
+    assert decode_cursor(encode_cursor(values), COLUMNS) == values
+
+
+@pytest.mark.parametrize('payload', [[1, 2], ['not a date', 2], ['2026-10-14T09:30:00', '2'],
+                                     ['2026-10-14T09:30:00', True], ['2026-10-14T09:30:00'], {'id': 1}])
+def test_well_formed_cursors_with_wrong_values_are_invalid(payload):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        decode_cursor(encode_cursor(payload) if isinstance(payload, list) else 'eyJpZCI6IDF9', COLUMNS)
+
+
+def test_garbage_cursor_is_invalid():
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        decode_cursor('%%%', COLUMNS)
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from risk import EwmaCovariance, RiskModel
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(3)
+    return rng.normal(0, 0.01, (6, 700))
+
+
+def replayed(returns, history=500):
+    model = EwmaCovariance(range(len(returns)), history=history)
+    for t in range(returns.shape[1]):
+        model.update(returns[:, t])
+    return model
+
+
+def test_fit_matches_bar_by_bar_updates(returns):
+    fitted = EwmaCovariance(range(len(returns)))
+    fitted.fit(returns)
+    updated = replayed(returns)
+    np.testing.assert_allclose(fitted.cov, updated.cov, rtol=1e-12, atol=1e-18)
+    np.testing.assert_array_equal(fitted.history(), updated.history())
+    np.testing.assert_array_equal(fitted.history(), returns[:, -500:].T)
+
+
+def test_update_after_fit_and_revise(returns):
+    fitted = EwmaCovariance(range(len(returns)))
+    fitted.fit(returns[:, :-1])
+    fitted.update(returns[:, -1] * 3)
+    fitted.revise(returns[:, -1])
+    np.testing.assert_allclose(fitted.cov, replayed(returns).cov, rtol=1e-12, atol=1e-18)
+
+
+def test_extend_and_remove_match_a_fresh_fit(returns):
+    model = EwmaCovariance(range(4))
+    model.fit(returns[:4])
+    model.extend([4, 5], returns[4:, -500:])
+    fresh = replayed(returns)
+    # Bars past the stored window carry weights below 0.94**500
+    np.testing.assert_allclose(model.cov, fresh.cov, atol=1e-15)
+
+    model.remove([1, 4])
+    keep = [0, 2, 3, 5]
+    np.testing.assert_allclose(model.cov, fresh.cov[np.ix_(keep, keep)], atol=1e-15)
+    np.testing.assert_array_equal(model.history(), fresh.history(keep))
+
+
+class FakeFetcher:
+    """get_many over a fixed close matrix, showing only the first ``visible`` bars"""
+
+    def __init__(self, symbols, close, dates):
+        self.rows = {symbol: i for i, symbol in enumerate(symbols)}
+        self.close, self.dates = close, dates
+        self.visible = len(dates)
+
+    def get_many(self, symbols, period='2y'):
+        rows = [self.rows[symbol] for symbol in symbols]
+        return {'symbols': list(symbols), 'dates': self.dates[:self.visible],
+                'close': self.close[rows, :self.visible]}
+
+
+def test_risk_model_tracks_a_fresh_fit_as_bars_arrive(returns):
+    symbols = ['A', 'B', 'C', 'D', 'E', 'F']
+    close = 100 * np.cumprod(1 + returns, axis=1)
+    dates = pd.date_range('2023-01-02', periods=close.shape[1], freq='B')
+    fetcher = FakeFetcher(symbols, close, dates)
+
+    fetcher.visible = 650
+    model = RiskModel(max_symbols=4)
+    model.sync(fetcher, ['A', 'B', 'C'])
+    fetcher.visible = 700
+    model.sync(fetcher, ['C', 'D', 'E'])
+
+    # A, the least recently requested, is evicted to stay within max_symbols
+    assert model.model.symbols == ['B', 'C', 'D', 'E']
+    fresh = EwmaCovariance(symbols[1:5])
+    fresh.fit(np.diff(close[1:5], axis=1) / close[1:5, :-1])
+    np.testing.assert_allclose(model.model.cov, fresh.cov, atol=1e-15)
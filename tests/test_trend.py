@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from trend import StreamingTrend, TrendTracker
+
+
+def sklearn_forecast(values, steps=1):
+    x = np.arange(len(values)).reshape(-1, 1)
+    model = LinearRegression().fit(x, values)
+    return model.predict(np.arange(len(values), len(values) + steps).reshape(-1, 1))
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(7)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 400)))
+
+
+def test_push_matches_sklearn(prices):
+    trend = StreamingTrend()
+    for y in prices:
+        trend.push(y)
+    np.testing.assert_allclose(trend.predict(5), sklearn_forecast(prices, 5), rtol=1e-11)
+
+
+def test_rolling_window_matches_sklearn_on_the_window(prices):
+    trend = StreamingTrend(window=60)
+    for y in prices:
+        trend.push(y)
+    assert len(trend) == 60
+    # The window's bar indexes continue from the full series
+    x = np.arange(len(prices) - 60, len(prices)).reshape(-1, 1)
+    expected = LinearRegression().fit(x, prices[-60:]).predict([[len(prices)]])
+    np.testing.assert_allclose(trend.predict(), expected, rtol=1e-11)
+
+
+def test_replace_last_matches_refit(prices):
+    trend = StreamingTrend()
+    for y in prices:
+        trend.push(y)
+    trend.replace_last(prices[-1] * 1.05)
+    revised = prices.copy()
+    revised[-1] *= 1.05
+    np.testing.assert_allclose(trend.predict(), sklearn_forecast(revised), rtol=1e-11)
+
+
+def test_tracker_follows_new_and_revised_bars(prices):
+    index = pd.date_range('2024-01-01', periods=len(prices), freq='D')
+    series = pd.Series(prices, index=index)
+    tracker = TrendTracker()
+    tracker.predict('aapl', series.iloc[:300])
+
+    # Window moves forward, the last seen bar is revised and new bars arrive
+    moved = series.iloc[50:350].copy()
+    moved.iloc[249] *= 0.97
+    np.testing.assert_allclose(tracker.predict('AAPL', moved), sklearn_forecast(moved.to_numpy()), rtol=1e-11)
+    assert len(tracker._states['AAPL']['trend']) == len(moved)
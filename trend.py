@@ -0,0 +1,128 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class StreamingTrend:
+    """Least-squares line through ``(i, y_i)`` maintained with O(1) updates.
+
+    Keeps Welford-style running means and co-moments of the bar index and
+    price, so bars can be appended, dropped from the front (rolling
+    ``window``) or revised in place without refitting. Matches
+    ``LinearRegression().fit(np.arange(n).reshape(-1, 1), y)`` on the same bars.
+    """
+
+    def __init__(self, window=None):
+        self.window = window
+        self.values = deque()
+        self.next_x = 0
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.c_xx = 0.0
+        self.c_xy = 0.0
+
+    def __len__(self):
+        return self.n
+
+    def _add(self, x, y):
+        old_mean_x = self.mean_x
+        self.n += 1
+        self.mean_x += (x - self.mean_x) / self.n
+        self.mean_y += (y - self.mean_y) / self.n
+        self.c_xx += (x - old_mean_x) * (x - self.mean_x)
+        self.c_xy += (x - old_mean_x) * (y - self.mean_y)
+
+    def _remove(self, x, y):
+        if self.n == 1:
+            self.n = 0
+            self.mean_x = self.mean_y = self.c_xx = self.c_xy = 0.0
+            return
+        old_mean_x, old_mean_y = self.mean_x, self.mean_y
+        self.n -= 1
+        self.mean_x = (old_mean_x * (self.n + 1) - x) / self.n
+        self.mean_y = (old_mean_y * (self.n + 1) - y) / self.n
+        self.c_xx -= (x - self.mean_x) * (x - old_mean_x)
+        self.c_xy -= (x - self.mean_x) * (y - old_mean_y)
+
+    def push(self, y):
+        """Append the next bar, dropping the oldest one if the window is full"""
+        self._add(self.next_x, y)
+        self.values.append(y)
+        self.next_x += 1
+        if self.window is not None and self.n > self.window:
+            self.pop_oldest()
+
+    def pop_oldest(self):
+        y = self.values.popleft()
+        self._remove(self.next_x - self.n, y)
+
+    def replace_last(self, y):
+        """Revise the most recent bar, e.g. when an intraday bar closes"""
+        x = self.next_x - 1
+        self._remove(x, self.values[-1])
+        self._add(x, y)
+        self.values[-1] = y
+
+    @property
+    def slope(self):
+        return self.c_xy / self.c_xx if self.c_xx > 0 else 0.0
+
+    @property
+    def intercept(self):
+        return self.mean_y - self.slope * self.mean_x
+
+    def predict(self, steps=1):
+        """Trend values for the next ``steps`` bars"""
+        if self.n == 0:
+            raise ValueError('No bars in the trend window')
+        x = np.arange(self.next_x, self.next_x + steps)
+        return self.intercept + self.slope * x
+
+
+class TrendTracker:
+    """One StreamingTrend per symbol, kept in step with the bars each request sees.
+
+    ``predict`` lines the stored window up with a timestamp-indexed series:
+    bars before the series start are dropped, new bars are pushed and a
+    revised last bar is replaced. Anything else (gaps, a different period)
+    rebuilds that symbol's state from the series once.
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _rebuild(self, series):
+        trend = StreamingTrend()
+        for y in np.asarray(series, dtype=float):
+            trend.push(y)
+        return {'trend': trend, 'timestamps': deque(series.index)}
+
+    def _sync(self, state, series):
+        trend, timestamps = state['trend'], state['timestamps']
+        while timestamps and timestamps[0] < series.index[0]:
+            timestamps.popleft()
+            trend.pop_oldest()
+        if not timestamps or timestamps[0] != series.index[0]:
+            return False
+
+        last = series.index.get_indexer([timestamps[-1]])[0]
+        if last != len(timestamps) - 1:
+            return False
+        if trend.values[-1] != series.iloc[last]:
+            trend.replace_last(float(series.iloc[last]))
+        for timestamp, y in series.iloc[last + 1:].items():
+            trend.push(float(y))
+            timestamps.append(timestamp)
+        return True
+
+    def predict(self, symbol, series, steps=1):
+        """Linear-trend forecast for the ``steps`` bars after ``series``"""
+        symbol = symbol.upper()
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is None or not self._sync(state, series):
+                state = self._states[symbol] = self._rebuild(series)
+            return state['trend'].predict(steps)
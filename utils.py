@@ -4,18 +4,46 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import requests
-from textblob import TextBlob
+from concurrent.futures import ThreadPoolExecutor
+from history_store import HistoryStore, period_covering
+from cache import TTLCache
+from indicators import IndicatorTracker, compute_indicators
+from rollups import RollupTracker
+from news import default_provider
+from sentiment import SentimentScorer, SentimentIndex, article_key, label_for
 
 class StockDataFetcher:
-    def __init__(self):
-        self.cache = {}
+    # Seconds each kind of result stays fresh in the cache
+    CACHE_TTLS = {
+        'quote': 15,
+        'history': 60 * 60,
+        'indicators': 60 * 60,
+    }
+
+    # Periods short enough to fetch for many symbols in one bulk download;
+    # longer ones are read from the history store in parallel.
+    QUOTE_PERIODS = ('1d', '5d')
+
+    def __init__(self, store=None, cache_bytes=64 * 1024 * 1024, ttls=None, max_workers=8):
+        self.cache = TTLCache(max_bytes=cache_bytes)
+        self.store = store or HistoryStore()
+        self.ttls = dict(self.CACHE_TTLS, **(ttls or {}))
+        self.max_workers = max_workers
+        self.indicators = IndicatorTracker()
+        self.rollups = RollupTracker()
 
     def get_stock_data(self, symbol, period="1y"):
-        """Fetch stock data from Yahoo Finance"""
+        """Fetch stock data from the local history store, topped up from Yahoo Finance"""
+        return self.cache.get_or_load(('history', symbol.upper(), period),
+                                      lambda: self._load_stock_data(symbol, period),
+                                      self.ttls['history'])
+
+    def _load_stock_data(self, symbol, period):
         try:
-            stock = yf.Ticker(symbol)
-            hist = stock.history(period=period)
-            info = stock.info
+            hist = self.store.get_history(symbol, period=period)
+            if hist is None or hist.empty:
+                return None
+            info = self.store.get_info(symbol)
 
             return {
                 'historical_data': hist,
@@ -28,6 +56,11 @@ class StockDataFetcher:
 
     def get_real_time_price(self, symbol):
         """Get current stock price"""
+        return self.cache.get_or_load(('quote', symbol.upper()),
+                                      lambda: self._load_real_time_price(symbol),
+                                      self.ttls['quote'])
+
+    def _load_real_time_price(self, symbol):
         try:
             stock = yf.Ticker(symbol)
             data = stock.history(period="1d")
@@ -36,11 +69,90 @@ class StockDataFetcher:
             print(f"Error getting real-time price for {symbol}: {e}")
             return None
 
+    def get_many(self, symbols, period="5d"):
+        """Fetch bars for several symbols at once, aligned on a shared date index
+
+        Returns the symbols, the union of their dates and one
+        ``(n_symbols, n_dates)`` array per OHLCV field, with NaN where a
+        symbol has no bar, plus each symbol's latest and previous close.
+        """
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        if period in self.QUOTE_PERIODS:
+            frames = self._load_quote_bars(symbols, period)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols) or 1)) as pool:
+                results = pool.map(lambda symbol: self.get_stock_data(symbol, period=period), symbols)
+                frames = {symbol: data['historical_data'] for symbol, data in zip(symbols, results) if data}
+
+        dates = None
+        for frame in frames.values():
+            dates = frame.index if dates is None else dates.union(frame.index)
+        if dates is None:
+            dates = pd.DatetimeIndex([])
+
+        result = {'symbols': symbols, 'dates': dates}
+        for field in ('Open', 'High', 'Low', 'Close', 'Volume'):
+            matrix = np.full((len(symbols), len(dates)), np.nan)
+            for row, symbol in enumerate(symbols):
+                if symbol in frames:
+                    matrix[row] = frames[symbol][field].reindex(dates).to_numpy(dtype=float)
+            result[field.lower()] = matrix
+
+        result['price'] = np.full(len(symbols), np.nan)
+        result['prev_close'] = np.full(len(symbols), np.nan)
+        for row, symbol in enumerate(symbols):
+            closes = frames[symbol]['Close'].dropna() if symbol in frames else ()
+            if len(closes) > 0:
+                result['price'][row] = closes.iloc[-1]
+            if len(closes) > 1:
+                result['prev_close'][row] = closes.iloc[-2]
+        return result
+
+    def _load_quote_bars(self, symbols, period):
+        """Recent bars per symbol, downloading every uncached symbol in one request"""
+        frames = {}
+        missing = []
+        for symbol in symbols:
+            frame = self.cache.get(('bars', symbol, period))
+            if frame is None:
+                missing.append(symbol)
+            else:
+                frames[symbol] = frame
+
+        if missing:
+            try:
+                data = yf.download(missing, period=period, group_by='ticker', progress=False, threads=True)
+            except Exception as e:
+                print(f"Error downloading quotes for {', '.join(missing)}: {e}")
+                return frames
+
+            for symbol in missing:
+                if isinstance(data.columns, pd.MultiIndex):
+                    if symbol not in data.columns.get_level_values(0):
+                        continue
+                    frame = data[symbol].dropna(how='all')
+                else:
+                    frame = data.dropna(how='all')
+                if frame.empty:
+                    continue
+                frames[symbol] = frame
+                self.cache.set(('bars', symbol, period), frame, self.ttls['quote'])
+                self.cache.set(('quote', symbol), frame['Close'].iloc[-1], self.ttls['quote'])
+        return frames
+
     def get_technical_indicators(self, symbol, period="6mo"):
         """Calculate technical indicators"""
+        return self.cache.get_or_load(('indicators', symbol.upper(), period),
+                                      lambda: self._load_technical_indicators(symbol, period),
+                                      self.ttls['indicators'])
+
+    def _load_technical_indicators(self, symbol, period):
         try:
-            stock = yf.Ticker(symbol)
-            hist = stock.history(period=period)
+            data = self.get_stock_data(symbol, period=period)
+            if data is None:
+                return None
+            # The history frame is shared through the cache; work on a copy
+            hist = data['historical_data'].copy()
 
             # Simple Moving Averages
             hist['SMA_20'] = hist['Close'].rolling(window=20).mean()
@@ -62,97 +174,202 @@ class StockDataFetcher:
             print(f"Error calculating technical indicators for {symbol}: {e}")
             return None
 
-class SentimentAnalyzer:
-    def __init__(self):
-        self.news_sources = [
-            'https://finnhub.io/api/v1/news',
-            'https://newsapi.org/v2/everything'
-        ]
+    def get_latest_indicators(self, symbol, period="6mo", live=False):
+        """Latest SMA/EMA/RSI values, updated incrementally instead of recomputed
 
-    def get_news_sentiment(self, symbol):
-        """Get sentiment analysis from news articles"""
+        Only bars added since the last call are applied; with ``live`` the
+        current bar is revised with the real-time price.
+        """
         try:
-            # Simulate news data (in production, you'd fetch from real APIs)
-            sample_news = [
-                f"{symbol} reports strong quarterly earnings, beating expectations",
-                f"Analysts upgrade {symbol} stock rating amid growth prospects",
-                f"Market volatility affects {symbol} performance in recent trading",
-                f"{symbol} announces new product lineup for upcoming quarter",
-                f"Supply chain concerns impact {symbol} production forecasts"
-            ]
+            data = self.get_stock_data(symbol, period=period)
+            if data is None:
+                return None
+            values = self.indicators.sync(symbol, data['historical_data']['Close'])
+            if live:
+                price = self.get_real_time_price(symbol)
+                if price is not None:
+                    values = self.indicators.tick(symbol, price)
+            return values
+        except Exception as e:
+            print(f"Error updating technical indicators for {symbol}: {e}")
+            return None
+
+    def get_indicators_many(self, symbols, period="6mo"):
+        """Technical indicators for many symbols in one vectorized pass
 
+        Returns the ``get_many`` result with an ``indicators`` dict of
+        ``(n_symbols, n_dates)`` arrays (SMA_20, SMA_50, EMA_12, EMA_26, RSI
+        and MACD with its signal line and histogram).
+        """
+        data = self.get_many(symbols, period=period)
+        data['indicators'] = compute_indicators(data['close'])
+        return data
+
+class SentimentAnalyzer:
+    def __init__(self, provider=None, scorer=None, index=None):
+        self.provider = provider or default_provider()
+        self.scorer = scorer or SentimentScorer()
+        self.index = index or SentimentIndex()
+
+    def get_many_sentiment(self, symbols):
+        """Sentiment for several symbols, scoring all of their headlines as one batch"""
+        news = self.provider.fetch(symbols)
+        # A headline filed under several symbols is scored once
+        scores = iter(self.scorer.score([article['title'] for articles in news.values() for article in articles]))
+
+        results = {}
+        for symbol, articles in news.items():
             sentiments = []
-            for article in sample_news:
-                blob = TextBlob(article)
-                sentiment_score = blob.sentiment.polarity
+            indexed = []
+            for article in articles:
+                sentiment_score, _ = next(scores)
+                # Placeholder headlines are shown but kept out of the stored history
+                if not article.get('sample'):
+                    indexed.append((article_key(article['title'], article['published']),
+                                    article['published'].timestamp(), sentiment_score))
                 sentiments.append({
-                    'title': article,
-                    'sentiment': 'Positive' if sentiment_score > 0 else 'Negative' if sentiment_score < 0 else 'Neutral',
+                    'title': article['title'],
+                    'sentiment': label_for(sentiment_score),
                     'score': round(sentiment_score, 2),
-                    'source': 'Financial News API'
+                    'source': article['source'],
+                    'published': article['published'].isoformat(),
+                    'url': article['url'],
+                    'sample': article.get('sample', False)
                 })
 
-            overall_sentiment = np.mean([s['score'] for s in sentiments])
+            # Articles seen for the first time extend the symbol's sentiment history
+            self.index.add(symbol, indexed)
 
-            return {
+            overall_sentiment = np.mean([s['score'] for s in sentiments]) if sentiments else 0.0
+
+            results[symbol] = {
                 'overall_sentiment': 'Positive' if overall_sentiment > 0 else 'Negative',
-                'sentiment_score': round(overall_sentiment, 2),
+                'sentiment_score': round(float(overall_sentiment), 2),
                 'articles': sentiments,
-                'article_count': len(sentiments)
+                'article_count': len(sentiments),
+                'decayed_score': self.index.decayed_average(symbol)
             }
+        return results
+
+    def get_news_sentiment(self, symbol):
+        """Get sentiment analysis from news articles"""
+        try:
+            return self.get_many_sentiment([symbol])[symbol.upper()]
         except Exception as e:
             print(f"Error analyzing sentiment for {symbol}: {e}")
             return None
 
+def _as_datetime64(value):
+    """Naive UTC datetime64[ns] for a date/datetime/string, NaT for None"""
+    if value is None:
+        return np.datetime64('NaT', 'ns')
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    return np.datetime64(timestamp, 'ns')
+
 class PortfolioManager:
+    """Holdings as aligned arrays: one entry per symbol in ``symbols``, ``shares``
+    and ``avg_cost``, so valuing the portfolio is a dot product against a
+    price vector instead of a loop over positions.
+
+    Each purchase is also kept as a lot (``lot_rows`` into ``symbols``,
+    ``lot_shares``, ``lot_cost`` and ``lot_acquired``, NaT if unknown), so
+    the equity curve counts every lot from its own purchase date. Sales
+    take shares from the oldest lots first.
+    """
+
     def __init__(self):
-        self.portfolio = {}
+        self.symbols = []
+        self.shares = np.zeros(0)
+        self.avg_cost = np.zeros(0)
+        self._positions = {}
+        self.lot_rows = np.zeros(0, dtype=int)
+        self.lot_shares = np.zeros(0)
+        self.lot_cost = np.zeros(0)
+        self.lot_acquired = np.zeros(0, dtype='datetime64[ns]')
 
-    def add_stock(self, symbol, shares, avg_cost):
+    @property
+    def portfolio(self):
+        """Holdings keyed by symbol, as ``{'shares': ..., 'avg_cost': ...}``"""
+        return {symbol: {'shares': float(self.shares[i]), 'avg_cost': float(self.avg_cost[i])}
+                for i, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def from_lots(cls, lots):
+        """Build from ``(symbol, shares, avg_cost, purchase_date)`` rows, e.g. Portfolio table rows"""
+        manager = cls()
+        for symbol, shares, avg_cost, purchase_date in lots:
+            manager.add_stock(symbol, shares, avg_cost, acquired=purchase_date)
+        return manager
+
+    def add_stock(self, symbol, shares, avg_cost, acquired=None):
         """Add stock to portfolio"""
-        if symbol in self.portfolio:
+        symbol = symbol.upper()
+        i = self._positions.get(symbol)
+        if i is not None:
             # Update existing position
-            current_shares = self.portfolio[symbol]['shares']
-            current_avg_cost = self.portfolio[symbol]['avg_cost']
+            current_shares = self.shares[i]
+            current_avg_cost = self.avg_cost[i]
 
             new_shares = current_shares + shares
             new_avg_cost = ((current_shares * current_avg_cost) + (shares * avg_cost)) / new_shares
 
-            self.portfolio[symbol] = {
-                'shares': new_shares,
-                'avg_cost': round(new_avg_cost, 2)
-            }
+            self.shares[i] = new_shares
+            self.avg_cost[i] = round(new_avg_cost, 2)
         else:
-            self.portfolio[symbol] = {
-                'shares': shares,
-                'avg_cost': avg_cost
-            }
+            i = self._positions[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self.shares = np.append(self.shares, float(shares))
+            self.avg_cost = np.append(self.avg_cost, float(avg_cost))
+
+        self.lot_rows = np.append(self.lot_rows, i)
+        self.lot_shares = np.append(self.lot_shares, float(shares))
+        self.lot_cost = np.append(self.lot_cost, float(avg_cost))
+        self.lot_acquired = np.append(self.lot_acquired, _as_datetime64(acquired))
 
     def remove_stock(self, symbol, shares=None):
         """Remove stock from portfolio"""
-        if symbol in self.portfolio:
-            if shares is None:
-                del self.portfolio[symbol]
-            else:
-                current_shares = self.portfolio[symbol]['shares']
-                if shares >= current_shares:
-                    del self.portfolio[symbol]
-                else:
-                    self.portfolio[symbol]['shares'] -= shares
+        i = self._positions.get(symbol.upper())
+        if i is None:
+            return
+        if shares is not None and shares < self.shares[i]:
+            self.shares[i] -= shares
+            # Oldest lots first; lots of unknown date count as oldest
+            lots = np.flatnonzero(self.lot_rows == i)
+            dates = self.lot_acquired[lots]
+            lots = lots[np.lexsort((dates, ~np.isnat(dates)))]
+            for lot in lots:
+                taken = min(shares, self.lot_shares[lot])
+                self.lot_shares[lot] -= taken
+                shares -= taken
+                if shares <= 0:
+                    break
+            self._drop_lots(self.lot_shares <= 0)
+            return
+
+        del self.symbols[i]
+        self.shares = np.delete(self.shares, i)
+        self.avg_cost = np.delete(self.avg_cost, i)
+        self._positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._drop_lots(self.lot_rows == i)
+        self.lot_rows = self.lot_rows - (self.lot_rows > i)
+
+    def _drop_lots(self, mask):
+        self.lot_rows = self.lot_rows[~mask]
+        self.lot_shares = self.lot_shares[~mask]
+        self.lot_cost = self.lot_cost[~mask]
+        self.lot_acquired = self.lot_acquired[~mask]
 
     def get_portfolio_value(self, fetcher):
         """Calculate total portfolio value"""
-        total_value = 0
-        total_cost = 0
+        # get_many returns prices in the order of self.symbols, from the quote cache
+        prices = fetcher.get_many(self.symbols)['price'] if self.symbols else np.zeros(0)
 
-        for symbol, position in self.portfolio.items():
-            current_price = fetcher.get_real_time_price(symbol)
-            if current_price:
-                position_value = position['shares'] * current_price
-                position_cost = position['shares'] * position['avg_cost']
-
-                total_value += position_value
-                total_cost += position_cost
+        # Positions without a price are left out of both value and cost
+        priced = ~np.isnan(prices) & (prices > 0)
+        total_value = float(self.shares[priced] @ prices[priced])
+        total_cost = float(self.shares[priced] @ self.avg_cost[priced])
 
         return {
             'total_value': round(total_value, 2),
@@ -160,3 +377,61 @@ class PortfolioManager:
             'total_gain_loss': round(total_value - total_cost, 2),
             'total_gain_loss_percent': round(((total_value - total_cost) / total_cost) * 100, 2) if total_cost > 0 else 0
         }
+
+    def equity_curve(self, fetcher, start=None, end=None):
+        """Daily market value and cost basis of the holdings between ``start`` and ``end``
+
+        Uses the stored close matrix for every held symbol. Each lot counts
+        from the day it was bought (from the start if unknown), and a
+        symbol with no bar on a date carries its last close forward.
+        Returns a dict with ``dates``, ``value`` and ``cost`` arrays.
+        """
+        end = pd.Timestamp(end) if end is not None else pd.Timestamp.now()
+        start = pd.Timestamp(start) if start is not None else end - pd.DateOffset(years=1)
+        empty = {'dates': pd.DatetimeIndex([]), 'value': np.zeros(0), 'cost': np.zeros(0)}
+        if not self.symbols:
+            return empty
+
+        data = fetcher.get_many(self.symbols, period=period_covering(start))
+        dates = data['dates']
+        if len(dates) == 0:
+            return empty
+        naive_dates = dates.tz_localize(None) if dates.tz is not None else dates
+        in_range = (naive_dates >= start.tz_localize(None).normalize()) & \
+            (naive_dates <= end.tz_localize(None))
+
+        # Forward-fill each symbol's closes along the date axis
+        close = data['close']
+        observed = ~np.isnan(close)
+        last_seen = np.maximum.accumulate(np.where(observed, np.arange(close.shape[1]), 0), axis=1)
+        filled = np.take_along_axis(close, last_seen, axis=1)
+        filled[~np.maximum.accumulate(observed, axis=1)] = 0.0
+
+        # One row per lot: its shares on the dates it was held
+        held = np.isnat(self.lot_acquired)[:, None] | \
+            (naive_dates.to_numpy()[None, :] >= self.lot_acquired.astype('datetime64[D]')[:, None])
+        shares = np.where(held, self.lot_shares[:, None], 0.0)
+
+        return {
+            'dates': dates[in_range],
+            'value': np.einsum('ij,ij->j', shares, filled[self.lot_rows])[in_range],
+            'cost': (self.lot_cost @ shares)[in_range],
+        }
+
+    def risk(self, fetcher, model, confidence=0.99, horizon=1):
+        """Volatility, VaR and risk contributions of the holdings at current prices
+
+        ``model`` is a risk.RiskModel; it is brought up to date for the held
+        symbols first. Symbols without a price are left out. Returns None
+        when there is not enough history.
+        """
+        if not self.symbols or model.sync(fetcher, self.symbols) is None:
+            return None
+        prices = fetcher.get_many(self.symbols)['price']
+        priced = ~np.isnan(prices) & (prices > 0)
+        symbols = [symbol for symbol, ok in zip(self.symbols, priced) if ok]
+        exposures = self.shares[priced] * prices[priced]
+
+        report = model.report(symbols, exposures, confidence=confidence, horizon=horizon)
+        report.update({'symbols': symbols, 'exposures': exposures, 'value': float(exposures.sum())})
+        return report
@@ -0,0 +1,26 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+LOOKBACK = 60
+
+
+def make_windows(series, lookback=LOOKBACK):
+    """Build supervised ``(X, y)`` pairs from a 1-D series without copying
+
+    ``X[i]`` holds ``series[i:i + lookback]`` and ``y[i]`` the value that
+    follows it, so ``X`` has shape ``(n - lookback, lookback, 1)`` as Keras
+    sequence models expect.  Both are read-only views into ``series``.
+    """
+    series = np.asarray(series).reshape(-1)
+    if len(series) <= lookback:
+        return np.empty((0, lookback, 1), dtype=series.dtype), np.empty(0, dtype=series.dtype)
+
+    X = sliding_window_view(series[:-1], lookback)[:, :, np.newaxis]
+    y = series[lookback:]
+    return X, y
+
+
+def last_window(series, lookback=LOOKBACK):
+    """The most recent ``lookback`` values shaped ``(1, lookback, 1)`` for inference"""
+    series = np.asarray(series).reshape(-1)
+    return series[-lookback:].reshape(1, -1, 1)
@@ -0,0 +1,90 @@
+import numpy as np
+from flask import Response, jsonify
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+FORMATS = ('records', 'columnar', 'msgpack', 'arrow')
+ACCEPT_FORMATS = {
+    MSGPACK_MIMETYPE: 'msgpack',
+    'application/x-msgpack': 'msgpack',
+    ARROW_MIMETYPE: 'arrow',
+}
+
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close')
+
+
+def negotiate_format(request, default='records'):
+    """Pick the history encoding from ``?format=`` or else the Accept header"""
+    requested = request.args.get('format')
+    if requested:
+        return requested
+    best = request.accept_mimetypes.best_match([JSON_MIMETYPE, *ACCEPT_FORMATS])
+    return ACCEPT_FORMATS.get(best, default)
+
+
+def history_columns(hist):
+    """Parallel arrays of bar timestamps (epoch ms, UTC) and OHLCV
+
+    Prices are float32. Volume stays int64, since float32 cannot represent
+    volumes above 2**24 exactly.
+    """
+    index = hist.index.tz_convert('UTC') if hist.index.tz is not None else hist.index
+    columns = {'timestamp': np.asarray(index.as_unit('ms').asi8, dtype='<i8')}
+    for column in PRICE_COLUMNS:
+        columns[column.lower()] = hist[column].to_numpy(dtype='<f4')
+    columns['volume'] = hist['Volume'].to_numpy(dtype='<i8')
+    return columns
+
+
+def json_columns(columns):
+    # Rounding keeps float32 noise (175.42999267578125) out of the JSON text
+    return {name: (np.round(values.astype(float), 4).tolist() if values.dtype.kind == 'f' else values.tolist())
+            for name, values in columns.items()}
+
+
+def render_history(payload, hist, fmt):
+    """Response with ``payload`` plus ``hist`` under ``historical_data`` in the requested format"""
+    if fmt not in FORMATS:
+        return jsonify({'error': f"Unknown format '{fmt}', expected one of {', '.join(FORMATS)}"}), 400
+
+    if fmt == 'records':
+        response = jsonify(dict(payload, historical_data=hist.reset_index().to_dict('records')))
+    elif fmt == 'columnar':
+        response = jsonify(dict(payload, historical_data=json_columns(history_columns(hist))))
+    elif fmt == 'msgpack':
+        if msgpack is None:
+            return jsonify({'error': 'msgpack encoding is not available on this server'}), 406
+        # Each column travels as raw little-endian bytes, ready for a typed array
+        columns = history_columns(hist)
+        body = dict(payload, historical_data={
+            'length': len(hist),
+            'dtypes': {name: values.dtype.str for name, values in columns.items()},
+            'columns': {name: values.tobytes() for name, values in columns.items()},
+        })
+        response = Response(msgpack.packb(body, use_bin_type=True), mimetype=MSGPACK_MIMETYPE)
+    else:
+        if pa is None:
+            return jsonify({'error': 'Arrow encoding is not available on this server'}), 406
+        columns = history_columns(hist)
+        table = pa.table({name: pa.array(values) for name, values in columns.items()})
+        # Scalar fields (symbol, price, ...) ride along as schema metadata
+        table = table.replace_schema_metadata({key: str(value) for key, value in payload.items()})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        response = Response(sink.getvalue().to_pybytes(), mimetype=ARROW_MIMETYPE)
+
+    response.vary.add('Accept')
+    return response
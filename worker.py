@@ -0,0 +1,121 @@
+"""Background worker that runs queued prediction jobs.
+
+Started by the ``worker`` entry in the Procfile. Claims jobs from the
+SQLite-backed JobQueue, runs every model to completion and stores the
+result for the web process to serve and push over Socket.IO. The first
+worker process also precomputes predictions for the configured watchlist
+into the Prediction table whenever a new bar arrives, and reruns the
+walk-forward backtests behind each model's accuracy in a background
+thread once per BACKTEST_REFRESH_INTERVAL.
+
+Usage: python worker.py [--processes N] [--poll-interval SECONDS]
+"""
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+
+import backtest
+
+from jobs import JobQueue
+from predictors import format_predictions, run_models
+from utils import StockDataFetcher
+from app import app, db, prediction_cache, backtest_store
+
+# Finished jobs are kept this long for clients to fetch
+JOB_RETENTION = 24 * 60 * 60
+
+# Backtests replay two years of bars per fold, so they run at most daily
+BACKTEST_REFRESH_INTERVAL = int(os.environ.get('BACKTEST_REFRESH_INTERVAL', 24 * 60 * 60))
+
+
+def run_prediction_job(job, fetcher):
+    data = fetcher.get_stock_data(job['symbol'], period="2y")
+    if data is None:
+        raise ValueError(f"No data available for {job['symbol']}")
+    results = run_models(job['symbol'], data['historical_data']['Close'])
+    return format_predictions(results, backtest_store.accuracy(job['symbol']))
+
+
+def refresh_predictions(fetcher):
+    with app.app_context():
+        refreshed = prediction_cache.refresh(app.config['PREDICTION_WATCHLIST'], fetcher.store)
+    if refreshed:
+        print(f"Precomputed predictions for {', '.join(refreshed)}")
+
+
+def refresh_backtests(fetcher):
+    try:
+        refreshed = backtest.refresh(fetcher, app.config['PREDICTION_WATCHLIST'], backtest_store)
+        if refreshed:
+            print(f"Backtested models on {', '.join(refreshed)}")
+    except Exception as e:
+        print(f"Error refreshing backtests: {e}")
+
+
+def start_backtests(fetcher, running):
+    """Refresh backtests in a background thread so queued jobs keep running; one refresh at a time"""
+    if running is not None and running.is_alive():
+        return running
+    thread = threading.Thread(target=refresh_backtests, args=(fetcher,), name='backtests', daemon=True)
+    thread.start()
+    return thread
+
+
+def work(poll_interval=0.5, refresh=True):
+    queue = JobQueue()
+    fetcher = StockDataFetcher()
+    last_purge = 0
+    last_refresh = 0
+    last_backtest = 0
+    backtests = None
+
+    if refresh:
+        with app.app_context():
+            db.create_all()
+
+    while True:
+        if time.time() - last_purge > 3600:
+            queue.purge(JOB_RETENTION)
+            last_purge = time.time()
+
+        if refresh and time.time() - last_refresh > app.config['PREDICTION_REFRESH_INTERVAL']:
+            try:
+                refresh_predictions(fetcher)
+            except Exception as e:
+                print(f"Error refreshing precomputed predictions: {e}")
+            last_refresh = time.time()
+
+        if refresh and time.time() - last_backtest > BACKTEST_REFRESH_INTERVAL:
+            backtests = start_backtests(fetcher, backtests)
+            last_backtest = time.time()
+
+        job = queue.claim()
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        try:
+            queue.complete(job['id'], run_prediction_job(job, fetcher))
+        except Exception as e:
+            print(f"Error running prediction job {job['id']} for {job['symbol']}: {e}")
+            queue.fail(job['id'], e)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--poll-interval', type=float, default=0.5)
+    args = parser.parse_args()
+
+    if args.processes == 1:
+        work(args.poll_interval)
+    else:
+        # Only the first process refreshes the watchlist
+        processes = [multiprocessing.Process(target=work, args=(args.poll_interval, i == 0))
+                     for i in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()